@@ -0,0 +1,113 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.chunking import CHUNK_OVERLAP, CHUNK_SIZE, NOISE_PATTERNS, SEPARATORS, chunk_flags, chunk_text
+from services.page_store import iter_page_texts
+
+WORDS = (
+    "iam policy role permission bucket access least privilege audit key encryption "
+    "network firewall identity token secret condition principal resource action"
+).split()
+BOILERPLATE = ["Was this page helpful?", "Sign in to the console", "Learn more", "&quot;Effect&quot;: null,"]
+
+
+def legacy_chunk_text(text: str) -> list[str]:
+    """chunk_text before the shared splitter: a new langchain splitter per page."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=SEPARATORS)
+    return splitter.split_text(text)
+
+
+def legacy_is_valid(text: str) -> bool:
+    """is_valid_doc_text before chunk_flags: one lowercase per noise pattern."""
+    if not text or len(text) < 150 or text.count("&quot;") > 3:
+        return False
+    for pattern in NOISE_PATTERNS:
+        if pattern.lower() in text.lower():
+            return False
+    return True
+
+
+def legacy_context_ok(text: str) -> bool:
+    """build_context's query-time checks before they moved to ingestion."""
+    text = text.strip()
+    if not text or len(text) < 200:
+        return False
+    if "&quot;" in text or "null," in text:
+        return False
+    if "Learn more" in text and "security" not in text.lower():
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the ingest-time chunking path (splitting, then chunk quality checks) in chunks/sec "
+        "over the pages saved in the page store, against the previous implementations."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=None, help="Use at most this many stored pages")
+        parser.add_argument("--synthetic", type=int, default=0, help="Generate this many pages instead of reading the page store")
+        parser.add_argument("--rounds", type=int, default=3, help="Best of this many timed rounds")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            pages, origin = self.synthetic_pages(options["synthetic"], random.Random(options["seed"])), "generated"
+        else:
+            pages, origin = [text for _, text in iter_page_texts(options["pages"])], "from the page store"
+            if not pages:
+                self.stdout.write("⚠️ The page store is empty; ingest documents first, or pass --synthetic N.")
+                return
+        self.stdout.write(f"ℹ️ {len(pages)} pages ({sum(len(p) for p in pages) / 1e6:.1f} MB of text) {origin}")
+
+        old_chunks, split_old = self.timed(lambda: [c for page in pages for c in legacy_chunk_text(page)], options["rounds"])
+        new_chunks, split_new = self.timed(lambda: [c for page in pages for c in chunk_text(page)], options["rounds"])
+        old_flags, filter_old = self.timed(lambda: [(legacy_is_valid(c), legacy_context_ok(c)) for c in new_chunks], options["rounds"])
+        new_flags, filter_new = self.timed(lambda: [tuple(chunk_flags(c)) for c in new_chunks], options["rounds"])
+
+        chunks = len(new_chunks)
+        rows = [
+            ("split", split_old, split_new, old_chunks == new_chunks),
+            ("quality checks", filter_old, filter_new, old_flags == new_flags),
+            ("split + checks", split_old + filter_old, split_new + filter_new, None),
+        ]
+        self.stdout.write(f"{'stage':<16} {'before chunks/s':>16} {'after chunks/s':>15} {'speedup':>8} {'same output':>12}")
+        for stage, before, after, same in rows:
+            self.stdout.write(
+                f"{stage:<16} {chunks / before:>16,.0f} {chunks / after:>15,.0f} {before / after:>7.2f}x "
+                f"{'' if same is None else 'yes' if same else 'NO':>12}"
+            )
+        valid = [flags for flags in new_flags if flags[0]]
+        self.stdout.write(
+            f"ℹ️ {chunks} chunks: {len(valid)} stored, {sum(1 for flags in valid if flags[1])} of them flagged "
+            f"context_ok (build_context no longer re-checks them per search)"
+        )
+
+    @staticmethod
+    def timed(fn, rounds: int):
+        best = None
+        for _ in range(max(rounds, 1)):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
+
+    @staticmethod
+    def synthetic_pages(count: int, rng: random.Random) -> list[str]:
+        pages = []
+        for _ in range(count):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + "."
+                for _ in range(rng.randint(20, 120))
+            ]
+            for _ in range(rng.randint(0, 3)):
+                sentences.insert(rng.randrange(len(sentences) + 1), rng.choice(BOILERPLATE))
+            pages.append(" ".join(sentences))
+        return pages
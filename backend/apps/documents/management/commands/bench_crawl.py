@@ -0,0 +1,110 @@
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from services.crawler import iter_crawled_pages
+
+WORDS = (
+    "iam policy role permission bucket access least privilege audit key encryption "
+    "network firewall identity token secret condition principal resource action"
+).split()
+
+
+class FixtureSite:
+    """Local docs-like site: `pages` linked pages served with a fixed latency and cache headers."""
+
+    def __init__(self, pages: int, latency: float, links_per_page: int = 8, seed: int = 7):
+        rng = random.Random(seed)
+        self.latency = latency
+        self.hits = 0
+        self.bodies = {}
+        for i in range(pages):
+            links = "".join(f'<a href="/p{j}.html">p{j}</a> ' for j in rng.sample(range(pages), min(links_per_page, pages)))
+            paragraphs = "".join(
+                "<p>" + " ".join(rng.choice(WORDS) for _ in range(120)) + ".</p>" for _ in range(4)
+            )
+            self.bodies[f"/p{i}.html"] = (
+                f"<html><body><main><h1>Page {i}</h1>{paragraphs}</main>{links}</body></html>"
+            ).encode("utf-8")
+        self.bodies["/"] = self.bodies["/p0.html"]
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                site.hits += 1
+                time.sleep(site.latency)
+                body = site.bodies.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "public, max-age=3600")
+                self.end_headers()
+                self.wfile.write(body)
+
+        # Port 80 is not required: the spider restricts itself by hostname only
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark crawling against a local fixture web server and report pages/sec "
+        "for a crawl profile: serial, profile (cold cache) and profile (warm cache)."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", default=None, help="Crawl profile to use (default profile if omitted)")
+        parser.add_argument("--pages", type=int, default=60)
+        parser.add_argument("--latency", type=float, default=0.05, help="Fixture server latency per request (s)")
+        parser.add_argument("--depth", type=int, default=3)
+
+    def handle(self, *args, **options):
+        site = FixtureSite(options["pages"], options["latency"])
+        cache_dir = tempfile.mkdtemp(prefix="crawl_bench_cache_")
+        base = {"HTTPCACHE_DIR": cache_dir, "CLOSESPIDER_PAGECOUNT": options["pages"] + 10, "LOG_LEVEL": "ERROR"}
+
+        runs = [
+            ("serial, no cache", {**base, "CONCURRENT_REQUESTS_PER_DOMAIN": 1, "AUTOTHROTTLE_ENABLED": False,
+                                  "HTTPCACHE_ENABLED": False}),
+            ("profile, cold cache", base),
+            ("profile, warm cache", base),
+        ]
+
+        try:
+            self.stdout.write(f"{'run':<22} {'pages':>6} {'requests':>9} {'seconds':>8} {'pages/s':>8}")
+            for label, overrides in runs:
+                hits_before = site.hits
+                start = time.perf_counter()
+                pages = sum(1 for _ in iter_crawled_pages(
+                    site.url, max_depth=options["depth"], provider=options["provider"], overrides=overrides
+                ))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:<22} {pages:>6} {site.hits - hits_before:>9} {elapsed:>8.2f} {pages / elapsed:>8.1f}"
+                )
+        finally:
+            site.stop()
+            shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,97 @@
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.documents.models import BulkIngestJob
+from services.bulk_ingest import bulk_ingest, load_manifest, plan_bulk_ingest, run_bulk_job, validate_entry
+
+
+class Command(BaseCommand):
+    help = (
+        "Register and ingest every document of a CSV or JSON manifest (columns/keys: title, url, "
+        "provider, version, sitemap_url, include_patterns, exclude_patterns). Documents already "
+        "registered are skipped unless --refresh; the rest are crawled concurrently and embedded "
+        "by one shared writer. --job runs a manifest queued through POST /api/documents/bulk/."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("manifest", nargs="?", help="Manifest file, or - for stdin")
+        parser.add_argument("--job", type=int, help="Run the queued bulk ingestion with this id instead of a manifest")
+        parser.add_argument("--format", choices=["csv", "json"], help="Manifest format (default: guessed from the content)")
+        parser.add_argument("--concurrency", type=int, default=settings.BULK_INGEST_CONCURRENCY, help="Documents crawled at once")
+        parser.add_argument("--refresh", action="store_true", help="Re-ingest documents that are already registered")
+        parser.add_argument("--dry-run", action="store_true", help="Only show which documents would be ingested or skipped")
+        parser.add_argument("--report", help="Also write the full report as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options["job"] is not None:
+            try:
+                report = run_bulk_job(options["job"], progress=self.progress)
+            except (BulkIngestJob.DoesNotExist, ValueError) as e:
+                raise CommandError(f"Could not run bulk ingestion {options['job']}: {e}")
+            self.summarize(report)
+            return
+        if not options["manifest"]:
+            raise CommandError("Pass a manifest file (or - for stdin), or --job")
+
+        try:
+            if options["manifest"] == "-":
+                content = sys.stdin.read()
+            else:
+                with open(options["manifest"], encoding="utf-8") as f:
+                    content = f.read()
+            entries = load_manifest(content, options["format"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read the manifest: {e}")
+
+        errors = [(i, entry.get("url"), error) for i, entry in enumerate(entries) if (error := validate_entry(entry))]
+        for i, url, error in errors:
+            self.stdout.write(f"⚠️ Document {i + 1} ({url or 'no url'}): {error}")
+        if errors:
+            raise CommandError(f"{len(errors)} invalid documents in the manifest; nothing was ingested.")
+
+        if options["dry_run"]:
+            todo, skipped = plan_bulk_ingest(entries, refresh=options["refresh"])
+            for entry in todo:
+                self.stdout.write(f"+ {entry['url']} ({entry['provider']})")
+            for skip in skipped:
+                self.stdout.write(f"- {skip['url']} ({skip['reason']})")
+            self.stdout.write(f"ℹ️ {len(todo)} to ingest, {len(skipped)} skipped")
+            return
+
+        report = bulk_ingest(entries, concurrency=options["concurrency"], refresh=options["refresh"], progress=self.progress)
+        self.summarize(report)
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=1, default=str)
+            self.stdout.write(f"ℹ️ Report written to {options['report']}")
+
+    def summarize(self, report: dict):
+        for skip in report["skipped"]:
+            self.stdout.write(f"ℹ️ Skipped {skip['url']} ({skip['reason']})")
+        self.stdout.write(
+            f"✅ {report['ingested']} ingested, {report['incomplete']} incomplete (run again to resume "
+            f"them), {report['failed']} failed, {len(report['skipped'])} skipped in {report['seconds']:.1f}s"
+        )
+        self.stdout.write(
+            f"ℹ️ {report['pages']} pages ({report['pages_unchanged']} unchanged), {report['chunks_embedded']} chunks "
+            f"embedded in {report['vector_writes']} writes ({report['chunks_per_write']} per write, "
+            f"{report['embedding_seconds']:.1f}s), {report['chunks_deduplicated']} deduplicated"
+        )
+        self.stdout.write(
+            f"ℹ️ {report['documents_per_minute']:.1f} documents/min, {report['pages_per_second']:.1f} pages/s, "
+            f"{report['chunks_per_second']:.1f} chunks/s with {report['concurrency']} concurrent crawls"
+        )
+
+    def progress(self, result: dict, done: int, total: int):
+        if result["status"] == "failed":
+            self.stdout.write(f"⚠️ {done}/{total} {result['url']}: failed ({result['error']})")
+            return
+        summary = result["summary"]
+        self.stdout.write(
+            f"⏳ {done}/{total} {result['url']}: {result['status']}, {summary['pages']} pages, "
+            f"{summary['chunks_embedded']} chunks embedded in {result['seconds']:.1f}s"
+        )
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.page_store import GC_GRACE_SECONDS, collect_garbage, diff_manifest, store_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Inspect and maintain the local page store: `stats` (size and compression), "
+        "`gc` (remove page texts nothing refers to) or `diff --url URL` (pages changed "
+        "between a document's last two crawls)."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["stats", "gc", "diff"])
+        parser.add_argument("--url", help="Document to diff")
+        parser.add_argument("--text", action="store_true", help="With diff: show the text changes of each changed page")
+        parser.add_argument("--grace", type=float, default=GC_GRACE_SECONDS, help="With gc: keep blobs younger than this many seconds")
+        parser.add_argument("--dry-run", action="store_true", help="With gc: only report what would be removed")
+
+    def handle(self, *args, **options):
+        getattr(self, options["action"])(options)
+
+    def stats(self, options):
+        stats = store_stats()
+        ratio = stats["text_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+        self.stdout.write(
+            f"ℹ️ {stats['blobs']} pages in {stats['stored_bytes'] / 1e6:.1f} MB "
+            f"({stats['text_bytes'] / 1e6:.1f} MB of text, {ratio:.1f}x), {stats['manifests']} document manifests"
+        )
+
+    def gc(self, options):
+        result = collect_garbage(options["grace"], dry_run=options["dry_run"])
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(
+            f"✅ {verb} {result['removed']} pages ({result['removed_bytes'] / 1e6:.1f} MB); "
+            f"kept {result['kept']} ({result['kept_bytes'] / 1e6:.1f} MB)"
+        )
+
+    def diff(self, options):
+        if not options["url"]:
+            raise CommandError("diff needs --url")
+        try:
+            diff = diff_manifest(options["url"], text=options["text"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if diff["previous_crawled_at"] is None:
+            self.stdout.write(f"ℹ️ Only one crawl of {options['url']} is recorded; every page counts as added.")
+        else:
+            self.stdout.write(
+                f"ℹ️ Crawl of {datetime.fromtimestamp(diff['crawled_at']):%Y-%m-%d %H:%M} against "
+                f"{datetime.fromtimestamp(diff['previous_crawled_at']):%Y-%m-%d %H:%M}"
+            )
+        self.stdout.write(
+            f"ℹ️ {len(diff['added'])} added, {len(diff['removed'])} removed, "
+            f"{len(diff['changed'])} changed, {diff['unchanged']} unchanged"
+        )
+        for label, pages in (("+", diff["added"]), ("-", diff["removed"]), ("~", diff["changed"])):
+            for page_url in pages:
+                self.stdout.write(f"{label} {page_url}")
+        for page_url, text in diff.get("diffs", {}).items():
+            self.stdout.write(f"\n=== {page_url}\n{text}")
@@ -1,8 +1,4 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-
-embedding = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)# Generated by Django 6.0 on 2025-12-30 05:17
+# Generated by Django 6.0 on 2025-12-30 05:17
 
 from django.db import migrations, models
 
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_alter_document_content_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk_id', models.CharField(help_text='Id of the chunk in the vector store', max_length=255, unique=True)),
+                ('provider', models.CharField(max_length=50)),
+                ('content_hash', models.CharField(db_index=True, help_text='SHA256 of the normalized chunk text', max_length=64)),
+                ('simhash', models.BigIntegerField(help_text='64-bit SimHash of the chunk text (signed)')),
+                ('band_0', models.IntegerField(db_index=True)),
+                ('band_1', models.IntegerField(db_index=True)),
+                ('band_2', models.IntegerField(db_index=True)),
+                ('band_3', models.IntegerField(db_index=True)),
+                ('owner_url', models.URLField(help_text='Document whose metadata the stored chunk carries')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChunkReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField(help_text='Document the page belongs to')),
+                ('page_url', models.URLField(max_length=1000)),
+                ('title', models.CharField(max_length=255)),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='references', to='documents.chunkfingerprint')),
+            ],
+            options={
+                'unique_together': {('fingerprint', 'source_url', 'page_url')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_chunkfingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='exclude_patterns',
+            field=models.JSONField(blank=True, default=list, help_text='Regular expressions; matching URLs are never crawled'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='include_patterns',
+            field=models.JSONField(blank=True, default=list, help_text='Regular expressions; when set, only matching URLs are crawled'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='sitemap_url',
+            field=models.URLField(blank=True, help_text='sitemap.xml (or sitemap index) to discover pages from; pages whose lastmod did not change are not re-fetched', null=True),
+        ),
+        migrations.CreateModel(
+            name='DocumentPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField(help_text='Document the page belongs to')),
+                ('page_url', models.URLField(max_length=1000)),
+                ('lastmod', models.DateTimeField(blank=True, help_text='lastmod from the sitemap when the page was crawled', null=True)),
+                ('page_hash', models.CharField(help_text="SHA256 hash of the page's cleaned content", max_length=64)),
+                ('chunk_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('source_url', 'page_url')},
+            },
+        ),
+    ]
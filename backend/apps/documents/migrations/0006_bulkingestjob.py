@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_document_crawl_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkIngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(default='queued', help_text='queued | running | done | failed', max_length=20)),
+                ('entries', models.JSONField(help_text='Validated manifest documents')),
+                ('concurrency', models.PositiveIntegerField()),
+                ('refresh', models.BooleanField(default=False)),
+                ('done', models.PositiveIntegerField(default=0, help_text='Documents finished so far')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Documents to ingest (skipped ones excluded)')),
+                ('report', models.JSONField(blank=True, help_text='Aggregate report, once done', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
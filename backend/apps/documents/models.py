@@ -30,8 +30,130 @@ class Document(models.Model):
         help_text="Whether document is already ingested into vector DB"
     )
 
+    sitemap_url = models.URLField(
+        blank=True,
+        null=True,
+        help_text="sitemap.xml (or sitemap index) to discover pages from; pages whose lastmod did not change are not re-fetched"
+    )
+
+    include_patterns = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Regular expressions; when set, only matching URLs are crawled"
+    )
+
+    exclude_patterns = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Regular expressions; matching URLs are never crawled"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} ({self.provider})"
+
+
+class DocumentPage(models.Model):
+    """
+    A page of a Document as of its last complete crawl.
+    Lets sitemap-driven crawls skip pages whose lastmod did not change.
+    """
+    source_url = models.URLField(help_text="Document the page belongs to")
+    page_url = models.URLField(max_length=1000)
+
+    lastmod = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="lastmod from the sitemap when the page was crawled"
+    )
+    page_hash = models.CharField(
+        max_length=64,
+        help_text="SHA256 hash of the page's cleaned content"
+    )
+    chunk_ids = models.JSONField(default=list)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("source_url", "page_url")
+
+    def __str__(self):
+        return self.page_url
+
+
+class ChunkFingerprint(models.Model):
+    """
+    Fingerprint of a chunk stored in the vector store.
+    Ingestion looks chunks up here before embedding, so text repeated across pages and
+    documents (exactly or nearly) is stored once and referenced by every page it appears on.
+    """
+    chunk_id = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Id of the chunk in the vector store"
+    )
+    provider = models.CharField(max_length=50)
+
+    content_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="SHA256 of the normalized chunk text"
+    )
+    simhash = models.BigIntegerField(help_text="64-bit SimHash of the chunk text (signed)")
+
+    # 16-bit bands of the SimHash; near-duplicates share at least one
+    band_0 = models.IntegerField(db_index=True)
+    band_1 = models.IntegerField(db_index=True)
+    band_2 = models.IntegerField(db_index=True)
+    band_3 = models.IntegerField(db_index=True)
+
+    owner_url = models.URLField(
+        help_text="Document whose metadata the stored chunk carries"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.chunk_id
+
+
+class ChunkReference(models.Model):
+    """A page on which a stored chunk's text appears."""
+    fingerprint = models.ForeignKey(
+        ChunkFingerprint,
+        on_delete=models.CASCADE,
+        related_name="references"
+    )
+    source_url = models.URLField(help_text="Document the page belongs to")
+    page_url = models.URLField(max_length=1000)
+    title = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ("fingerprint", "source_url", "page_url")
+
+    def __str__(self):
+        return f"{self.fingerprint.chunk_id} <- {self.page_url}"
+
+
+class BulkIngestJob(models.Model):
+    """
+    A manifest submitted to POST /api/documents/bulk/. It is ingested by a
+    `manage.py bulk_ingest --job <id>` process, outside the request that queued it.
+    """
+    status = models.CharField(max_length=20, default="queued", help_text="queued | running | done | failed")
+    entries = models.JSONField(help_text="Validated manifest documents")
+    concurrency = models.PositiveIntegerField()
+    refresh = models.BooleanField(default=False)
+
+    done = models.PositiveIntegerField(default=0, help_text="Documents finished so far")
+    total = models.PositiveIntegerField(default=0, help_text="Documents to ingest (skipped ones excluded)")
+    report = models.JSONField(blank=True, null=True, help_text="Aggregate report, once done")
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Bulk ingestion {self.pk} ({self.status})"
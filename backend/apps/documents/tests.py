@@ -1,3 +1,220 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.documents.models import BulkIngestJob, Document
+from services.bulk_ingest import fail_stale_jobs, load_manifest, plan_bulk_ingest, validate_entry
+from services.chunk_dedup import ChunkDeduplicator, chunk_signature
+from services.crawl_frontier import CrawlFrontier, canonicalize_url, url_key
+from services.fingerprint import hamming_distance
+
+DOC_URL = "https://docs.example.com/s3/"
+PAGE_URL = "https://docs.example.com/s3/bucket-policies"
+CHUNK = (
+    "To grant read access to a single bucket, attach a bucket policy with Effect Allow for the "
+    "s3:GetObject action on arn:aws:s3:::example-bucket/* to the principal of the reporting role. "
+    "Deny every other principal with an explicit statement, keep Block Public Access enabled on the "
+    "account and on the bucket, and enable server access logging so that every read of the objects "
+    "is recorded in a separate log bucket that the reporting role cannot modify or delete. Review the "
+    "policy with IAM Access Analyzer before deploying it and after every change to the role."
+)
+# One word changed, yet within 3 SimHash bits of CHUNK
+EDITED_CHUNK = CHUNK.replace("s3:GetObject", "s3:PutObject")
+
+
+class ChunkDeduplicatorTests(TestCase):
+    def ingest(self, text: str, source_url: str = DOC_URL, max_distance: int | None = None) -> str | None:
+        """Runs one chunk through a fresh ingestion's deduplicator; returns the duplicate found, if any."""
+        deduplicator = ChunkDeduplicator("aws", source_url, "S3 guide", max_distance=max_distance)
+        duplicate_id, signature = deduplicator.find(text, PAGE_URL)
+        if duplicate_id is None:
+            deduplicator.add(f"chunk-{signature[0][:8]}", signature, PAGE_URL)
+        deduplicator.flush()
+        return duplicate_id
+
+    def test_one_word_edit_on_reingest_stores_the_new_text(self):
+        self.assertLessEqual(hamming_distance(chunk_signature(CHUNK)[1], chunk_signature(EDITED_CHUNK)[1]), 3)
+        self.assertIsNone(self.ingest(CHUNK, max_distance=3))
+
+        self.assertIsNone(self.ingest(EDITED_CHUNK, max_distance=3))
+
+    def test_unchanged_text_on_reingest_is_reused(self):
+        self.assertIsNone(self.ingest(CHUNK, max_distance=3))
+
+        self.assertEqual(self.ingest(CHUNK, max_distance=3), f"chunk-{chunk_signature(CHUNK)[0][:8]}")
+
+    @override_settings(CHUNK_NEAR_DUPLICATE_DISTANCE=0)
+    def test_near_duplicates_of_other_documents_are_only_merged_when_enabled(self):
+        self.ingest(CHUNK)
+        other_url = "https://docs.example.com/other/"
+
+        self.assertIsNone(ChunkDeduplicator("aws", other_url, "Other").find(EDITED_CHUNK, PAGE_URL)[0])
+        self.assertIsNotNone(
+            ChunkDeduplicator("aws", other_url, "Other", max_distance=3).find(EDITED_CHUNK, PAGE_URL)[0]
+        )
+
+
+class CanonicalizeUrlTests(SimpleTestCase):
+    def test_scheme_host_and_default_port_are_normalized(self):
+        self.assertEqual(canonicalize_url("HTTPS://Docs.Example.COM:443/s3/"), "https://docs.example.com/s3/")
+        self.assertEqual(canonicalize_url("http://docs.example.com:8080"), "http://docs.example.com:8080/")
+
+    def test_fragment_and_tab_tracking_language_parameters_are_dropped(self):
+        self.assertEqual(
+            canonicalize_url("https://docs.example.com/s3/acl?b=2&utm_source=mail&a=1&tab=cli&hl=fr#grants"),
+            "https://docs.example.com/s3/acl?a=1&b=2",
+        )
+        self.assertEqual(canonicalize_url("https://docs.example.com/s3/acl?q=&a=1"), "https://docs.example.com/s3/acl?a=1&q=")
+
+    def test_duplicate_slashes_are_collapsed_and_the_trailing_slash_kept(self):
+        self.assertEqual(canonicalize_url("https://docs.example.com//s3///acl/"), "https://docs.example.com/s3/acl/")
+
+    def test_url_key_ignores_the_trailing_slash(self):
+        self.assertEqual(url_key("https://docs.example.com/s3/acl/"), url_key("https://Docs.example.com/s3/acl#top"))
+        self.assertEqual(url_key("https://docs.example.com/"), "https://docs.example.com/")
+
+
+class CrawlFrontierAdmitTests(SimpleTestCase):
+    START = "https://docs.example.com/en-us/guide/"
+
+    def frontier(self, **rules) -> CrawlFrontier:
+        return CrawlFrontier(self.START, max_distance=3, **rules)
+
+    def test_new_links_are_admitted_in_canonical_form_once(self):
+        frontier = self.frontier()
+
+        self.assertEqual(frontier.admit(f"{self.START}iam?tab=cli#roles"), f"{self.START}iam")
+        self.assertIsNone(frontier.admit(f"{self.START}iam/"))
+        self.assertIsNone(frontier.admit("HTTPS://DOCS.example.com/en-us/guide"))  # the start page
+        self.assertEqual(frontier.stats["duplicate_urls_skipped"], 2)
+
+    def test_non_http_links_are_not_admitted(self):
+        frontier = self.frontier()
+
+        for link in ("mailto:security@example.com", "javascript:void(0)", "ftp://docs.example.com/guide.pdf"):
+            self.assertIsNone(frontier.admit(link))
+
+    def test_other_locales_of_the_start_page_are_skipped(self):
+        frontier = self.frontier()
+
+        self.assertIsNone(frontier.admit("https://docs.example.com/fr-fr/guide/iam"))
+        self.assertEqual(frontier.admit("https://docs.example.com/en-us/guide/s3"), "https://docs.example.com/en-us/guide/s3")
+        self.assertEqual(frontier.stats["other_locale_skipped"], 1)
+
+    def test_include_and_exclude_patterns_apply_to_the_canonical_url(self):
+        frontier = self.frontier(include_patterns=[r"/guide/"], exclude_patterns=[r"/guide/archive/", r"[?&]page="])
+
+        self.assertIsNone(frontier.admit("https://docs.example.com/en-us/blog/launch"))
+        self.assertIsNone(frontier.admit(f"{self.START}archive/2019"))
+        self.assertIsNone(frontier.admit(f"{self.START}iam?page=2"))
+        # Dropped parameters don't count against the rules
+        self.assertEqual(frontier.admit(f"{self.START}s3?utm_source=page=2"), f"{self.START}s3")
+        self.assertEqual(frontier.stats["excluded_by_rules"], 3)
+
+    def test_a_restored_frontier_remembers_the_links_already_admitted(self):
+        frontier = self.frontier()
+        frontier.admit(f"{self.START}iam")
+
+        resumed = self.frontier()
+        resumed.restore(frontier.snapshot())
+        self.assertIsNone(resumed.admit(f"{self.START}iam/"))
+        self.assertEqual(resumed.stats["duplicate_urls_skipped"], 1)
+
+
+class ManifestTests(SimpleTestCase):
+    ENTRY = {"title": "S3 guide", "url": DOC_URL, "provider": "aws"}
+
+    def test_json_manifest_is_a_list_or_a_documents_object(self):
+        self.assertEqual(load_manifest(json.dumps([self.ENTRY])), [self.ENTRY])
+        self.assertEqual(load_manifest(json.dumps({"documents": [self.ENTRY]})), [self.ENTRY])
+        with self.assertRaises(ValueError):
+            load_manifest(json.dumps({"url": DOC_URL}))
+        with self.assertRaises(ValueError):
+            load_manifest("[1, 2]", fmt="json")
+
+    def test_csv_manifest_splits_patterns_and_blanks_empty_cells(self):
+        entries = load_manifest(
+            "title,url,provider,version,include_patterns\n"
+            f"S3 guide,{DOC_URL},aws,, /s3/  /iam/ \n"
+            f"IAM guide,{PAGE_URL},aws,2024,\n"
+        )
+
+        self.assertEqual(entries[0]["include_patterns"], ["/s3/", "/iam/"])
+        self.assertIsNone(entries[0]["version"])
+        self.assertIsNone(entries[0]["exclude_patterns"])
+        self.assertEqual(entries[1]["version"], "2024")
+        self.assertIsNone(entries[1]["include_patterns"])
+
+    def test_validate_entry(self):
+        self.assertIsNone(validate_entry({**self.ENTRY, "include_patterns": [r"/s3/\w+"]}))
+        self.assertIn("required", validate_entry({"url": DOC_URL, "provider": "aws"}))
+        self.assertIn("must be a list", validate_entry({**self.ENTRY, "exclude_patterns": "/blog/"}))
+        self.assertIn("Invalid pattern", validate_entry({**self.ENTRY, "include_patterns": ["/s3/("]}))
+
+
+class PlanBulkIngestTests(TestCase):
+    def entry(self, url: str) -> dict:
+        return {"title": "Guide", "url": url, "provider": "aws"}
+
+    def test_duplicates_in_the_manifest_are_compared_in_canonical_form(self):
+        todo, skipped = plan_bulk_ingest([self.entry(DOC_URL), self.entry("HTTPS://docs.example.com/s3#intro")])
+
+        self.assertEqual([e["url"] for e in todo], [DOC_URL])
+        self.assertEqual(skipped, [{"url": "HTTPS://docs.example.com/s3#intro", "reason": "duplicate in manifest"}])
+
+    def test_registered_documents_are_skipped_unless_refreshed(self):
+        Document.objects.create(title="S3", source_url=DOC_URL, provider="aws", content_hash="x")
+        variant = "https://docs.example.com/s3?utm_source=mail"
+
+        todo, skipped = plan_bulk_ingest([self.entry(variant)])
+        self.assertEqual((todo, skipped), ([], [{"url": variant, "reason": "already registered"}]))
+
+        # Refreshed under the URL it was registered with, so no second Document is created
+        todo, skipped = plan_bulk_ingest([self.entry(variant)], refresh=True)
+        self.assertEqual(([e["url"] for e in todo], skipped), ([DOC_URL], []))
+
+
+@override_settings(BULK_JOB_STALE_AFTER=180, BULK_INGEST_CONCURRENCY=4)
+class BulkIngestJobTests(TestCase):
+    def job(self, status: str, age: int) -> BulkIngestJob:
+        job = BulkIngestJob.objects.create(entries=[], concurrency=1, status=status)
+        BulkIngestJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(seconds=age))
+        return job
+
+    def test_jobs_without_a_heartbeat_are_marked_failed(self):
+        dead = self.job("running", age=600)
+        never_started = self.job("queued", age=600)
+        alive = self.job("running", age=30)
+        done = self.job("done", age=600)
+
+        self.assertEqual(fail_stale_jobs(), 2)
+        statuses = dict(BulkIngestJob.objects.values_list("pk", "status"))
+        self.assertEqual(
+            [statuses[j.pk] for j in (dead, never_started, alive, done)], ["failed", "failed", "running", "done"]
+        )
+
+    def test_reading_a_job_reports_a_dead_process(self):
+        dead = self.job("running", age=600)
+
+        response = self.client.get(f"/api/documents/bulk/{dead.pk}/")
+        self.assertEqual(response.json()["status"], "failed")
+        self.assertIn("no heartbeat", response.json()["error"])
+
+    def test_concurrency_must_be_positive(self):
+        documents = [{"title": "S3 guide", "url": DOC_URL, "provider": "aws"}]
+        with mock.patch("apps.documents.views.start_bulk_job") as start:
+            for concurrency in (0, -2, "many"):
+                response = self.client.post(
+                    "/api/documents/bulk/", {"documents": documents, "concurrency": concurrency}, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 400, concurrency)
+
+            start.return_value = BulkIngestJob(pk=1, status="queued")
+            response = self.client.post(
+                "/api/documents/bulk/", {"documents": documents, "concurrency": 99}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(start.call_args.kwargs["concurrency"], 4)
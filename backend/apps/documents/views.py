@@ -1,27 +1,41 @@
+from django.conf import settings
+from django.db.models import F
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
 
+from services.bulk_ingest import fail_stale_jobs, load_manifest, start_bulk_job, validate_entry
 from services.ingestion import ingest_document, delete_document
-from .models import Document
+from .models import BulkIngestJob, Document
+
+class DocumentPagination(LimitOffsetPagination):
+    # Without ?limit= the whole list is returned, as the frontend expects
+    default_limit = None
+    max_limit = settings.DOCUMENTS_MAX_PAGE_SIZE
+
 
 class DocumentViewSet(ViewSet):
     def list(self, request):
-        documents = Document.objects.all().order_by('-created_at')
-        data = [
-            {
-                "id": doc.id,
-                "title": doc.title,
-                "url": doc.source_url,
-                "provider": doc.provider,
-                "version": doc.version,
-                "is_indexed": doc.is_indexed,
-                "created_at": doc.created_at
-            }
-            for doc in documents
-        ]
-        return Response(data)
+        # Only the listed columns, as dicts: no content hashes, no model instances
+        documents = Document.objects.order_by('-created_at', '-id').values(
+            "id",
+            "title",
+            "provider",
+            "version",
+            "is_indexed",
+            "sitemap_url",
+            "include_patterns",
+            "exclude_patterns",
+            "created_at",
+            url=F("source_url"),
+        )
+        paginator = DocumentPagination()
+        page = paginator.paginate_queryset(documents, request, view=self)
+        if page is None:
+            return Response(list(documents))
+        return paginator.get_paginated_response(page)
 
     def create(self, request):
         #getting input from the user as json
@@ -29,16 +43,29 @@ class DocumentViewSet(ViewSet):
         url = request.data.get("url")
         provider = request.data.get("provider")
         version = request.data.get("version")
+        # Optional crawl rules
+        sitemap_url = request.data.get("sitemap_url")
+        include_patterns = request.data.get("include_patterns")
+        exclude_patterns = request.data.get("exclude_patterns")
 
-        if not title or not url or not provider:
-            return Response(
-                {"error": "title, url, provider are required"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        error = validate_entry({
+            "title": title,
+            "url": url,
+            "provider": provider,
+            "include_patterns": include_patterns,
+            "exclude_patterns": exclude_patterns,
+        })
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
         #calling the ingest function 
         try:
-            ingest_document(title, url, provider, version)
+            summary = ingest_document(
+                title, url, provider, version,
+                sitemap_url=sitemap_url,
+                include_patterns=include_patterns,
+                exclude_patterns=exclude_patterns,
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -46,10 +73,63 @@ class DocumentViewSet(ViewSet):
             )
 
         return Response(
-            {"message": "Document ingested successfully or skipped if unchanged"},
+            {"message": "Document ingested successfully or skipped if unchanged", "summary": summary},
             status=status.HTTP_201_CREATED
         )
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Registers and ingests many documents: a JSON list of documents (or {"documents": [...],
+        "concurrency": n, "refresh": bool}), or a CSV/JSON file uploaded as "manifest".
+        The manifest is validated here and ingested by a background job; the answer (202) has
+        its id, and GET bulk/<id>/ its progress and, once done, the aggregate report.
+        """
+        options = request.data if isinstance(request.data, dict) else {}
+        try:
+            if "manifest" in request.FILES:
+                entries = load_manifest(request.FILES["manifest"].read().decode("utf-8"))
+            elif isinstance(request.data, list):
+                entries = request.data
+            else:
+                entries = options.get("documents")
+            if not isinstance(entries, list) or not entries or not all(isinstance(e, dict) for e in entries):
+                raise ValueError("Send a non-empty list of documents, or a manifest file")
+            # Clients may lower the number of concurrent crawls, not raise it
+            concurrency = settings.BULK_INGEST_CONCURRENCY
+            if options.get("concurrency") not in (None, ""):
+                requested = int(options["concurrency"])
+                if requested < 1:
+                    raise ValueError("concurrency must be at least 1")
+                concurrency = min(requested, concurrency)
+        except (TypeError, ValueError, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = [
+            {"index": i, "url": entry.get("url"), "error": error}
+            for i, entry in enumerate(entries)
+            if (error := validate_entry(entry))
+        ]
+        if errors:
+            return Response({"error": "Invalid documents in the manifest", "documents": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        refresh = str(options.get("refresh", "")).lower() in ("true", "1", "yes")
+        job = start_bulk_job(entries, concurrency=concurrency, refresh=refresh)
+        return Response(
+            {"job": job.pk, "status": job.status, "documents": len(entries), "url": f"{request.path.rstrip('/')}/{job.pk}/"},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=False, methods=["get"], url_path=r"bulk/(?P<job_id>[0-9]+)")
+    def bulk_job(self, request, job_id=None):
+        fail_stale_jobs()
+        job = BulkIngestJob.objects.filter(pk=job_id).values(
+            "id", "status", "done", "total", "concurrency", "refresh", "error", "report", "created_at", "updated_at"
+        ).first()
+        if job is None:
+            return Response({"error": "Bulk ingestion not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
+
     def destroy(self, request, pk=None):
         try:
             doc = Document.objects.get(pk=pk)
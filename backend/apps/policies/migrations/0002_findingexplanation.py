@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FindingExplanation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue', models.CharField(max_length=255)),
+                ('severity', models.CharField(max_length=20)),
+                ('provider', models.CharField(max_length=50)),
+                ('prompt_hash', models.CharField(help_text='SHA256 of the explain prompt template', max_length=64)),
+                ('retrieval_generation', models.CharField(help_text="Fingerprint of the provider's indexed documents when generated", max_length=64)),
+                ('explanation', models.TextField()),
+                ('sources', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('issue', 'severity', 'provider', 'prompt_hash', 'retrieval_generation')},
+            },
+        ),
+    ]
@@ -15,3 +15,33 @@ class Policy(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class FindingExplanation(models.Model):
+    """
+    Cached LLM explanation of a rule finding.
+    Valid for as long as the prompt and the provider's indexed documents are unchanged.
+    """
+    issue = models.CharField(max_length=255)
+    severity = models.CharField(max_length=20)
+    provider = models.CharField(max_length=50)
+
+    prompt_hash = models.CharField(
+        max_length=64,
+        help_text="SHA256 of the explain prompt template"
+    )
+    retrieval_generation = models.CharField(
+        max_length=64,
+        help_text="Fingerprint of the provider's indexed documents when generated"
+    )
+
+    explanation = models.TextField()
+    sources = models.JSONField(default=list)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("issue", "severity", "provider", "prompt_hash", "retrieval_generation")
+
+    def __str__(self):
+        return f"{self.issue} ({self.provider})"
@@ -3,7 +3,7 @@ from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from services.Demo_Policy_funs.policy_analyzer import analyze_policy
-from services.Demo_Policy_funs.policy_explainer import explain_finding
+from services.Demo_Policy_funs.policy_explainer import explain_findings
 from services.Demo_Policy_funs.policy_fixer import generate_safe_policy
 from services.Demo_Policy_funs.policy_diff import diff_policies
 
@@ -35,11 +35,8 @@ class PolicyAnalysisViewSet(ViewSet):
         #Generate safer version
         safe_policy = generate_safe_policy(policy)
 
-        #Explain findings
-        explained_findings = [
-            explain_finding(finding, provider)
-            for finding in findings
-        ]
+        #Explain findings (deduplicated by issue, explained concurrently)
+        explained_findings = explain_findings(findings, provider)
 
         #Diff original vs fixed
         policy_diff = diff_policies(
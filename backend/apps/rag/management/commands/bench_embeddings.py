@@ -0,0 +1,181 @@
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from services.vectorstores import MIGRATE_BATCH, partitioned_providers, provider_collection
+
+WORDS = (
+    "iam policy role permission bucket access least privilege audit key encryption network firewall "
+    "identity token secret condition principal resource action storage compute region logging "
+    "retention backup rotation public private endpoint service account group user deny allow"
+).split()
+
+# One backend, in a fresh interpreter so its RSS and imports are its own
+PROBE = r"""
+import json, os, sys, time
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django.setup()
+import numpy as np
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith("VmRSS")) / 1024
+
+
+args = json.loads(sys.argv[1])
+corpus = json.loads(open(args["corpus"]).read())
+queries = json.loads(open(args["queries"]).read())
+
+before = rss_mb()
+start = time.perf_counter()
+from services.embeddings import load_embeddings
+embeddings = load_embeddings(args["backend"])
+embeddings.embed_query("warm up")
+load = time.perf_counter() - start
+
+start = time.perf_counter()
+corpus_vectors = np.asarray(embeddings.embed_documents(corpus), dtype="float32")
+encode = time.perf_counter() - start
+
+latencies, query_vectors = [], []
+for query in queries:
+    start = time.perf_counter()
+    query_vectors.append(embeddings.embed_query(query))
+    latencies.append(time.perf_counter() - start)
+
+np.save(args["out"] + "-corpus.npy", corpus_vectors)
+np.save(args["out"] + "-queries.npy", np.asarray(query_vectors, dtype="float32"))
+print(json.dumps({
+    "load": load, "encode": encode, "latencies": latencies[args["warmup"]:],
+    "rss_mb": rss_mb() - before, "torch": "torch" in sys.modules,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare embedding backends: load time, encode throughput, query latency (p50/p99), "
+        "RSS, and how much the vectors and top-k retrieval drift from the first backend."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", default="torch,onnx", help="Comma separated; the first one is the reference")
+        parser.add_argument("--chunks", type=int, default=2000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--from-store", action="store_true", help="Sample chunk texts from the vector store instead of generating them")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        corpus = self.stored_chunks(options["chunks"], rng) if options["from_store"] else self.synthetic_chunks(options["chunks"], rng)
+        # Queries: a few words picked from random chunks, like a short user question
+        queries = []
+        for _ in range(options["queries"]):
+            words = rng.choice(corpus).split()
+            offset = rng.randrange(max(len(words) - 8, 1))
+            queries.append(" ".join(words[offset:offset + rng.randint(3, 8)]))
+
+        workdir = tempfile.mkdtemp(prefix="bench_embeddings_")
+        try:
+            with open(f"{workdir}/corpus.json", "w") as f:
+                json.dump(corpus, f)
+            with open(f"{workdir}/queries.json", "w") as f:
+                json.dump(queries, f)
+            backends = [b.strip() for b in options["backends"].split(",") if b.strip()]
+            rows = [self.measure(backend, workdir, options) for backend in backends]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(f"{len(corpus)} chunks (avg {np.mean([len(c) for c in corpus]):.0f} chars), {len(queries)} queries, k={options['k']}")
+        self.stdout.write(
+            f"{'backend':<8} {'load (s)':>8} {'chunks/s':>9} {'q p50 ms':>9} {'q p99 ms':>9} {'RSS (MB)':>9} "
+            f"{'torch':>6} {'cosine':>7} {'recall@k':>8} {'mixed@k':>8}"
+        )
+        reference = rows[0]
+        for row in rows:
+            drift = self.drift(reference, row, options["k"])
+            self.stdout.write(
+                f"{row['backend']:<8} {row['load']:>8.2f} {len(corpus) / row['encode']:>9.1f} {row['p50']:>9.2f} "
+                f"{row['p99']:>9.2f} {row['rss_mb']:>9.1f} {'yes' if row['torch'] else 'no':>6} "
+                f"{drift['cosine']:>7.4f} {drift['recall']:>8.3f} {drift['mixed']:>8.3f}"
+            )
+        self.stdout.write(
+            "cosine: mean similarity of each chunk vector to the reference one; recall@k: overlap of top-k "
+            "with the reference; mixed@k: the same with this backend's queries against reference chunk "
+            "vectors (a store not re-embedded)"
+        )
+
+    def measure(self, backend: str, workdir: str, options: dict) -> dict:
+        probe_args = {
+            "backend": backend,
+            "corpus": f"{workdir}/corpus.json",
+            "queries": f"{workdir}/queries.json",
+            "out": f"{workdir}/{backend}",
+            "warmup": min(10, options["queries"] // 10),
+        }
+        self.stdout.write(f"⏳ Measuring {backend}...")
+        proc = subprocess.run(
+            [sys.executable, "-c", PROBE, json.dumps(probe_args)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise RuntimeError(f"{backend} probe failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        latencies = np.array(result["latencies"]) * 1000
+        return {
+            **result,
+            "backend": backend,
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99)),
+            "corpus_vectors": np.load(f"{workdir}/{backend}-corpus.npy"),
+            "query_vectors": np.load(f"{workdir}/{backend}-queries.npy"),
+        }
+
+    @staticmethod
+    def drift(reference: dict, row: dict, k: int) -> dict:
+        def top_k(corpus_vectors, query_vectors):
+            scores = query_vectors @ corpus_vectors.T
+            return [set(ids) for ids in np.argsort(-scores, axis=1)[:, :k]]
+
+        truth = top_k(reference["corpus_vectors"], reference["query_vectors"])
+        own = top_k(row["corpus_vectors"], row["query_vectors"])
+        mixed = top_k(reference["corpus_vectors"], row["query_vectors"])
+        return {
+            "cosine": float(np.mean(np.sum(reference["corpus_vectors"] * row["corpus_vectors"], axis=1))),
+            "recall": float(np.mean([len(a & b) / k for a, b in zip(truth, own)])),
+            "mixed": float(np.mean([len(a & b) / k for a, b in zip(truth, mixed)])),
+        }
+
+    @staticmethod
+    def synthetic_chunks(count: int, rng: random.Random) -> list[str]:
+        return [
+            ". ".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))) for _ in range(rng.randint(4, 9)))
+            for _ in range(count)
+        ]
+
+    @staticmethod
+    def stored_chunks(count: int, rng: random.Random) -> list[str]:
+        texts = []
+        for provider in partitioned_providers():
+            collection = provider_collection(provider)
+            offset = 0
+            while True:
+                batch = collection.get(include=["documents"], limit=MIGRATE_BATCH, offset=offset)
+                if not batch["ids"]:
+                    break
+                texts.extend(batch["documents"])
+                offset += len(batch["ids"])
+        if not texts:
+            raise ValueError("The vector store has no chunks; drop --from-store to use generated text")
+        return rng.sample(texts, min(count, len(texts)))
@@ -0,0 +1,223 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROVIDERS = ["aws", "gcp", "azure"]
+DIM = 384  # all-MiniLM-L6-v2
+
+# Query phase of one backend, run in a fresh interpreter so its RSS only holds that backend
+PROBE = r"""
+import json, os, sys, time
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django.setup()
+import numpy as np
+from django.conf import settings
+
+args = json.loads(sys.argv[1])
+queries = np.load(args["queries"])
+providers = json.loads(open(args["providers"]).read())
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith("VmRSS")) / 1024
+
+
+before = rss_mb()
+if args["backend"] == "chroma:filtered":
+    import chromadb
+    collection = chromadb.PersistentClient(path=args["chroma_dir"]).get_collection("langchain")
+    def search(q, provider):
+        return collection.query(query_embeddings=[q], n_results=args["k"], where={"provider": provider})["ids"][0]
+elif args["backend"] == "chroma:partitioned":
+    import chromadb
+    client = chromadb.PersistentClient(path=args["chroma_dir"])
+    collections = {p: client.get_collection(f"provider_{p}") for p in set(providers)}
+    def search(q, provider):
+        return collections[provider].query(query_embeddings=[q], n_results=args["k"])["ids"][0]
+else:
+    settings.FAISS_INDEX_DIR = args["faiss_dir"]
+    settings.FAISS_RESCORE_FACTOR = args["rescore"]
+    from services.faiss_index import search as faiss_search
+    collections = dict.fromkeys(providers)
+    if args["rescore"] > 1:
+        import chromadb
+        client = chromadb.PersistentClient(path=args["chroma_dir"])
+        collections = {p: client.get_collection(f"provider_{p}") for p in set(providers)}
+    def search(q, provider):
+        return [chunk_id for chunk_id, _ in faiss_search(provider, q, args["k"], collections[provider])]
+
+latencies, results = [], []
+for i, q in enumerate(queries):
+    start = time.perf_counter()
+    ids = search(q, providers[i])
+    latencies.append(time.perf_counter() - start)
+    results.append(ids)
+print(json.dumps({"latencies": latencies[args["warmup"]:], "results": results, "rss_mb": rss_mb() - before}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare retrieval latency (p50/p99), recall and memory of a single filtered Chroma "
+        "collection, per-provider Chroma collections and the FAISS mirrors on synthetic "
+        "collections of increasing size."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000", help="Comma separated chunk counts, e.g. 10000,100000,1000000")
+        parser.add_argument("--types", default="flat,hnsw,hnsw_fp16,ivfpq", help="FAISS index types to compare")
+        parser.add_argument("--queries", type=int, default=300)
+        parser.add_argument("--k", type=int, default=5)
+        parser.add_argument("--rescore", type=int, default=4, help="Candidates per result re-scored for compressed types")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rows = []
+        for size in [int(s) for s in options["sizes"].split(",") if s.strip()]:
+            workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+            try:
+                rows.extend(self.run_size(size, workdir, options))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(
+            f"{'chunks':>9} {'backend':<24} {'build (s)':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+            f"{'recall@k':>8} {'RSS (MB)':>9} {'disk (MB)':>9} {'MB per 1M':>9}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['size']:>9} {row['backend']:<24} {row['build']:>9.1f} {row['p50']:>9.2f} {row['p99']:>9.2f} "
+                f"{row['recall']:>8.3f} {row['rss_mb']:>9.1f} {row['disk_mb']:>9.1f} {row['disk_mb'] / row['size'] * 1e6:>9.0f}"
+            )
+
+    def run_size(self, size: int, workdir: str, options: dict) -> list[dict]:
+        import chromadb
+
+        from services.faiss_index import COMPRESSED_KINDS, rebuild_provider_index
+        from services.vectorstores import LEGACY_COLLECTION, collection_name
+
+        rng = np.random.default_rng(options["seed"])
+        # Clustered vectors, closer to sentence embeddings than uniform noise
+        centers = rng.standard_normal((max(size // 200, 8), DIM)).astype("float32")
+        vectors = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.standard_normal((size, DIM)).astype("float32")
+        providers = [PROVIDERS[i % len(PROVIDERS)] for i in range(size)]
+
+        # The same chunks stored both ways: one collection filtered by provider, and one per provider
+        filtered = chromadb.PersistentClient(path=f"{workdir}/chroma_filtered").create_collection(LEGACY_COLLECTION)
+        self.stdout.write(f"⏳ Loading {size} chunks into one Chroma collection...")
+        start = time.perf_counter()
+        for s in range(0, size, 5000):
+            filtered.add(
+                ids=[f"c{i}" for i in range(s, min(s + 5000, size))],
+                embeddings=vectors[s:s + 5000],
+                metadatas=[{"provider": p} for p in providers[s:s + 5000]],
+            )
+        filtered_build = time.perf_counter() - start
+
+        partitioned_client = chromadb.PersistentClient(path=f"{workdir}/chroma_partitioned")
+        self.stdout.write(f"⏳ Loading {size} chunks into per-provider Chroma collections...")
+        start = time.perf_counter()
+        partitions = {}
+        for provider in PROVIDERS:
+            positions = [i for i in range(size) if providers[i] == provider]
+            partitions[provider] = partitioned_client.create_collection(collection_name(provider))
+            for s in range(0, len(positions), 5000):
+                rows = positions[s:s + 5000]
+                partitions[provider].add(
+                    ids=[f"c{i}" for i in rows],
+                    embeddings=vectors[rows],
+                    metadatas=[{"provider": provider}] * len(rows),
+                )
+        partitioned_build = time.perf_counter() - start
+
+        # Queries near stored chunks, each with one provider filter; exact neighbours for recall
+        picks = rng.integers(0, size, options["queries"])
+        queries = vectors[picks] + 0.2 * rng.standard_normal((len(picks), DIM)).astype("float32")
+        query_providers = [providers[i] for i in picks]
+        np.save(f"{workdir}/queries.npy", queries)
+        with open(f"{workdir}/providers.json", "w") as f:
+            json.dump(query_providers, f)
+        exact = self.exact_neighbours(vectors, providers, queries, query_providers, options["k"])
+
+        rows = [
+            self.measure("chroma:filtered", size, filtered_build, exact, workdir, options, chroma_dir=f"{workdir}/chroma_filtered"),
+            self.measure("chroma:partitioned", size, partitioned_build, exact, workdir, options, chroma_dir=f"{workdir}/chroma_partitioned"),
+        ]
+        original = (settings.FAISS_INDEX_DIR, settings.FAISS_INDEX_TYPE, settings.FAISS_EXACT_BELOW)
+        try:
+            # Measure the requested index type at every size, even where ingestion would use a flat index
+            settings.FAISS_EXACT_BELOW = 0
+            for index_type in [t.strip() for t in options["types"].split(",") if t.strip()]:
+                faiss_dir = f"{workdir}/faiss_{index_type}"
+                settings.FAISS_INDEX_DIR, settings.FAISS_INDEX_TYPE = faiss_dir, index_type
+                self.stdout.write(f"⏳ Building {index_type} mirrors...")
+                start = time.perf_counter()
+                for provider in PROVIDERS:
+                    rebuild_provider_index(partitions[provider], provider)
+                build = time.perf_counter() - start
+                rows.append(self.measure(f"faiss:{index_type}", size, build, exact, workdir, options, faiss_dir=faiss_dir))
+                if index_type in COMPRESSED_KINDS:
+                    # Same index, candidates re-scored against the embeddings of the partitioned store
+                    rows.append(self.measure(
+                        f"faiss:{index_type}+rescore", size, build, exact, workdir, options,
+                        faiss_dir=faiss_dir, chroma_dir=f"{workdir}/chroma_partitioned", rescore=options["rescore"],
+                    ))
+        finally:
+            settings.FAISS_INDEX_DIR, settings.FAISS_INDEX_TYPE, settings.FAISS_EXACT_BELOW = original
+        return rows
+
+    def exact_neighbours(self, vectors, providers, queries, query_providers, k) -> list[set]:
+        providers = np.array(providers)
+        neighbours = []
+        for q, provider in zip(queries, query_providers):
+            candidates = np.flatnonzero(providers == provider)
+            distances = ((vectors[candidates] - q) ** 2).sum(axis=1)
+            neighbours.append({f"c{i}" for i in candidates[np.argsort(distances)[:k]]})
+        return neighbours
+
+    def measure(self, backend, size, build, exact, workdir, options, chroma_dir=None, faiss_dir=None, rescore=1) -> dict:
+        probe_args = {
+            "backend": backend,
+            "chroma_dir": chroma_dir,
+            "faiss_dir": faiss_dir,
+            "rescore": rescore,
+            "queries": f"{workdir}/queries.npy",
+            "providers": f"{workdir}/providers.json",
+            "k": options["k"],
+            "warmup": min(20, options["queries"] // 10),
+        }
+        proc = subprocess.run(
+            [sys.executable, "-c", PROBE, json.dumps(probe_args)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        latencies = np.array(result["latencies"]) * 1000
+        recall = np.mean([len(set(ids) & truth) / len(truth) for ids, truth in zip(result["results"], exact)])
+        return {
+            "size": size,
+            "backend": backend,
+            "build": build,
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99)),
+            "recall": float(recall),
+            "rss_mb": result["rss_mb"],
+            "disk_mb": self.disk_mb(faiss_dir or chroma_dir),
+        }
+
+    @staticmethod
+    def disk_mb(path: str) -> float:
+        total = 0
+        for root, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return total / 1024 / 1024
@@ -0,0 +1,135 @@
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# (method, path, JSON body) per scenario; none of them need Ollama or the embedding model
+SCENARIOS = {
+    "health": ("GET", "/api/health/", None),
+    "documents": ("GET", "/api/documents/", None),
+    # NDJSON stream through the same view and response type as a deliberation
+    "stream": ("POST", "/api/rag/stream/", {"query": "hi"}),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode: str, port: int) -> list[str]:
+    if mode == "runserver":
+        return [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload"]
+    if mode == "gunicorn":
+        return [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}", "backend.wsgi:application",
+        ]
+    raise CommandError(f"Unknown server mode: {mode}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app under runserver and/or gunicorn (gunicorn.conf.py) on a local port and "
+        "compare throughput and latency of the same request mix."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", default="runserver,gunicorn", help="Comma separated: runserver, gunicorn")
+        parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="documents")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--workers", type=int, help="gunicorn workers (default: WEB_CONCURRENCY / gunicorn.conf.py)")
+        parser.add_argument("--startup-timeout", type=float, default=120.0)
+
+    def handle(self, *args, **options):
+        rows = []
+        for mode in [m.strip() for m in options["servers"].split(",") if m.strip()]:
+            rows.append((mode, *self.run_server(mode, options)))
+
+        self.stdout.write(
+            f"{'server':<10} {'startup (s)':>11} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9}"
+        )
+        for mode, startup, total, errors, rps, p50, p95 in rows:
+            self.stdout.write(
+                f"{mode:<10} {startup:>11.2f} {total:>8} {errors:>6} {rps:>8.1f} {p50:>9.1f} {p95:>9.1f}"
+            )
+
+    def run_server(self, mode: str, options: dict):
+        port = free_port()
+        env = dict(os.environ)
+        if options["workers"]:
+            env["WEB_CONCURRENCY"] = str(options["workers"])
+
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            server_command(mode, port), cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            startup = self.wait_until_ready(proc, base_url, options["startup_timeout"]) - started
+            self.stdout.write(f"🚀 {mode} ready on {base_url} after {startup:.2f}s")
+            return (startup, *self.load(base_url, options))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    def wait_until_ready(self, proc, base_url: str, timeout: float) -> float:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise CommandError(f"Server exited with code {proc.returncode} before becoming ready")
+            try:
+                if requests.get(f"{base_url}/api/health/", timeout=1).ok:
+                    return time.perf_counter()
+            except requests.RequestException:
+                pass
+            time.sleep(0.1)
+        raise CommandError(f"Server not ready after {timeout:.0f}s")
+
+    def load(self, base_url: str, options: dict):
+        method, path, body = SCENARIOS[options["scenario"]]
+        local = threading.local()
+
+        def one_request(_):
+            session = getattr(local, "session", None) or requests.Session()
+            local.session = session
+            start = time.perf_counter()
+            response = session.request(method, base_url + path, json=body, timeout=60)
+            response.raise_for_status()
+            if options["scenario"] == "stream":
+                # Every line of the body must be a complete event
+                [json.loads(line) for line in response.text.splitlines() if line]
+            return time.perf_counter() - start
+
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for f in [pool.submit(one_request, i) for i in range(options["requests"])]:
+                try:
+                    latencies.append(f.result())
+                except Exception:
+                    errors += 1
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+        return options["requests"], errors, len(latencies) / elapsed, p50, p95
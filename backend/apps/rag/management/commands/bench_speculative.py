@@ -0,0 +1,88 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.deliberation import deliberate_answer
+from services.fake_ollama import FakeOllamaServer
+from services.llm import configure_pool
+
+# Fixed question set so runs are comparable over time
+QUESTIONS = [
+    ("aws", "How do I restrict an S3 bucket so only one IAM role can read it?"),
+    ("aws", "What is the least-privilege way to let a Lambda function write to DynamoDB?"),
+    ("gcp", "How should service account keys be managed to avoid long-lived credentials?"),
+    ("gcp", "How do I block public access to Cloud Storage buckets across an organization?"),
+    ("azure", "How do I grant a managed identity read access to a single Key Vault secret?"),
+    ("azure", "Which Azure Policy enforces encryption at rest for storage accounts?"),
+]
+
+DEFAULT_CONTEXT = (
+    "Grant only the permissions required to perform a task. Prefer roles and short-lived "
+    "credentials over long-lived keys. Use resource-level conditions to scope access, and "
+    "enable audit logging for every administrative action."
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure speculative Architect start-up: runs a fixed question set through the deliberation "
+        "with and without speculation and reports hit rate and wall-clock time to the Architect draft."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=1)
+        parser.add_argument("--with-retrieval", action="store_true",
+                            help="Build each question's context from the vector store instead of a fixed text")
+        parser.add_argument("--fake", action="store_true",
+                            help="Run against local fake Ollama servers (so the Analyst and the speculative Architect run side by side)")
+
+    def handle(self, *args, **options):
+        servers = []
+        if options["fake"]:
+            servers = [FakeOllamaServer(tokens=160, token_delay=0.01).start() for _ in range(2)]
+            configure_pool([{"url": s.url, "models": []} for s in servers])
+
+        try:
+            baseline, pipelined, outcomes = [], [], []
+            for _ in range(options["repeat"]):
+                for provider, question in QUESTIONS:
+                    context = self._context(question, provider, options["with_retrieval"])
+                    baseline.append(self._run(question, context, provider, speculative=False)[0])
+                    elapsed, outcome = self._run(question, context, provider, speculative=True)
+                    pipelined.append(elapsed)
+                    outcomes.append(outcome)
+        finally:
+            for s in servers:
+                s.stop()
+
+        hits = outcomes.count("hit")
+        self.stdout.write(f"runs:                 {len(outcomes)}")
+        self.stdout.write(f"speculation hit rate: {hits / len(outcomes):.0%} ({hits} hit, "
+                          f"{outcomes.count('miss')} miss, {outcomes.count('skipped')} skipped)")
+        self.stdout.write(f"time to Architect done, sequential: {statistics.mean(baseline):.2f}s mean")
+        self.stdout.write(f"time to Architect done, pipelined:  {statistics.mean(pipelined):.2f}s mean")
+        saved = statistics.mean(baseline) - statistics.mean(pipelined)
+        self.stdout.write(f"wall-clock saving:    {saved:.2f}s ({saved / statistics.mean(baseline):.0%})")
+
+    def _context(self, question, provider, with_retrieval):
+        if not with_retrieval:
+            return DEFAULT_CONTEXT
+        from services.reasoning import build_context
+        from services.retriever import semantic_search
+        return build_context(semantic_search(question, provider=provider))
+
+    def _run(self, question, context, provider, speculative):
+        """Seconds until the Architect stage is done, plus the speculation outcome."""
+        start = time.perf_counter()
+        gen = deliberate_answer(question, context, provider, speculative=speculative)
+        try:
+            for line in gen:
+                event = json.loads(line)
+                if event.get("phase") == "Architect" and event.get("status") == "Done":
+                    return time.perf_counter() - start, event.get("speculative")
+        finally:
+            gen.close()
+        return time.perf_counter() - start, None
@@ -0,0 +1,95 @@
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: what a web worker pays before it can serve its first request
+PROBE = r"""
+import json, os, resource, sys, threading, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "threads": threading.active_count(),
+    "modules": len(sys.modules),
+    "loaded": sorted({m.split(".")[0] for m in sys.modules} & set(json.loads(sys.argv[1]))),
+}))
+"""
+
+HEAVY_MODULES = [
+    "scrapy", "twisted", "crochet", "torch", "transformers", "sentence_transformers",
+    "langchain_chroma", "docx", "deepdiff", "numpy",
+]
+
+# "import time:  self [us] | cumulative | imported package" lines written by -X importtime
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times(stderr: str) -> dict[str, int]:
+    """Self import time in microseconds summed per top-level package."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            totals[match.group(4).split(".")[0]] += int(match.group(1))
+    return totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure web process startup: time to load Django, the WSGI app and the URLconf in a "
+        "fresh interpreter, its peak RSS, thread count and which heavy libraries got imported."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument(
+            "--importtime", action="store_true",
+            help="Run the probe with -X importtime and list the packages that take the longest to import",
+        )
+        parser.add_argument("--top", type=int, default=15, help="Packages to list with --importtime")
+
+    def handle(self, *args, **options):
+        if options["importtime"]:
+            self.report_import_times(options["top"])
+            return
+
+        results = []
+        for _ in range(options["runs"]):
+            proc = subprocess.run(
+                [sys.executable, "-c", PROBE, json.dumps(HEAVY_MODULES)],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f"{'run':>4} {'startup (s)':>12} {'max RSS (MB)':>13} {'threads':>8} {'modules':>8}")
+        for i, r in enumerate(results, 1):
+            self.stdout.write(
+                f"{i:>4} {r['seconds']:>12.3f} {r['max_rss_mb']:>13.1f} {r['threads']:>8} {r['modules']:>8}"
+            )
+        best = min(results, key=lambda r: r["seconds"])
+        self.stdout.write(f"best: {best['seconds']:.3f}s, {best['max_rss_mb']:.1f} MB")
+        self.stdout.write(f"heavy modules loaded: {', '.join(best['loaded']) or 'none'}")
+
+    def report_import_times(self, top: int):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, json.dumps(HEAVY_MODULES)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        totals = import_times(proc.stderr)
+        overall = sum(totals.values())
+
+        self.stdout.write(f"{'package':<30} {'import (ms)':>12} {'share':>7}")
+        for package, micros in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]:
+            self.stdout.write(f"{package:<30} {micros / 1000:>12.1f} {micros / overall:>7.1%}")
+        self.stdout.write(f"{'total':<30} {overall / 1000:>12.1f}")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.faiss_index import mirrored_providers, rebuild_provider_index, sync_provider_index
+from services.vectorstores import legacy_collection, partitioned_providers, provider_collection, provider_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the FAISS mirrors of the per-provider Chroma collections searched with "
+        "RETRIEVAL_BACKEND=faiss. Ingestion keeps them up to date afterwards."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", help="Comma separated providers (default: every provider with a collection)")
+        parser.add_argument("--sync", action="store_true", help="Update existing mirrors instead of rebuilding them")
+
+    def handle(self, *args, **options):
+        if legacy_collection() is not None:
+            raise CommandError(
+                "The vector store still has an unpartitioned collection; run `manage.py split_vector_collections` first."
+            )
+        if options["provider"]:
+            providers = [provider_key(p) for p in options["provider"].split(",") if p.strip()]
+        else:
+            providers = sorted(set(partitioned_providers()) | set(mirrored_providers()))
+
+        for provider in providers:
+            # Only stored embeddings are read; no embedding model needed
+            collection = provider_collection(provider)
+            if collection is None:
+                self.stdout.write(f"⚠️ {provider}: no collection, skipped")
+                continue
+            if options["sync"]:
+                result = sync_provider_index(collection, provider)
+            else:
+                result = rebuild_provider_index(collection, provider)
+            self.stdout.write(
+                f"✅ {provider}: {result['chunks']} chunks, +{result['added']} / -{result['removed']}"
+                f"{' (rebuilt, ' + result.get('kind', 'empty') + ')' if result['rebuilt'] else ''}"
+            )
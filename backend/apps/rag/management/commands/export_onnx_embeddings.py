@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from services.embeddings import export_onnx_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Export EMBEDDING_MODEL to ONNX with int8 weights for EMBEDDING_BACKEND=onnx. "
+        "Needs torch and onnx; the exported model runs without them."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=None, help="Model to export (default: EMBEDDING_MODEL)")
+        parser.add_argument("--output", default=None, help="Output directory (default: ONNX_MODEL_DIR)")
+        parser.add_argument("--no-quantize", action="store_true", help="Keep float32 weights")
+        parser.add_argument("--keep-fp32", action="store_true", help="Also keep the float32 model next to the int8 one")
+
+    def handle(self, *args, **options):
+        model = options["model"] or settings.EMBEDDING_MODEL
+        output = options["output"] or settings.ONNX_MODEL_DIR
+        self.stdout.write(f"⏳ Exporting {model} to {output}...")
+        start = time.perf_counter()
+        metadata = export_onnx_model(
+            model, output, quantize=not options["no_quantize"], keep_fp32=options["keep_fp32"]
+        )
+        self.stdout.write(
+            f"✅ Exported {metadata['file']} ({metadata['dim']} dims, max {metadata['max_length']} tokens) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
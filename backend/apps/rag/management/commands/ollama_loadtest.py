@@ -0,0 +1,75 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from services.fake_ollama import FakeOllamaServer
+from services.llm import call_llm, configure_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the Ollama backend pool against local fake Ollama servers "
+        "to verify that throughput scales with the number of backends."
+    )
+    # Talks to local fake servers only; no need to load the URLconf and its heavy imports
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", default="1,2,4", help="Comma separated backend counts to test")
+        parser.add_argument("--requests", type=int, default=64)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--slots", type=int, default=1, help="Concurrent generations per fake backend")
+        parser.add_argument("--tokens", type=int, default=32)
+        parser.add_argument("--token-delay", type=float, default=0.01)
+        parser.add_argument("--stream", action="store_true", help="Use streaming calls")
+        parser.add_argument(
+            "--kill-one", action="store_true",
+            help="Stop one backend halfway through to exercise passive health checks and failover",
+        )
+
+    def handle(self, *args, **options):
+        model = "fake-model"
+        rows = []
+
+        for n in [int(x) for x in options["backends"].split(",") if x.strip()]:
+            servers = [
+                FakeOllamaServer(
+                    models=[model],
+                    slots=options["slots"],
+                    tokens=options["tokens"],
+                    token_delay=options["token_delay"],
+                ).start()
+                for _ in range(n)
+            ]
+            configure_pool([{"url": s.url, "models": [model]} for s in servers], cooldown=5.0)
+
+            def one_call(i):
+                if options["kill_one"] and n > 1 and i == options["requests"] // 2:
+                    servers[0].stop()
+                if options["stream"]:
+                    return "".join(call_llm("load test", model=model, stream=True))
+                return call_llm("load test", model=model)
+
+            errors = 0
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                futures = [pool.submit(one_call, i) for i in range(options["requests"])]
+                for f in futures:
+                    try:
+                        f.result()
+                    except Exception:
+                        errors += 1
+            elapsed = time.perf_counter() - start
+
+            served = Counter({s.url: s.requests_served for s in servers})
+            rows.append((n, options["requests"], errors, elapsed, options["requests"] / elapsed, served))
+
+            for s in servers[1:] if options["kill_one"] and n > 1 else servers:
+                s.stop()
+
+        self.stdout.write(f"{'backends':>8} {'requests':>8} {'errors':>6} {'seconds':>8} {'req/s':>8}  distribution")
+        for n, total, errors, elapsed, rps, served in rows:
+            distribution = " ".join(str(v) for v in served.values())
+            self.stdout.write(f"{n:>8} {total:>8} {errors:>6} {elapsed:>8.2f} {rps:>8.2f}  [{distribution}]")
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.faiss_index import load_provider_index, rebuild_provider_index
+from services.vectorstores import get_embeddings, legacy_collection, partitioned_providers, provider_collection, provider_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-embed the stored chunks with the configured embedding backend, e.g. after switching "
+        "EMBEDDING_BACKEND, so chunk and query vectors come from the same model build. "
+        "Chunk texts are read from the vector store; nothing is crawled or re-chunked."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", help="Comma separated providers (default: every provider with a collection)")
+        parser.add_argument("--batch-size", type=int, default=256)
+
+    def handle(self, *args, **options):
+        if legacy_collection() is not None:
+            raise CommandError(
+                "The vector store still has an unpartitioned collection; run `manage.py split_vector_collections` first."
+            )
+        if options["provider"]:
+            providers = [provider_key(p) for p in options["provider"].split(",") if p.strip()]
+        else:
+            providers = partitioned_providers()
+
+        embeddings = get_embeddings()
+        for provider in providers:
+            collection = provider_collection(provider)
+            if collection is None:
+                self.stdout.write(f"⚠️ {provider}: no collection, skipped")
+                continue
+            total = collection.count()
+            start = time.perf_counter()
+            done = 0
+            while done < total:
+                # Updating embeddings keeps ids and their order, so offsets stay valid
+                batch = collection.get(include=["documents"], limit=options["batch_size"], offset=done)
+                if not batch["ids"]:
+                    break
+                collection.update(ids=batch["ids"], embeddings=embeddings.embed_documents(batch["documents"]))
+                done += len(batch["ids"])
+                self.stdout.write(f"⏳ {provider}: {done}/{total} chunks")
+            self.stdout.write(
+                f"✅ {provider}: re-embedded {done} chunks in {time.perf_counter() - start:.1f}s"
+            )
+            # Same ids, new vectors: a sync would see nothing to do
+            if load_provider_index(provider) is not None:
+                rebuild_provider_index(collection, provider)
+                self.stdout.write(f"✅ {provider}: FAISS index rebuilt")
@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.documents.models import Document
+from services.reindex import EMBED_BATCH, ReindexAborted, reindex_provider
+from services.vectorstores import provider_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-chunk and re-embed every indexed document of a provider from the page store (or the "
+        "crawl cache for pages it does not have), without network access, e.g. after changing the "
+        "embedding model, the chunking or the noise filter. The new chunks are built in a shadow "
+        "collection and swapped in once complete; searches keep using the old one until then."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", help="Comma separated providers (default: every provider with indexed documents)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes chunking and embedding (default: one per core)")
+        parser.add_argument("--batch-size", type=int, default=EMBED_BATCH, help="Chunks per embedding task")
+
+    def handle(self, *args, **options):
+        if options["provider"]:
+            providers = [provider_key(p) for p in options["provider"].split(",") if p.strip()]
+        else:
+            providers = sorted({provider_key(p) for p in Document.objects.filter(is_indexed=True).values_list("provider", flat=True)})
+        if not providers:
+            raise CommandError("No indexed documents to reindex.")
+
+        for provider in providers:
+            self.stdout.write(f"⏳ {provider}: reindexing with {options['workers']} workers...")
+            start = time.perf_counter()
+            try:
+                summary = reindex_provider(
+                    provider, workers=options["workers"], batch_size=options["batch_size"], progress=self.progress(provider)
+                )
+            except (ReindexAborted, ValueError) as e:
+                self.stdout.write(f"⚠️ {provider}: {e}")
+                continue
+            self.stdout.write(
+                f"✅ {provider}: {summary['documents']} documents, {summary['pages_stored']} pages from the page "
+                f"store, {summary['pages_cached']} from the crawl cache, {summary['pages_carried']} carried over "
+                f"from the vector store; {summary['chunks']} chunks embedded ({summary['chunks_deduplicated']} "
+                f"deduplicated), {summary['other_chunks']} of other documents re-embedded; swapped in "
+                f"{summary['collection']} after {time.perf_counter() - start:.1f}s"
+            )
+            if summary.get("faiss_rebuilt"):
+                self.stdout.write(f"✅ {provider}: FAISS index rebuilt")
+
+    def progress(self, provider: str):
+        """Progress lines with rate and ETA, at most one every few seconds per stage."""
+        started, last = {}, {}
+
+        def report(stage: str, done: int, total: int):
+            now = time.perf_counter()
+            started.setdefault(stage, now)
+            if done < total and now - last.get(stage, 0) < 5:
+                return
+            last[stage] = now
+            elapsed = now - started[stage]
+            rate = done / elapsed if elapsed > 0 else 0
+            eta = f", ETA {(total - done) / rate:.0f}s" if rate and done < total else ""
+            self.stdout.write(f"⏳ {provider}: {done}/{total} {stage} ({rate:.1f}/s{eta})")
+
+        return report
@@ -0,0 +1,45 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from services.vectorstores import MIGRATE_BATCH, legacy_collection, migrate_legacy_chunks, provider_key
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the chunks of the single pre-partitioning Chroma collection into one collection "
+        "per provider, then drop it. Stored embeddings are copied; nothing is re-embedded."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", help="Only move this provider's chunks")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many chunks each provider has")
+
+    def handle(self, *args, **options):
+        legacy = legacy_collection()
+        if legacy is None:
+            self.stdout.write("✅ Nothing to split: the vector store is already partitioned by provider.")
+            return
+
+        if options["dry_run"]:
+            counts = Counter()
+            offset = 0
+            while True:
+                batch = legacy.get(include=["metadatas"], limit=MIGRATE_BATCH, offset=offset)
+                if not batch["ids"]:
+                    break
+                counts.update(provider_key((m or {}).get("provider") or "unknown") for m in batch["metadatas"])
+                offset += len(batch["ids"])
+            for provider, count in sorted(counts.items()):
+                self.stdout.write(f"ℹ️ {provider}: {count} chunks")
+            return
+
+        moved = migrate_legacy_chunks(options["provider"])
+        for provider, count in sorted(moved.items()):
+            self.stdout.write(f"✅ {provider}: moved {count} chunks")
+        remaining = legacy_collection()
+        if remaining is None:
+            self.stdout.write("✅ Legacy collection dropped.")
+        else:
+            self.stdout.write(f"ℹ️ {remaining.count()} chunks of other providers left in the legacy collection.")
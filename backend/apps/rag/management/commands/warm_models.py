@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from services.fake_ollama import FakeOllamaServer
+from services.llm import configure_pool
+from services.model_warmer import ModelWarmer, measure_cold_warm_ttft, models_to_warm, warm_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Preload the deliberation agent models on every Ollama backend that hosts them. "
+        "With --report, also measure cold vs warm time-to-first-token per model. With --watch, "
+        "keep reloading evicted models every OLLAMA_WARMUP_INTERVAL seconds until stopped."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--models", help="Comma separated models (default: AGENTS + LLM_MODEL)")
+        parser.add_argument("--report", action="store_true", help="Report cold vs warm time-to-first-token")
+        parser.add_argument("--watch", action="store_true", help="Run the model warmer in the foreground until stopped")
+        parser.add_argument(
+            "--fake", action="store_true",
+            help="Run against a local fake Ollama server with a simulated model load delay",
+        )
+        parser.add_argument("--fake-load-delay", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        models = [m.strip() for m in options["models"].split(",")] if options["models"] else models_to_warm()
+
+        server = None
+        if options["fake"]:
+            server = FakeOllamaServer(load_delay=options["fake_load_delay"], token_delay=0.005).start()
+            configure_pool([{"url": server.url, "models": []}])
+
+        try:
+            if options["report"]:
+                self.stdout.write(f"{'model':<20} {'cold TTFT (s)':>14} {'warm TTFT (s)':>14} {'speedup':>8}")
+                for row in measure_cold_warm_ttft(models):
+                    speedup = row["cold_ttft"] / row["warm_ttft"] if row["warm_ttft"] else float("inf")
+                    self.stdout.write(
+                        f"{row['model']:<20} {row['cold_ttft']:>14.3f} {row['warm_ttft']:>14.3f} {speedup:>7.1f}x"
+                    )
+                return
+
+            if options["watch"]:
+                # gunicorn.conf.py runs this once per server, beside the workers
+                ModelWarmer(settings.OLLAMA_WARMUP_INTERVAL, models).run()
+                return
+
+            loaded = warm_all(models)
+            for (url, model), seconds in loaded.items():
+                self.stdout.write(f"✅ {model} on {url} loaded in {seconds:.2f}s")
+        finally:
+            if server:
+                server.stop()
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from services import llm
+from services.doc_generator import build_html
+from services.fake_ollama import FakeOllamaServer
+from services.llm import OllamaPool, call_llm
+from services.reports import cache_path, get_report, prune_cache, report_key
+
+MODEL = "qwen2.5:1.5b"
+
+
+def stopped_server_url() -> str:
+    """URL of a port nothing listens on any more: connections to it are refused."""
+    server = FakeOllamaServer().start()
+    server.stop()
+    return server.url
+
+
+class OllamaPoolRoutingTests(SimpleTestCase):
+    def setUp(self):
+        # Failures are expected here; keep their warnings out of the test output
+        patcher = mock.patch.object(llm, "logger")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = OllamaPool(
+            [{"url": "http://a:11434"}, {"url": "http://b:11434"}, {"url": "http://c:11434", "models": ["other"]}],
+            cooldown=10.0,
+        )
+        self.a, self.b, self.c = self.pool.backends
+
+    def test_least_loaded_backend_comes_first(self):
+        self.pool.acquire(self.a)
+        self.pool.acquire(self.a)
+        self.pool.acquire(self.b)
+
+        self.assertEqual(self.pool.candidates(MODEL), [self.b, self.a])
+
+        self.pool.release(self.a)
+        self.pool.release(self.a)
+        self.assertEqual(self.pool.candidates(MODEL), [self.a, self.b])
+
+    def test_only_backends_hosting_the_model_are_candidates(self):
+        self.assertEqual(self.pool.candidates("other"), [self.a, self.b, self.c])
+        self.assertNotIn(self.c, self.pool.candidates(MODEL))
+
+        only_c = OllamaPool([{"url": "http://c:11434", "models": ["other"]}])
+        with self.assertRaises(ValueError):
+            only_c.candidates(MODEL)
+
+    def test_failed_backend_cools_down_and_is_tried_last(self):
+        self.pool.acquire(self.b)  # busier, but healthy
+        self.pool.mark_failure(self.a)
+
+        self.assertEqual(self.pool.candidates(MODEL), [self.b, self.a])
+        self.assertFalse(self.a.is_healthy(time.monotonic()))
+        self.assertAlmostEqual(self.a.down_until - time.monotonic(), 10.0, delta=1.0)
+
+    def test_cooldown_doubles_per_consecutive_failure_up_to_eight_times(self):
+        for expected in (10.0, 20.0, 40.0, 80.0, 80.0):
+            self.pool.mark_failure(self.a)
+            self.assertAlmostEqual(self.a.down_until - time.monotonic(), expected, delta=1.0)
+
+        self.pool.mark_success(self.a)
+        self.assertEqual(self.a.failures, 0)
+        self.assertTrue(self.a.is_healthy(time.monotonic()))
+        self.assertEqual(self.pool.candidates(MODEL)[0], self.a)
+
+
+@override_settings(OLLAMA_CONNECT_TIMEOUT=1, OLLAMA_READ_TIMEOUT=5)
+class OllamaFailoverTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeOllamaServer(tokens=4, token_delay=0.0).start()
+        self.addCleanup(self.server.stop)
+        patcher = mock.patch.object(llm, "logger")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_pool(self, backends: list[dict]) -> OllamaPool:
+        pool = OllamaPool(backends, cooldown=10.0)
+        patcher = mock.patch.object(llm, "get_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return pool
+
+    def test_call_fails_over_from_a_refused_backend(self):
+        pool = self.use_pool([{"url": stopped_server_url()}, {"url": self.server.url}])
+        dead, live = pool.backends
+
+        self.assertEqual(call_llm("Hello", model=MODEL), "tok0 tok1 tok2 tok3 ")
+        self.assertEqual(dead.failures, 1)
+        self.assertFalse(dead.is_healthy(time.monotonic()))
+        self.assertEqual(live.failures, 0)
+        self.assertEqual([b.in_flight for b in pool.backends], [0, 0])
+
+        # The next call goes to the healthy backend first
+        self.assertEqual(pool.candidates(MODEL), [live, dead])
+
+    def test_stream_fails_over_before_the_first_token(self):
+        pool = self.use_pool([{"url": stopped_server_url()}, {"url": self.server.url}])
+
+        self.assertEqual("".join(call_llm("Hello", model=MODEL, stream=True)), "tok0 tok1 tok2 tok3 ")
+        self.assertEqual(pool.backends[0].failures, 1)
+
+    def test_client_errors_do_not_mark_the_backend_unhealthy(self):
+        wrong_model = FakeOllamaServer(models=["other"]).start()
+        self.addCleanup(wrong_model.stop)
+        pool = self.use_pool([{"url": wrong_model.url}, {"url": self.server.url}])
+
+        self.assertEqual(call_llm("Hello", model=MODEL), "tok0 tok1 tok2 tok3 ")
+        self.assertEqual(pool.backends[0].failures, 0)
+
+    def test_last_error_is_raised_when_every_backend_fails(self):
+        pool = self.use_pool([{"url": stopped_server_url()}, {"url": stopped_server_url()}])
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            call_llm("Hello", model=MODEL)
+        self.assertEqual([b.failures for b in pool.backends], [1, 1])
+
+
+ANSWER = {
+    "answer": "### Findings\nThe bucket policy allows public reads.",
+    "sources": [{"title": "S3 guide", "provider": "aws", "source": "https://docs.example.com/s3/"}],
+}
+
+
+class ReportCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings = override_settings(REPORT_CACHE_DIR=cache_dir.name, REPORT_CACHE_MAX_ENTRIES=10)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def report(self, llm_response: dict, fmt: str = "md") -> tuple[bytes, str, bool]:
+        f, key, cached = get_report(llm_response, fmt)
+        with f:
+            return f.read(), key, cached
+
+    def test_key_depends_on_format_answer_and_sources_only(self):
+        key = report_key(ANSWER, "md")
+
+        self.assertEqual(report_key({**ANSWER, "question": "ignored"}, "md"), key)
+        self.assertNotEqual(report_key(ANSWER, "html"), key)
+        self.assertNotEqual(report_key({**ANSWER, "answer": ANSWER["answer"] + "!"}, "md"), key)
+        self.assertNotEqual(report_key({**ANSWER, "sources": []}, "md"), key)
+
+    def test_second_download_is_served_from_the_cache(self):
+        content, key, cached = self.report(ANSWER)
+        self.assertFalse(cached)
+        self.assertTrue(cache_path(key, "md").exists())
+
+        with mock.patch("services.reports.render_report") as render:
+            again, again_key, cached = self.report(ANSWER)
+        render.assert_not_called()
+        self.assertEqual((again, again_key, cached), (content, key, True))
+
+        self.assertFalse(self.report({**ANSWER, "answer": "Other"})[2])
+
+    @override_settings(REPORT_CACHE_MAX_ENTRIES=0)
+    def test_nothing_is_stored_with_the_cache_disabled(self):
+        content, key, cached = self.report(ANSWER)
+
+        self.assertIn(b"The bucket policy allows public reads.", content)
+        self.assertFalse(cached)
+        self.assertFalse(cache_path(key, "md").exists())
+        self.assertFalse(self.report(ANSWER)[2])
+
+    def test_pruning_keeps_the_most_recently_served_reports(self):
+        keys = [self.report({**ANSWER, "answer": f"Answer {i}"})[1] for i in range(3)]
+        for i, key in enumerate(keys):
+            os.utime(cache_path(key, "md"), (1000 + i, 1000 + i))
+        self.assertTrue(self.report({**ANSWER, "answer": "Answer 0"})[2])  # served again: now the newest
+
+        self.assertEqual(prune_cache(max_entries=2), 1)
+        self.assertEqual([cache_path(key, "md").exists() for key in keys], [True, False, True])
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_report(ANSWER, "pdf")
+
+
+class HtmlReportTests(SimpleTestCase):
+    def test_only_web_urls_become_links(self):
+        html = build_html({"answer": "x", "sources": [
+            {"title": "Guide", "source": "https://docs.example.com/s3/?a=1&b=2"},
+            {"title": "Script", "source": "javascript:alert(document.cookie)"},
+            {"title": "Data", "source": " DATA:text/html,<script>alert(1)</script>"},
+        ]})
+
+        self.assertIn('<a href="https://docs.example.com/s3/?a=1&amp;b=2">', html)
+        self.assertEqual(html.count("<a "), 1)
+        self.assertIn("javascript:alert(document.cookie)</li>", html)
+        self.assertNotIn("<script>", html)
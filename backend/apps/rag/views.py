@@ -7,10 +7,9 @@ import json
 import re
 
 from services.rag_pipeline import answer_query, answer_query_stream
-from services.doc_generator import build_docx
+from services.reports import REPORT_FORMATS, get_report
 
 from datetime import datetime
-from io import BytesIO
 
 
 SMALL_TALK = {
@@ -20,6 +19,27 @@ SMALL_TALK = {
     "bye", "goodbye"
 }
 
+def report_response(response_payload: dict, fmt: str) -> FileResponse:
+    """Streams the rendered report (cached when the same answer was rendered before)."""
+    report, key, cached = get_report(response_payload, fmt)
+    extension, content_type = REPORT_FORMATS[fmt]
+    filename = f"rag_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    response = FileResponse(report, as_attachment=True, filename=filename, content_type=content_type)
+    response["ETag"] = f'"{key}"'
+    response["X-Report-Cache"] = "hit" if cached else "miss"
+    return response
+
+
+def invalid_report_format(fmt) -> Response | None:
+    if isinstance(fmt, str) and fmt in REPORT_FORMATS:
+        return None
+    return Response(
+        {"error": f"report_format must be one of {', '.join(REPORT_FORMATS)}"},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
 def is_small_talk(query: str) -> bool:
     q = query.lower().strip()
     q = re.sub(r"[^\w\s]", "", q)   # remove punctuation like "hi!!!"
@@ -34,9 +54,12 @@ class RAGQueryViewSet(ViewSet):
             provider = request.data.get("provider")
             top_k = int(request.data.get("top_k", 5))
             generate_report = request.data.get("generate_report", False)
+            report_format = request.data.get("report_format", "docx")
 
             if not query:
                 return Response({"error": "query is required"}, status=status.HTTP_400_BAD_REQUEST)
+            if generate_report and (error := invalid_report_format(report_format)):
+                return error
 
             # ✅ STOP calling retriever + LLM for greetings / small talk
             if is_small_talk(query):
@@ -64,20 +87,7 @@ class RAGQueryViewSet(ViewSet):
 
             # ✅ If user wants report → download directly
             if generate_report:
-                doc = build_docx(response_payload)
-
-                buffer = BytesIO()
-                doc.save(buffer)
-                buffer.seek(0)
-
-                filename = f"rag_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-
-                return FileResponse(
-                    buffer,
-                    as_attachment=True,
-                    filename=filename,
-                    content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                )
+                return report_response(response_payload, report_format)
 
             return Response(response_payload, status=status.HTTP_200_OK)
 
@@ -115,26 +125,16 @@ class RAGReportViewSet(ViewSet):
     def create(self, request):
         try:
             response_payload = request.data
+            report_format = response_payload.get("report_format", "docx")
 
             if not response_payload.get("answer"):
                 return Response(
                     {"error": "answer is required to generate report"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            if error := invalid_report_format(report_format):
+                return error
 
-            doc = build_docx(response_payload)
-
-            buffer = BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
-
-            filename = f"rag_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-
-            return FileResponse(
-                buffer,
-                as_attachment=True,
-                filename=filename,
-                content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
+            return report_response(response_payload, report_format)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+# ✅ Keep the deliberation models resident in Ollama for serving processes
+if settings.OLLAMA_WARMUP_ENABLED:
+    from services.model_warmer import start_model_warmer
+    start_model_warmer()
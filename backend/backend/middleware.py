@@ -0,0 +1,87 @@
+"""
+Per-request database instrumentation.
+
+Every query a request runs goes through an execute wrapper that counts it and times it.
+Responses carry the totals as X-DB-Queries / X-DB-Time-Ms headers and a Server-Timing entry
+(shown in the browser's network panel). Requests running many queries, or one statement
+many times over (the N+1 pattern: one query per row of a previous one), are logged.
+
+Streamed responses send their headers before the body runs, so the headers only cover the
+view; queries made while streaming are added to the logged totals.
+"""
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class QueryStats:
+    """Execute wrapper collecting the queries run through it."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Parameters are passed separately, so an N+1 loop repeats the same statement
+            self.statements[sql] += 1
+
+    def track(self) -> ExitStack:
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+class QueryStatsMiddleware:
+    def __init__(self, get_response):
+        if not settings.DB_QUERY_STATS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with stats.track():
+            response = self.get_response(request)
+
+        response["X-DB-Queries"] = str(stats.count)
+        response["X-DB-Time-Ms"] = f"{stats.duration * 1000:.1f}"
+        response["Server-Timing"] = f"db;dur={stats.duration * 1000:.1f};desc=\"{stats.count} queries\""
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.tracked_stream(request, response.streaming_content, stats)
+        else:
+            self.report(request, stats)
+        return response
+
+    def tracked_stream(self, request, content, stats: QueryStats):
+        try:
+            with stats.track():
+                yield from content
+        finally:
+            self.report(request, stats)
+
+    @staticmethod
+    def report(request, stats: QueryStats):
+        if not stats.statements:
+            return
+        most_repeated = stats.statements.most_common(1)[0][1]
+        if stats.count <= settings.DB_QUERY_LOG_COUNT and most_repeated < settings.DB_QUERY_LOG_REPEATS:
+            return
+        print(
+            f"⚠️ {request.method} {request.path}: {stats.count} queries in {stats.duration * 1000:.1f} ms",
+            flush=True,
+        )
+        for statement, repeats in stats.statements.most_common(3):
+            if repeats > 1:
+                print(f"   {repeats}x {statement[:200]}", flush=True)
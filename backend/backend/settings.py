@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.QueryStatsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -85,17 +86,44 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and reused by the next requests the
+# same thread serves (0 = a new connection per request), after a health check. DB_POOL=true
+# uses a psycopg 3 connection pool per process instead, shared by all of its threads
+# (DB_POOL_MIN_SIZE idle, at most DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT seconds to wait for one).
+# Django does not combine the two, so connections are not otherwise kept open with the pool.
+DB_POOL = os.getenv("DB_POOL", "False").lower() in ("true", "1", "yes")
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'ai_tool',        # your database name
-        'USER': 'postgres',    # default user
-        'PASSWORD': 'Asdfgf@2002',# the password you set
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.getenv("DB_NAME", "ai_tool"),
+        'USER': os.getenv("DB_USER", "postgres"),
+        'PASSWORD': os.getenv("DB_PASSWORD", "Asdfgf@2002"),
+        'HOST': os.getenv("DB_HOST", "localhost"),
+        'PORT': os.getenv("DB_PORT", "5432"),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "8")),
+                'timeout': float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            },
+        } if DB_POOL else {},
     }
 }
 
+# Per-request query count and database time (backend/middleware.py). Requests running more
+# than DB_QUERY_LOG_COUNT queries, or the same statement DB_QUERY_LOG_REPEATS times (an N+1
+# pattern), are logged with their most repeated statements.
+DB_QUERY_STATS = os.getenv("DB_QUERY_STATS", "True").lower() in ("true", "1", "yes")
+DB_QUERY_LOG_COUNT = int(os.getenv("DB_QUERY_LOG_COUNT", "50"))
+DB_QUERY_LOG_REPEATS = int(os.getenv("DB_QUERY_LOG_REPEATS", "10"))
+
+# GET /api/documents/ returns every document unless the client asks for a page with
+# ?limit=&offset=; a page holds at most this many
+DOCUMENTS_MAX_PAGE_SIZE = int(os.getenv("DOCUMENTS_MAX_PAGE_SIZE", "500"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -137,16 +165,214 @@ VECTOR_DB_PATH = os.getenv(
     "VECTOR_DB_PATH",
     str(BASE_DIR / "../vectorstore")
 )
+
+# Embedding model of chunks and queries. EMBEDDING_BACKEND "torch" runs it with
+# sentence-transformers; "onnx" runs its int8 ONNX export from ONNX_MODEL_DIR
+# (`manage.py export_onnx_embeddings`) with ONNX Runtime, without loading torch.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    str(BASE_DIR / "../onnx_models/all-MiniLM-L6-v2")
+)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# ONNX Runtime threads per process (0 = one per core; gunicorn splits the cores between workers)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+# Retrieval backend: "chroma" queries the Chroma collection directly; "faiss" searches
+# in-process per-provider FAISS mirrors of it (memory-mapped, refreshed after each ingest)
+# and falls back to Chroma for providers that have no mirror yet.
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+FAISS_INDEX_DIR = os.getenv(
+    "FAISS_INDEX_DIR",
+    str(BASE_DIR / "../faiss_index")
+)
+# "hnsw", or a compressed type: "hnsw_fp16" (float16 codes, half the vector memory) or
+# "ivfpq" (product-quantization codes, ~1/32). Mirrors smaller than FAISS_EXACT_BELOW
+# chunks use an exact flat index whatever the type.
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "hnsw")
+FAISS_EXACT_BELOW = int(os.getenv("FAISS_EXACT_BELOW", "10000"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+# Compressed types fetch this many times k candidates and re-score them exactly
+# against the float32 embeddings stored in Chroma (1 = no re-scoring)
+FAISS_RESCORE_FACTOR = int(os.getenv("FAISS_RESCORE_FACTOR", "4"))
+
 OLLAMA_BASE_URL = os.getenv(
     "OLLAMA_BASE_URL",
     "http://localhost:11434"
 )
 
+# Crawling
+# Scrapy settings per provider, layered over "default". HTTP responses are cached on disk
+# per document (RFC 2616 policy, so servers' cache headers decide what can be reused).
+CRAWL_CACHE_DIR = os.getenv(
+    "CRAWL_CACHE_DIR",
+    str(BASE_DIR / "../crawl_cache")
+)
+
+# Resumable crawls: per-document Scrapy job state and the pages already ingested.
+# A crawl runs for at most CRAWL_TIME_SLICE seconds per ingestion; the next ingestion continues it.
+CRAWL_STATE_DIR = os.getenv(
+    "CRAWL_STATE_DIR",
+    str(BASE_DIR / "../crawl_state")
+)
+CRAWL_TIME_SLICE = int(os.getenv("CRAWL_TIME_SLICE", "840"))
+
+# Cleaned text of every crawled page, zstd-compressed and keyed by its SHA-256, with a
+# manifest per document; `manage.py reindex` re-chunks from it without crawling.
+PAGE_STORE_DIR = os.getenv(
+    "PAGE_STORE_DIR",
+    str(BASE_DIR / "../page_store")
+)
+PAGE_STORE_ZSTD_LEVEL = int(os.getenv("PAGE_STORE_ZSTD_LEVEL", "10"))
+
+# Documents a bulk ingestion (POST /api/documents/bulk/, `manage.py bulk_ingest`) crawls at
+# once; their chunks are embedded by one shared writer thread
+BULK_INGEST_CONCURRENCY = int(os.getenv("BULK_INGEST_CONCURRENCY", "4"))
+
+# An API bulk ingestion's process touches its job every BULK_JOB_HEARTBEAT seconds; a queued or
+# running job without a heartbeat for BULK_JOB_STALE_AFTER seconds is marked failed
+BULK_JOB_HEARTBEAT = int(os.getenv("BULK_JOB_HEARTBEAT", "30"))
+BULK_JOB_STALE_AFTER = int(os.getenv("BULK_JOB_STALE_AFTER", "180"))
+
+# Rendered report downloads, cached on disk by a hash of (format, answer, sources); the
+# REPORT_CACHE_MAX_ENTRIES most recently served are kept (0 = no cache). Reports are rendered
+# in memory up to REPORT_SPOOL_MAX_BYTES and spill to a temporary file beyond that.
+REPORT_CACHE_DIR = os.getenv(
+    "REPORT_CACHE_DIR",
+    str(BASE_DIR / "../report_cache")
+)
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "500"))
+REPORT_SPOOL_MAX_BYTES = int(os.getenv("REPORT_SPOOL_MAX_BYTES", str(1024 * 1024)))
+
+CRAWL_PROFILES = {
+    "default": {
+        "CONCURRENT_REQUESTS": 32,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+        "AUTOTHROTTLE_ENABLED": True,
+        "AUTOTHROTTLE_START_DELAY": 0.25,
+        "AUTOTHROTTLE_MAX_DELAY": 10.0,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+        "DNSCACHE_ENABLED": True,
+        "DNSCACHE_SIZE": 1000,
+        "HTTPCACHE_ENABLED": True,
+        "HTTPCACHE_POLICY": "scrapy.extensions.httpcache.RFC2616Policy",
+        "HTTPCACHE_EXPIRATION_SECS": 0,
+        "HTTPCACHE_IGNORE_HTTP_CODES": [429, 500, 502, 503, 504],
+    },
+    # docs.aws.amazon.com is CDN-backed and tolerates more parallelism
+    "aws": {
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 16,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 8.0,
+    },
+    "gcp": {
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+    },
+    # learn.microsoft.com throttles aggressive clients
+    "azure": {
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 2.0,
+    },
+}
+
+# Query parameters dropped when canonicalizing crawled links (shell-style patterns).
+# They switch tabs/languages or track clicks without changing the page.
+CRAWL_DROP_QUERY_PARAMS = [
+    p.strip().lower()
+    for p in os.getenv(
+        "CRAWL_DROP_QUERY_PARAMS",
+        "tab,hl,lang,language,locale,utm_*,ref,gclid,fbclid,_ga",
+    ).split(",")
+    if p.strip()
+]
+
+# Pages whose 64-bit SimHash differs from an already crawled page in at most this many bits are skipped
+CRAWL_NEAR_DUPLICATE_DISTANCE = int(os.getenv("CRAWL_NEAR_DUPLICATE_DISTANCE", "3"))
+
+# Links whose path or anchor text contain these keywords are fetched first (summed weights)
+CRAWL_PRIORITY_KEYWORDS = {
+    "iam": 30,
+    "identity": 20,
+    "security": 20,
+    "access": 15,
+    "permission": 15,
+    "polic": 15,
+    "role": 10,
+    "credential": 10,
+    "secret": 10,
+    "encrypt": 10,
+    "kms": 10,
+    "auth": 10,
+    "audit": 5,
+    "compliance": 5,
+    "firewall": 5,
+}
+
+# Chunks within this many SimHash bits of an already stored chunk of the same provider are
+# stored once and referenced from every page they appear on (0 = exact duplicates only, max 3).
+# A one-word edit is often within 3 bits, so near matches drop the differing text: they are
+# off by default, and never made against the ingesting document's own (previous) chunks.
+CHUNK_NEAR_DUPLICATE_DISTANCE = int(os.getenv("CHUNK_NEAR_DUPLICATE_DISTANCE", "0"))
+
 LLM_MODEL = os.getenv(
     "LLM_MODEL",
     "llama3.2:3b"
 )
 
+# Ollama backend pool.
+# Comma separated list of backends, each optionally restricted to the models it hosts:
+#   OLLAMA_BACKENDS="http://gpu-1:11434=qwen2.5:1.5b|gemma2:2b,http://gpu-2:11434"
+# A backend without "=models" is assumed to host every model.
+# Falls back to the single OLLAMA_BASE_URL when unset.
+def _parse_ollama_backends(raw: str) -> list[dict]:
+    backends = []
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, models = entry.partition("=")
+        backends.append({
+            "url": url.strip(),
+            "models": [m.strip() for m in models.split("|") if m.strip()],
+        })
+    return backends
+
+OLLAMA_BACKENDS = _parse_ollama_backends(
+    os.getenv("OLLAMA_BACKENDS", OLLAMA_BASE_URL)
+)
+
+# Seconds a backend is taken out of rotation after a failed call (doubles per consecutive failure)
+OLLAMA_BACKEND_COOLDOWN = float(os.getenv("OLLAMA_BACKEND_COOLDOWN", "15"))
+# Seconds to connect to a backend, and to wait for its next bytes once connected. A cold model
+# load comes before the first token, and a non-streamed call gets nothing until its whole
+# answer is generated, so the read timeout is generous. A backend exceeding either counts as failed.
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "300"))
+
+# How long Ollama keeps a model in memory after a call: a duration with a unit ("30m", "1h") or
+# a number of seconds ("300"; "-1" = forever, sent as a number since Ollama needs units in strings).
+# Per-model overrides: OLLAMA_KEEP_ALIVE_OVERRIDES="llama3.2:3b=-1,gemma2:2b=10m"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_KEEP_ALIVE_OVERRIDES = dict(
+    entry.strip().rsplit("=", 1)
+    for entry in os.getenv("OLLAMA_KEEP_ALIVE_OVERRIDES", "").split(",")
+    if "=" in entry
+)
+
+# Background model warmer: preloads the agent models at startup and re-warms them after eviction
+OLLAMA_WARMUP_ENABLED = os.getenv("OLLAMA_WARMUP_ENABLED", "False").lower() in ("true", "1", "yes")
+OLLAMA_WARMUP_INTERVAL = float(os.getenv("OLLAMA_WARMUP_INTERVAL", "60"))
+
+# Speculative deliberation: start the Architect on a stable prefix of the Analyst summary
+# instead of waiting for its last token. The speculative draft is kept only if the final
+# summary differs from the prefix it was built on by at most SPECULATIVE_MAX_DIVERGENCE (the
+# share of the final summary the draft did not see; 0.1 = the Analyst added at most 10% after it).
+DELIBERATION_SPECULATIVE = os.getenv("DELIBERATION_SPECULATIVE", "False").lower() in ("true", "1", "yes")
+SPECULATIVE_MIN_TOKENS = int(os.getenv("SPECULATIVE_MIN_TOKENS", "96"))
+SPECULATIVE_MAX_DIVERGENCE = float(os.getenv("SPECULATIVE_MAX_DIVERGENCE", "0.1"))
+
 CSRF_TRUSTED_ORIGINS = [
     "http://10.0.40.192:5173",
 ]
@@ -158,4 +384,10 @@ CORS_ALLOW_HEADERS = ['*']
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
-RAG_SIMILARITY_THRESHOLD = 0.8
\ No newline at end of file
+RAG_SIMILARITY_THRESHOLD = 0.8
+
+# Max concurrent finding explanations (retrieval + LLM call each) per policy analysis request
+POLICY_EXPLAIN_WORKERS = int(os.getenv("POLICY_EXPLAIN_WORKERS", "3"))
+
+# Regenerate the cached finding explanations for a provider right after one of its documents is ingested
+POLICY_EXPLAIN_PRECOMPUTE = os.getenv("POLICY_EXPLAIN_PRECOMPUTE", "True").lower() in ("true", "1", "yes")
\ No newline at end of file
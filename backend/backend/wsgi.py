@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+# ✅ Keep the deliberation models resident in Ollama for serving processes
+if settings.OLLAMA_WARMUP_ENABLED:
+    from services.model_warmer import start_model_warmer
+    start_model_warmer()
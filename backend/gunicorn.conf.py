@@ -0,0 +1,123 @@
+"""
+Production server profile: `gunicorn -c gunicorn.conf.py backend.wsgi:application`
+
+The app and the embedding model are loaded once in the master before the workers are
+forked, so every worker starts ready and the model weights are shared copy-on-write
+instead of being loaded (and held) once per worker.
+
+Settings come from the environment:
+  WEB_CONCURRENCY              worker processes (default: CPU count, at most 4)
+  GUNICORN_THREADS             threads per worker, i.e. concurrent requests per worker (default 8)
+  GUNICORN_BIND                (default 0.0.0.0:8000)
+  GUNICORN_MAX_REQUESTS        requests after which a worker is replaced (default 1000, 0 = never)
+  GUNICORN_GRACEFUL_TIMEOUT    seconds in-flight requests get to finish on shutdown/recycle (default 180)
+  PRELOAD_EMBEDDINGS           load the embedding model in the master (default true)
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 4)))
+
+# Answers are streamed as NDJSON for as long as the deliberation runs, and ingestion holds its
+# request for the whole crawl; threads keep one slow request from blocking the whole worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+preload_app = True
+
+# Replace workers periodically so slow leaks (tokenizer caches, fragmentation) can't accumulate.
+# Recycled workers fork from the master, which still holds the loaded app and model.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = max(max_requests // 10, 0)
+
+# On SIGTERM (deploys, `docker stop`) and on recycling, a worker stops accepting connections
+# and gets this long to finish in-flight streams before it is killed. Keep `docker stop -t`
+# (stop_grace_period) above it.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "180"))
+# Worker heartbeat; gthread workers keep beating while their threads serve long streams
+timeout = 120
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+PRELOAD_EMBEDDINGS = os.getenv("PRELOAD_EMBEDDINGS", "True").lower() in ("true", "1", "yes")
+
+# wsgi.py starts the Ollama model warmer thread when the app is loaded, which here is in the
+# master. A thread forked mid-request can leave the LLM pool's lock held in the children, and
+# one warmer per worker would poll and re-warm every backend once per worker. So the app is
+# loaded with the warmer off, and the master runs one `manage.py warm_models --watch` process
+# beside the workers; it outlives worker recycling.
+WARMUP_ENABLED = os.getenv("OLLAMA_WARMUP_ENABLED", "False").lower() in ("true", "1", "yes")
+os.environ["OLLAMA_WARMUP_ENABLED"] = "False"
+_warmer_process = None
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the first worker is forked.
+    if WARMUP_ENABLED:
+        _start_model_warmer(server)
+
+    # Only the weights are loaded here: torch's thread pools are not fork-safe, so no
+    # inference may run in the master.
+    if not PRELOAD_EMBEDDINGS:
+        return
+    from services.vectorstores import get_embeddings
+
+    start = time.perf_counter()
+    try:
+        get_embeddings()
+    except Exception as e:
+        # Workers still load the model on their first search
+        server.log.warning(f"Embedding model preload failed: {e}")
+        return
+    server.log.info(f"Embedding model preloaded in {time.perf_counter() - start:.1f}s")
+
+
+def _start_model_warmer(server):
+    global _warmer_process
+    _warmer_process = subprocess.Popen(
+        [sys.executable, "manage.py", "warm_models", "--watch"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdin=subprocess.DEVNULL,
+    )
+    server.log.info(f"Model warmer started (pid {_warmer_process.pid})")
+
+
+def on_exit(server):
+    if _warmer_process is not None and _warmer_process.poll() is None:
+        _warmer_process.terminate()
+        try:
+            _warmer_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _warmer_process.kill()
+
+
+def pre_fork(server, worker):
+    # A forked worker would share the master's database sockets; make sure there are none
+    from django.db import connections
+
+    connections.close_all()
+    # With DB_POOL, the pool's idle connections and worker threads must not be inherited
+    # either; each worker opens its own pool on its first query
+    for connection in connections.all(initialized_only=True):
+        if hasattr(connection, "close_pool"):
+            connection.close_pool()
+
+
+def post_fork(server, worker):
+    # Each worker would otherwise start one torch (or ONNX Runtime) thread per core
+    threads = max(multiprocessing.cpu_count() // server.num_workers, 1)
+    if "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(threads)
+    from django.conf import settings
+
+    if not settings.EMBEDDING_THREADS:
+        # ONNX sessions are opened by each worker on first use and read this then
+        settings.EMBEDDING_THREADS = threads
@@ -1,3 +1,29 @@
+# The fixed set of findings the rules below can produce.
+# Anything keyed on a finding (e.g. cached explanations) can rely on there being only these.
+FULL_ADMIN_FINDING = {
+    "severity": "CRITICAL",
+    "issue": "Full administrative access",
+    "reason": "Allows all actions on all resources",
+    "recommendation": "Apply least privilege and restrict actions/resources"
+}
+
+WILDCARD_ACTIONS_FINDING = {
+    "severity": "HIGH",
+    "issue": "Wildcard actions",
+    "reason": "Allows all actions on specific resources",
+    "recommendation": "Restrict actions explicitly"
+}
+
+WILDCARD_RESOURCES_FINDING = {
+    "severity": "MEDIUM",
+    "issue": "Wildcard resources",
+    "reason": "Allows actions on all resources",
+    "recommendation": "Restrict resources explicitly"
+}
+
+RULE_FINDINGS = [FULL_ADMIN_FINDING, WILDCARD_ACTIONS_FINDING, WILDCARD_RESOURCES_FINDING]
+
+
 def analyze_policy(policy: dict):
     findings = []
 
@@ -16,29 +42,14 @@ def analyze_policy(policy: dict):
 
         # Rule 1: Full admin access
         if effect == "Allow" and "*" in actions and "*" in resources:
-            findings.append({
-                "severity": "CRITICAL",
-                "issue": "Full administrative access",
-                "reason": "Allows all actions on all resources",
-                "recommendation": "Apply least privilege and restrict actions/resources"
-            })
+            findings.append(dict(FULL_ADMIN_FINDING))
 
         # Rule 2: Wildcard actions
         elif effect == "Allow" and "*" in actions:
-            findings.append({
-                "severity": "HIGH",
-                "issue": "Wildcard actions",
-                "reason": "Allows all actions on specific resources",
-                "recommendation": "Restrict actions explicitly"
-            })
+            findings.append(dict(WILDCARD_ACTIONS_FINDING))
 
         # Rule 3: Wildcard resources
         elif effect == "Allow" and "*" in resources:
-            findings.append({
-                "severity": "MEDIUM",
-                "issue": "Wildcard resources",
-                "reason": "Allows actions on all resources",
-                "recommendation": "Restrict resources explicitly"
-            })
+            findings.append(dict(WILDCARD_RESOURCES_FINDING))
 
     return findings
@@ -1,8 +1,9 @@
 import json
-from deepdiff import DeepDiff
 
 
 def diff_policies(original_policy: dict, updated_policy: dict) -> dict:
+    from deepdiff import DeepDiff  # pulls in pydantic; only load it when a diff is requested
+
     diff = DeepDiff(
         original_policy,
         updated_policy,
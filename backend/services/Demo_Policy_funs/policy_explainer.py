@@ -1,16 +1,56 @@
-from services.retriever import semantic_search
+from services.retriever import semantic_search, retrieval_generation
 from services.llm import call_llm
-from pathlib import Path
+from services.Demo_Policy_funs.policy_analyzer import RULE_FINDINGS
+from apps.policies.models import FindingExplanation
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import IntegrityError, connection
+from functools import lru_cache
+import hashlib
 
-PROMPT_PATH = Path("core/prompts/policy_explain_prompt.txt")
+PROMPT_PATH = settings.BASE_DIR / "core/prompts/policy_explain_prompt.txt"
 
 
-def explain_finding(finding: dict, provider: str = "aws"):
+@lru_cache(maxsize=1)
+def get_explain_prompt() -> tuple[str, str]:
+    """The explain prompt template and its SHA256, read from disk once per process."""
+    template = PROMPT_PATH.read_text()
+    return template, hashlib.sha256(template.encode("utf-8")).hexdigest()
+
+
+def explain_finding(finding: dict, provider: str = "aws", generation: str | None = None):
+    """
+    Explains a finding with retrieved documentation and an LLM call.
+    Explanations are cached per (issue, severity, provider, prompt, retrieval generation),
+    so repeat analyses only hit the LLM after the prompt or the provider's documents change.
+    """
     issue = finding["issue"]
     severity = finding["severity"]
     reason = finding["reason"]
     recommendation = finding["recommendation"]
 
+    prompt_template, prompt_hash = get_explain_prompt()
+    provider_key = provider.lower()
+    if generation is None:
+        generation = retrieval_generation(provider_key)
+
+    cache_key = {
+        "issue": issue,
+        "severity": severity,
+        "provider": provider_key,
+        "prompt_hash": prompt_hash,
+        "retrieval_generation": generation,
+    }
+
+    cached = FindingExplanation.objects.filter(**cache_key).first()
+    if cached:
+        return {
+            "issue": issue,
+            "severity": severity,
+            "explanation": cached.explanation,
+            "sources": cached.sources
+        }
+
     # Retrieve supporting docs
     docs = semantic_search(
         query=f"{issue} IAM policy best practices",
@@ -22,7 +62,7 @@ def explain_finding(finding: dict, provider: str = "aws"):
         doc["page_content"] for doc in docs
     )
 
-    prompt = PROMPT_PATH.read_text().format(
+    prompt = prompt_template.format(
         issue=issue,
         severity=severity,
         reason=reason,
@@ -33,9 +73,70 @@ def explain_finding(finding: dict, provider: str = "aws"):
 
     explanation = call_llm(prompt)
 
-    return {
+    result = {
         "issue": issue,
         "severity": severity,
         "explanation": explanation.strip(),
         "sources": [doc["metadata"] for doc in docs]
     }
+
+    try:
+        FindingExplanation.objects.create(
+            **cache_key,
+            explanation=result["explanation"],
+            sources=result["sources"],
+        )
+        # Entries for an older prompt or index generation can never be hit again
+        FindingExplanation.objects.filter(
+            issue=issue, severity=severity, provider=provider_key
+        ).exclude(prompt_hash=prompt_hash, retrieval_generation=generation).delete()
+    except IntegrityError:
+        pass  # another request generated the same explanation concurrently
+
+    return result
+
+
+def explain_findings(findings: list[dict], provider: str = "aws") -> list[dict]:
+    """
+    Explains a list of findings, one explanation per distinct (issue, provider).
+
+    Rule findings repeat (a policy with 20 wildcard statements yields 20 identical findings),
+    so each distinct issue is explained once, concurrently on a bounded pool, and the
+    result is fanned back out to every finding with that issue.
+    """
+    unique = {}
+    for finding in findings:
+        unique.setdefault((finding["issue"], provider), finding)
+
+    if not unique:
+        return []
+
+    generation = retrieval_generation(provider.lower())
+
+    def explain_in_thread(finding):
+        try:
+            return explain_finding(finding, provider, generation=generation)
+        finally:
+            # Worker threads get their own DB connection; Django only closes request-thread ones
+            connection.close()
+
+    workers = max(1, min(len(unique), settings.POLICY_EXPLAIN_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        explanations = dict(zip(
+            unique.keys(),
+            pool.map(explain_in_thread, unique.values()),
+        ))
+
+    return [
+        dict(explanations[(finding["issue"], provider)])
+        for finding in findings
+    ]
+
+
+def precompute_explanations(provider: str) -> int:
+    """
+    Generates and caches explanations for every finding the analyzer can produce,
+    so policy analysis for this provider is served from the cache.
+    Returns how many findings were explained.
+    """
+    return len(explain_findings(list(RULE_FINDINGS), provider))
@@ -0,0 +1,374 @@
+"""
+Registering many documents at once (`POST /api/documents/bulk/`, `manage.py bulk_ingest`).
+
+The API does not ingest in the request: it stores the manifest as a BulkIngestJob and starts
+a `manage.py bulk_ingest --job <id>` process, which outlives web worker timeouts and recycling.
+The job's progress and report are read back from GET /api/documents/bulk/<id>/. While it
+runs, the process touches the job every BULK_JOB_HEARTBEAT seconds; a job not touched for
+BULK_JOB_STALE_AFTER seconds (its process was killed, or never started) is marked failed
+when a job is read or queued.
+
+A manifest (CSV or JSON) lists the documents. URLs already in the manifest or already
+registered as a Document are skipped, unless `refresh` asks for registered ones to be
+re-ingested. The rest are ingested `concurrency` at a time: each crawl runs in its own
+crawl worker process, while every chunk goes through one BatchedVectorWriter thread. That
+thread embeds with the process's single embedding model, one batch at a time, and merges the
+batches that pile up meanwhile into one write per collection. Text the documents of a provider
+share is deduplicated across the whole batch, not only against what is already stored. The FAISS mirror and cached
+explanations of each provider are refreshed once at the end, not after every document.
+"""
+import csv
+import io
+import json
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from apps.documents.models import BulkIngestJob, Document
+from services.chunk_dedup import MAX_DISTANCE, PendingChunks
+from services.crawl_frontier import url_key
+from services.ingestion import ingest_document, refresh_explanations, refresh_retrieval_index
+from services.vectorstores import get_client, get_embeddings, get_vectorstore, provider_key
+
+MANIFEST_FIELDS = ["title", "url", "provider", "version", "sitemap_url", "include_patterns", "exclude_patterns"]
+# Largest merged write; a single ingestion batch bigger than this is still written whole
+WRITE_BATCH = 2000
+
+
+def load_manifest(content: str, fmt: str | None = None) -> list[dict]:
+    """
+    Documents of a manifest. JSON: a list of objects, or {"documents": [...]}. CSV: a header
+    row naming MANIFEST_FIELDS columns; crawl patterns are separated by whitespace (URLs
+    contain none). The format is guessed from the content unless `fmt` is "csv" or "json".
+    """
+    fmt = fmt or ("json" if content.lstrip()[:1] in ("[", "{") else "csv")
+    if fmt == "json":
+        data = json.loads(content)
+        entries = data.get("documents") if isinstance(data, dict) else data
+        if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+            raise ValueError("A JSON manifest must be a list of documents or {\"documents\": [...]}")
+        return entries
+
+    entries = []
+    for row in csv.DictReader(io.StringIO(content)):
+        entry = {field: (row.get(field) or "").strip() or None for field in MANIFEST_FIELDS}
+        for field in ("include_patterns", "exclude_patterns"):
+            entry[field] = entry[field].split() if entry[field] else None
+        entries.append(entry)
+    return entries
+
+
+def validate_entry(entry: dict) -> str | None:
+    """Why the document can't be ingested, or None."""
+    if not entry.get("title") or not entry.get("url") or not entry.get("provider"):
+        return "title, url, provider are required"
+    for field in ("include_patterns", "exclude_patterns"):
+        patterns = entry.get(field)
+        if patterns is None:
+            continue
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            return f"{field} must be a list of regular expressions"
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                return f"Invalid pattern in {field}: {pattern} ({e})"
+    return None
+
+
+class _WriteRequest:
+    def __init__(self, vectorstore, texts, metadatas, ids):
+        self.vectorstore = vectorstore
+        self.collection = vectorstore._collection.name
+        self.texts, self.metadatas, self.ids = list(texts), list(metadatas), list(ids)
+        self.done = threading.Event()
+        self.error = None
+        self.written = []  # ids this request ended up writing
+
+
+class _BoundWriter:
+    """The vector store interface ingest_document writes through."""
+
+    def __init__(self, writer, vectorstore):
+        self._writer = writer
+        self._vectorstore = vectorstore
+
+    def add_texts(self, texts, metadatas, ids) -> list[str]:
+        return self._writer.write(self._vectorstore, texts, metadatas, ids)
+
+
+class BatchedVectorWriter:
+    """
+    Embeds and stores the chunks of concurrent ingestions from a single thread.
+    A write blocks its ingestion until its chunks are stored, since fingerprints and crawl
+    checkpoints are only recorded after that; other ingestions keep crawling and chunking.
+
+    The ingestions of a provider share one PendingChunks, so a chunk they have in common is
+    claimed by the first and referenced by the others. Those write it with their own batches
+    until it is stored, and ids already written in this run are skipped: it is embedded once.
+    """
+
+    def __init__(self, max_batch: int = WRITE_BATCH):
+        self.max_batch = max_batch
+        self.writes = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self._pending = {}  # provider key -> PendingChunks
+        self._pending_lock = threading.Lock()
+        self._written = {}  # collection name -> ids written in this run
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="bulk-vector-writer", daemon=True)
+        self._thread.start()
+
+    def bind(self, vectorstore) -> _BoundWriter:
+        return _BoundWriter(self, vectorstore)
+
+    def pending_chunks(self, provider: str) -> PendingChunks:
+        with self._pending_lock:
+            key = provider_key(provider)
+            if key not in self._pending:
+                self._pending[key] = PendingChunks(min(settings.CHUNK_NEAR_DUPLICATE_DISTANCE, MAX_DISTANCE))
+            return self._pending[key]
+
+    def write(self, vectorstore, texts, metadatas, ids) -> list[str]:
+        """Stores the chunks; returns the ids written (not those already written in this run)."""
+        request = _WriteRequest(vectorstore, texts, metadatas, ids)
+        self._requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.written
+
+    def close(self):
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        waiting = deque()  # requests for another collection than the batch being merged
+        while True:
+            request = waiting.popleft() if waiting else self._requests.get()
+            if request is None:
+                return
+            batch, size = [request], len(request.texts)
+            for other in list(waiting):
+                if other.collection == request.collection and size + len(other.texts) <= self.max_batch:
+                    waiting.remove(other)
+                    batch.append(other)
+                    size += len(other.texts)
+            while size < self.max_batch:
+                try:
+                    other = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if other is not None and other.collection == request.collection and size + len(other.texts) <= self.max_batch:
+                    batch.append(other)
+                    size += len(other.texts)
+                else:
+                    waiting.append(other)
+            self._write(batch)
+
+    def _write(self, batch: list[_WriteRequest]):
+        start = time.perf_counter()
+        written = self._written.setdefault(batch[0].collection, set())
+        texts, metadatas, ids = [], [], []
+        for r in batch:
+            for text, metadata, chunk_id in zip(r.texts, r.metadatas, r.ids):
+                # Shared chunks come from every ingestion referencing them before they are stored
+                if chunk_id in written:
+                    continue
+                r.written.append(chunk_id)
+                written.add(chunk_id)
+                texts.append(text)
+                metadatas.append(metadata)
+                ids.append(chunk_id)
+        try:
+            if ids:
+                batch[0].vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+        except Exception as e:
+            written.difference_update(ids)
+            for r in batch:
+                r.error = e
+        else:
+            if ids:
+                self.writes += 1
+            self.chunks += len(ids)
+        finally:
+            self.seconds += time.perf_counter() - start
+            for r in batch:
+                r.done.set()
+
+
+def plan_bulk_ingest(entries: list[dict], refresh: bool = False) -> tuple[list[dict], list[dict]]:
+    """
+    Splits manifest entries into the documents to ingest and the skipped ones
+    ({"url", "reason"}: "duplicate in manifest" or "already registered"). URLs are compared in
+    canonical form; a registered document being refreshed keeps the URL it was registered with.
+    """
+    registered = {url_key(url): url for url in Document.objects.values_list("source_url", flat=True)}
+    seen = set()
+    todo, skipped = [], []
+    for entry in entries:
+        key = url_key(entry["url"])
+        if key in seen:
+            skipped.append({"url": entry["url"], "reason": "duplicate in manifest"})
+        elif key in registered and not refresh:
+            skipped.append({"url": entry["url"], "reason": "already registered"})
+        else:
+            todo.append({**entry, "url": registered.get(key, entry["url"])})
+        seen.add(key)
+    return todo, skipped
+
+
+def bulk_ingest(entries: list[dict], concurrency: int | None = None, refresh: bool = False, progress=None) -> dict:
+    """
+    Ingests the documents of a manifest (already validated) and returns an aggregate report:
+    per-document results, totals and throughput. `progress(result, done, total)` is called
+    as each document finishes.
+    """
+    concurrency = max(concurrency or settings.BULK_INGEST_CONCURRENCY, 1)
+    todo, skipped = plan_bulk_ingest(entries, refresh)
+    writer = BatchedVectorWriter()
+    results = []
+    started = time.perf_counter()
+
+    def ingest(entry: dict) -> dict:
+        result = {"url": entry["url"], "provider": entry["provider"]}
+        start = time.perf_counter()
+        try:
+            summary = ingest_document(
+                entry["title"], entry["url"], entry["provider"], entry.get("version"),
+                sitemap_url=entry.get("sitemap_url"),
+                include_patterns=entry.get("include_patterns"),
+                exclude_patterns=entry.get("exclude_patterns"),
+                vector_writer=writer,
+                refresh_provider=False,
+            )
+            result["status"] = "ingested" if summary["complete"] else "incomplete"
+            result["summary"] = summary
+        except Exception as e:
+            print(f"❌ Bulk ingestion of {entry['url']} failed: {e}", flush=True)
+            result["status"] = "failed"
+            result["error"] = str(e)
+        finally:
+            # Pool threads end with the batch; don't leave their connections behind
+            connections.close_all()
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        return result
+
+    # Loaded once here rather than by whichever ingestions get to them first
+    get_embeddings()
+    get_client()
+
+    print(f"⏳ Bulk ingesting {len(todo)} documents, {concurrency} at a time ({len(skipped)} skipped)", flush=True)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bulk-ingest") as pool:
+            for future in as_completed([pool.submit(ingest, entry) for entry in todo]):
+                result = future.result()
+                results.append(result)
+                if progress:
+                    progress(result, len(results), len(todo))
+    finally:
+        writer.close()
+    ingest_seconds = time.perf_counter() - started
+
+    # Once per provider instead of after each document
+    providers = {provider_key(r["provider"]): r["provider"] for r in results if r["status"] != "failed"}
+    for provider in providers.values():
+        refresh_retrieval_index(get_vectorstore(provider), provider)
+        refresh_explanations(provider)
+
+    summaries = [r["summary"] for r in results if "summary" in r]
+    totals = {
+        key: sum(s[key] for s in summaries)
+        for key in ("pages", "pages_unchanged", "chunks_embedded", "chunks_reused", "chunks_deduplicated")
+    }
+    elapsed = time.perf_counter() - started
+    return {
+        "requested": len(entries),
+        "skipped": skipped,
+        "ingested": sum(1 for r in results if r["status"] == "ingested"),
+        "incomplete": sum(1 for r in results if r["status"] == "incomplete"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        **totals,
+        "vector_writes": writer.writes,
+        "chunks_per_write": round(writer.chunks / writer.writes, 1) if writer.writes else 0,
+        "embedding_seconds": round(writer.seconds, 2),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "documents_per_minute": round(len(results) / ingest_seconds * 60, 2) if results else 0,
+        "pages_per_second": round(totals["pages"] / ingest_seconds, 2) if results else 0,
+        "chunks_per_second": round(totals["chunks_embedded"] / ingest_seconds, 2) if results else 0,
+        "documents": results,
+    }
+
+
+def fail_stale_jobs() -> int:
+    """Marks queued and running jobs whose process stopped sending heartbeats as failed; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.BULK_JOB_STALE_AFTER)
+    return BulkIngestJob.objects.filter(status__in=("queued", "running"), updated_at__lt=cutoff).update(
+        status="failed",
+        error=f"The ingestion process stopped without finishing (no heartbeat for {settings.BULK_JOB_STALE_AFTER}s)",
+        updated_at=timezone.now(),
+    )
+
+
+def start_bulk_job(entries: list[dict], concurrency: int, refresh: bool = False) -> BulkIngestJob:
+    """Queues a validated manifest and starts the process that ingests it."""
+    fail_stale_jobs()
+    job = BulkIngestJob.objects.create(entries=entries, concurrency=concurrency, refresh=refresh)
+    # Own session: stopping or recycling the web worker must not take the job down with it
+    subprocess.Popen(
+        [sys.executable, "manage.py", "bulk_ingest", "--job", str(job.pk)],
+        cwd=settings.BASE_DIR,
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return job
+
+
+def run_bulk_job(job_id: int, progress=None) -> dict:
+    """Ingests a queued BulkIngestJob, recording its progress and report on it."""
+    job = BulkIngestJob.objects.get(pk=job_id)
+    if job.status != "queued":
+        raise ValueError(f"Bulk ingestion {job_id} is {job.status}, not queued")
+    job.status = "running"
+    job.total = len(plan_bulk_ingest(job.entries, job.refresh)[0])
+    job.save(update_fields=["status", "total", "updated_at"])
+
+    def record(result: dict, done: int, total: int):
+        BulkIngestJob.objects.filter(pk=job_id).update(done=done, total=total, updated_at=timezone.now())
+        if progress:
+            progress(result, done, total)
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(settings.BULK_JOB_HEARTBEAT):
+            BulkIngestJob.objects.filter(pk=job_id, status="running").update(updated_at=timezone.now())
+        connections.close_all()
+
+    beat = threading.Thread(target=heartbeat, name="bulk-job-heartbeat", daemon=True)
+    beat.start()
+    try:
+        report = bulk_ingest(job.entries, concurrency=job.concurrency, refresh=job.refresh, progress=record)
+    except Exception as e:
+        BulkIngestJob.objects.filter(pk=job_id).update(status="failed", error=str(e), updated_at=timezone.now())
+        raise
+    finally:
+        stop.set()
+        beat.join()
+    job.refresh_from_db()
+    job.status = "done"
+    job.report = json.loads(json.dumps(report, default=str))
+    job.save(update_fields=["status", "report", "updated_at"])
+    return report
@@ -0,0 +1,274 @@
+"""
+Cross-document chunk deduplication.
+
+Cloud doc sites repeat the same boilerplate and shared sections on many pages. Before a
+chunk is embedded, ingestion asks the ChunkDeduplicator whether an exact duplicate (or, with
+CHUNK_NEAR_DUPLICATE_DISTANCE > 0, a near-duplicate of another document's chunk) is already
+stored for the provider. If so, the page only records a ChunkReference to that chunk instead
+of adding another copy to the vector store.
+
+A stored chunk carries the metadata of its owner document. When the owner drops the chunk
+(re-ingest or delete) while other pages still reference it, ownership moves to one of them
+instead of the chunk being deleted.
+"""
+import hashlib
+import re
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from apps.documents.models import ChunkFingerprint, ChunkReference
+from services.fingerprint import SimHashIndex, bands, from_signed64, hamming_distance, simhash, to_signed64
+
+# ChunkFingerprint stores four 16-bit bands, which finds every pair within 3 bits
+BAND_COUNT = 4
+MAX_DISTANCE = BAND_COUNT - 1
+
+
+def normalize_chunk(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def chunk_signature(text: str) -> tuple[str, int]:
+    """(content hash, SimHash) of a chunk."""
+    normalized = normalize_chunk(text)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest(), simhash(normalized)
+
+
+class PendingChunks:
+    """
+    Chunks of one provider that ingestions have claimed (decided to store) but not flushed yet.
+    Each ingestion has its own; a bulk ingestion shares one per provider between its concurrent
+    ingestions, so text they have in common is claimed once instead of stored once per document.
+    """
+
+    def __init__(self, max_distance: int):
+        self._lock = threading.Lock()
+        self._claims = {}     # chunk_id -> claim
+        self._hashes = {}     # content_hash -> chunk_id
+        self._index = SimHashIndex(max_distance)
+
+    def find(self, content_hash: str, fingerprint: int) -> dict | None:
+        with self._lock:
+            chunk_id = self._hashes.get(content_hash)
+            if chunk_id is None and self._index.max_distance > 0:
+                chunk_id = self._index.find(fingerprint)
+            claim = self._claims.get(chunk_id)
+            return dict(claim) if claim else None
+
+    def claim(self, chunk_id: str, content_hash: str, fingerprint: int, owner_url: str,
+              text: str | None = None, metadata: dict | None = None):
+        with self._lock:
+            self._claims[chunk_id] = {
+                "chunk_id": chunk_id,
+                "content_hash": content_hash,
+                "simhash": fingerprint,
+                "owner_url": owner_url,
+                "text": text,
+                "metadata": metadata,
+                "stored": False,
+            }
+            self._hashes.setdefault(content_hash, chunk_id)
+            self._index.add(fingerprint, chunk_id)
+
+    def get(self, chunk_id: str) -> dict | None:
+        with self._lock:
+            claim = self._claims.get(chunk_id)
+            return dict(claim) if claim else None
+
+    def mark_stored(self, chunk_ids):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                claim = self._claims.get(chunk_id)
+                if claim is not None:
+                    claim["stored"] = True
+                    claim["text"] = claim["metadata"] = None  # only needed until it is stored
+
+
+class ChunkDeduplicator:
+    """
+    Per-ingest view of the provider's chunk fingerprints.
+    New fingerprints and references are kept pending until `flush()`, which ingestion
+    calls once the corresponding chunks have been written to the vector store.
+
+    With a shared `pending` (bulk ingestion), a chunk another ingestion has claimed but not
+    stored yet is referenced too; `borrow()` then hands out its text and its owner's metadata
+    so this ingestion writes it along with its own batch (the shared writer stores it once).
+    """
+
+    def __init__(self, provider: str, source_url: str, title: str, max_distance: int | None = None,
+                 pending: PendingChunks | None = None):
+        self.provider = provider.lower()
+        self.source_url = source_url
+        self.title = title
+        if max_distance is None:
+            max_distance = settings.CHUNK_NEAR_DUPLICATE_DISTANCE
+        self.max_distance = min(max_distance, MAX_DISTANCE)
+
+        self._pending = []       # (chunk_id, content_hash, simhash, owner_url)
+        self._pending_refs = []  # (chunk_id, page_url)
+        self._claims = pending if pending is not None else PendingChunks(self.max_distance)
+        self._borrowed = {}      # chunk_id of another ingestion's claim -> whether borrow() handed it out
+
+    def find(self, text: str, page_url: str) -> tuple[str | None, tuple[str, int]]:
+        """
+        Looks up a stored (or pending) duplicate of `text`.
+        Returns (chunk id or None, signature). When a duplicate is found a reference from
+        `page_url` is queued; otherwise pass the signature to `add()` with the new chunk id.
+        """
+        signature = chunk_signature(text)
+        claim = self._claims.find(*signature)
+        if claim is not None:
+            chunk_id = claim["chunk_id"]
+            if claim["owner_url"] != self.source_url and chunk_id not in self._borrowed:
+                # Another ingestion's chunk: record its fingerprint with ours, under its owner
+                self._borrowed[chunk_id] = False
+                self._pending.append((chunk_id, claim["content_hash"], claim["simhash"], claim["owner_url"]))
+        else:
+            chunk_id = self._find_stored(*signature)
+        if chunk_id:
+            self._pending_refs.append((chunk_id, page_url))
+        return chunk_id, signature
+
+    def add(self, chunk_id: str, signature: tuple[str, int], page_url: str,
+            text: str | None = None, metadata: dict | None = None):
+        content_hash, fingerprint = signature
+        self._pending.append((chunk_id, content_hash, fingerprint, self.source_url))
+        self._pending_refs.append((chunk_id, page_url))
+        self._claims.claim(chunk_id, content_hash, fingerprint, self.source_url, text, metadata)
+
+    def borrow(self, chunk_id: str) -> tuple[str, dict] | None:
+        """
+        (text, owner's metadata) of a chunk `find()` returned that another ingestion claimed but
+        has not stored yet, the first time it is asked for; None otherwise. Writing it with this
+        ingestion's next batch guarantees it is stored before this ingestion records its pages.
+        """
+        if self._borrowed.get(chunk_id, True):
+            return None
+        self._borrowed[chunk_id] = True
+        claim = self._claims.get(chunk_id)
+        if claim["stored"] or claim["text"] is None:
+            return None
+        return claim["text"], claim["metadata"]
+
+    def _find_stored(self, content_hash: str, fingerprint: int) -> str | None:
+        candidates = ChunkFingerprint.objects.filter(provider=self.provider)
+
+        exact = candidates.filter(content_hash=content_hash).values_list("chunk_id", flat=True).first()
+        if exact or self.max_distance <= 0:
+            return exact
+
+        band_match = Q()
+        for i, band in enumerate(bands(fingerprint, BAND_COUNT)):
+            band_match |= Q(**{f"band_{i}": band})
+        # Never near-match this document's own chunks: those are its previous crawl, and a
+        # small edit (Allow -> Deny) would otherwise keep serving the old text
+        near = (
+            candidates.filter(band_match)
+            .exclude(owner_url=self.source_url)
+            .exclude(references__source_url=self.source_url)
+        )
+        for chunk_id, other in near.values_list("chunk_id", "simhash"):
+            if hamming_distance(fingerprint, from_signed64(other)) <= self.max_distance:
+                return chunk_id
+        return None
+
+    @transaction.atomic
+    def flush(self):
+        """Persists pending fingerprints and references."""
+        ChunkFingerprint.objects.bulk_create(
+            [
+                ChunkFingerprint(
+                    chunk_id=chunk_id,
+                    provider=self.provider,
+                    content_hash=content_hash,
+                    simhash=to_signed64(fingerprint),
+                    **{f"band_{i}": band for i, band in enumerate(bands(fingerprint, BAND_COUNT))},
+                    owner_url=owner_url,
+                )
+                for chunk_id, content_hash, fingerprint, owner_url in self._pending
+            ],
+            ignore_conflicts=True,
+        )
+
+        ids = {chunk_id for chunk_id, _ in self._pending_refs}
+        fingerprint_pks = dict(ChunkFingerprint.objects.filter(chunk_id__in=ids).values_list("chunk_id", "pk"))
+        ChunkReference.objects.bulk_create(
+            [
+                ChunkReference(
+                    fingerprint_id=fingerprint_pks[chunk_id],
+                    source_url=self.source_url,
+                    page_url=page_url,
+                    title=self.title,
+                )
+                for chunk_id, page_url in dict.fromkeys(self._pending_refs)
+                if chunk_id in fingerprint_pks
+            ],
+            ignore_conflicts=True,
+        )
+
+        # Only called once the chunks are written: other ingestions need not write them any more
+        self._claims.mark_stored(chunk_id for chunk_id, *_ in self._pending)
+        self._pending.clear()
+        self._pending_refs.clear()
+
+
+def release_document_chunks(vectorstore, source_url: str, keep_ids: set[str]) -> set[str]:
+    """
+    Drops `source_url`'s references to chunks outside `keep_ids`.
+    Chunks it owned that other pages still reference are handed over to one of them
+    (the stored metadata is rewritten in place, no re-embedding). Fingerprints of chunks
+    nobody references any more are removed.
+    Returns the ids of the chunks that were handed over; the caller must not delete them.
+    """
+    with transaction.atomic():
+        ChunkReference.objects.filter(source_url=source_url).exclude(
+            fingerprint__chunk_id__in=keep_ids
+        ).delete()
+
+        released = ChunkFingerprint.objects.filter(owner_url=source_url).exclude(chunk_id__in=keep_ids)
+        handed_over = {}
+        orphaned = []
+        for fingerprint in released.prefetch_related("references"):
+            reference = next(iter(fingerprint.references.all()), None)
+            if reference is None:
+                orphaned.append(fingerprint.pk)
+                continue
+            fingerprint.owner_url = reference.source_url
+            fingerprint.save(update_fields=["owner_url"])
+            handed_over[fingerprint.chunk_id] = reference
+
+        ChunkFingerprint.objects.filter(pk__in=orphaned).delete()
+
+    if handed_over:
+        stored = vectorstore.get(ids=list(handed_over), include=["metadatas"])
+        metadatas = []
+        for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+            reference = handed_over[chunk_id]
+            metadatas.append({
+                **(metadata or {}),
+                "source": reference.source_url,
+                "title": reference.title,
+                "page_url": reference.page_url,
+            })
+        vectorstore._collection.update(ids=stored["ids"], metadatas=metadatas)
+        print(f"ℹ️ Handed {len(handed_over)} shared chunks of {source_url} over to other documents", flush=True)
+
+    return set(handed_over)
+
+
+def other_sources(chunk_ids: list[str]) -> dict[str, list[dict]]:
+    """Every page each chunk appears on, keyed by chunk id."""
+    sources = {}
+    references = ChunkReference.objects.filter(fingerprint__chunk_id__in=chunk_ids).values(
+        "fingerprint__chunk_id", "source_url", "page_url", "title"
+    )
+    for ref in references:
+        sources.setdefault(ref["fingerprint__chunk_id"], []).append({
+            "source": ref["source_url"],
+            "page_url": ref["page_url"],
+            "title": ref["title"],
+        })
+    return sources
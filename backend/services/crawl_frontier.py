@@ -0,0 +1,174 @@
+"""
+Rules applied to URLs before they are scheduled for crawling.
+
+Doc sites link the same page under many URLs (#fragments, ?tab= switches, tracking
+parameters, language variants). Canonicalizing them first lets Scrapy's duplicate
+filter see one page, so crawl budget goes to distinct content.
+"""
+import fnmatch
+import re
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.utils.dateparse import parse_date, parse_datetime
+
+from services.fingerprint import SimHashIndex, simhash
+
+# ISO 639-1 codes that doc sites use as a leading path segment ("/fr/", "/ja_jp/", "/en-us/")
+LOCALE_LANGUAGES = {
+    "ar", "bg", "cs", "da", "de", "el", "en", "es", "et", "fi", "fr", "he", "hi", "hr", "hu",
+    "id", "it", "ja", "ko", "lt", "lv", "ms", "nb", "nl", "no", "pl", "pt", "ro", "ru", "sk",
+    "sl", "sr", "sv", "th", "tr", "uk", "vi", "zh",
+}
+_LOCALE_SEGMENT_RE = re.compile(r"^([a-z]{2})(?:[-_][a-z]{2,4})?$")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _drop_param(name: str) -> bool:
+    return any(fnmatch.fnmatch(name.lower(), pattern) for pattern in settings.CRAWL_DROP_QUERY_PARAMS)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL so variants of the same page compare equal:
+    lowercase scheme/host, no default port, no fragment, no tab/tracking/language
+    query parameters, remaining parameters sorted, no duplicate slashes.
+    The trailing slash is kept, since servers redirect directory URLs without it.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _drop_param(k)
+    ))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_key(url: str) -> str:
+    """Key under which a URL is deduplicated: its canonical form without a trailing slash."""
+    canonical = canonicalize_url(url)
+    parts = urlsplit(canonical)
+    if len(parts.path) > 1 and parts.path.endswith("/"):
+        canonical = urlunsplit(parts._replace(path=parts.path.rstrip("/")))
+    return canonical
+
+
+def url_locale(url: str) -> str | None:
+    """Locale of a URL's leading path segment (e.g. "fr_fr"), or None if it has none."""
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if not segments:
+        return None
+    first = segments[0].lower()
+    match = _LOCALE_SEGMENT_RE.match(first)
+    if match and match.group(1) in LOCALE_LANGUAGES:
+        return first
+    return None
+
+
+def is_other_locale(url: str, start_locale: str | None) -> bool:
+    """True for language variants of the site other than the one the crawl started in."""
+    locale = url_locale(url)
+    return locale is not None and locale != start_locale
+
+
+def priority_score(url: str, link_text: str = "") -> int:
+    """
+    Scheduling priority of a link: the summed CRAWL_PRIORITY_KEYWORDS weights found in
+    its path and anchor text, so security/IAM pages are fetched before the page limit hits.
+    """
+    haystack = f"{urlsplit(url).path} {link_text}".lower()
+    return sum(weight for keyword, weight in settings.CRAWL_PRIORITY_KEYWORDS.items() if keyword in haystack)
+
+
+def parse_lastmod(value: str | None):
+    """Sitemap <lastmod> (W3C datetime, possibly just a date) as an aware datetime, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime(day.year, day.month, day.day)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class CrawlFrontier:
+    """
+    Per-crawl state deciding which links get scheduled and which pages get ingested.
+    Counts everything it drops in `stats`, which ends up in the ingest summary.
+    """
+
+    def __init__(self, start_url: str, max_distance: int | None = None,
+                 include_patterns: list[str] | None = None, exclude_patterns: list[str] | None = None):
+        self.start_locale = url_locale(start_url)
+        self.include = [re.compile(p) for p in include_patterns or []]
+        self.exclude = [re.compile(p) for p in exclude_patterns or []]
+        self.seen = {url_key(start_url)}
+        self.pages = SimHashIndex(
+            settings.CRAWL_NEAR_DUPLICATE_DISTANCE if max_distance is None else max_distance
+        )
+        self.stats = {
+            "duplicate_urls_skipped": 0,
+            "other_locale_skipped": 0,
+            "near_duplicate_pages": 0,
+            "excluded_by_rules": 0,
+            "sitemap_unchanged": 0,
+        }
+
+    def snapshot(self) -> dict:
+        """What a resumed crawl needs to continue this one (kept in Scrapy's spider state)."""
+        return {"seen": self.seen, "pages": self.pages, "stats": self.stats}
+
+    def restore(self, snapshot: dict):
+        self.seen = snapshot["seen"]
+        self.pages = snapshot["pages"]
+        snapshot["stats"].update({k: 0 for k in self.stats if k not in snapshot["stats"]})
+        self.stats = snapshot["stats"]
+
+    def matches_rules(self, url: str) -> bool:
+        if self.include and not any(p.search(url) for p in self.include):
+            return False
+        return not any(p.search(url) for p in self.exclude)
+
+    def admit(self, url: str) -> str | None:
+        """Canonical URL to request for a discovered link, or None if it should not be crawled."""
+        if urlsplit(url).scheme not in _DEFAULT_PORTS:
+            return None
+        if is_other_locale(url, self.start_locale):
+            self.stats["other_locale_skipped"] += 1
+            return None
+        if not self.matches_rules(canonicalize_url(url)):
+            self.stats["excluded_by_rules"] += 1
+            return None
+        key = url_key(url)
+        if key in self.seen:
+            self.stats["duplicate_urls_skipped"] += 1
+            return None
+        self.seen.add(key)
+        return canonicalize_url(url)
+
+    def is_near_duplicate(self, page_url: str, text: str) -> bool:
+        """True if an earlier page of this crawl has (nearly) the same text."""
+        fingerprint = simhash(text)
+        match = self.pages.find(fingerprint)
+        if match == page_url:
+            return False  # the same page fetched again (e.g. the start URL of a resumed crawl)
+        if match is not None:
+            self.stats["near_duplicate_pages"] += 1
+            return True
+        self.pages.add(fingerprint, page_url)
+        return False
@@ -0,0 +1,90 @@
+"""
+On-disk crawl state of a Document, so an ingestion can stop (time slice, timeout, restart)
+and resume where it left off instead of starting over.
+
+Each document gets a directory under CRAWL_STATE_DIR holding:
+  jobdir/      Scrapy's JOBDIR: pending requests, seen request fingerprints and spider state
+  pages.jsonl  one line per page whose chunks are stored in the vector store
+  clean        marker written when a slice ended gracefully
+
+Scrapy only keeps a consistent JOBDIR when the crawl is closed gracefully. If the last slice
+did not end cleanly (process killed), the jobdir is discarded and the crawl restarts; the
+pages already recorded are not embedded again and their responses come from the HTTP cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+
+
+class CrawlCheckpoint:
+
+    def __init__(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        self.path = Path(settings.CRAWL_STATE_DIR).resolve() / key
+        self.pages_file = self.path / "pages.jsonl"
+        self.clean_marker = self.path / "clean"
+        self._pending = []
+
+    @property
+    def jobdir(self) -> str:
+        return str(self.path / "jobdir")
+
+    def load(self) -> dict[str, dict]:
+        """
+        Pages recorded by earlier slices, {page_url: {"page_hash", "chunk_ids", "lastmod"}}.
+        Discards the Scrapy job state if the previous slice did not end cleanly.
+        """
+        if self.path.exists() and not self.clean_marker.exists():
+            shutil.rmtree(self.jobdir, ignore_errors=True)
+        self.clean_marker.unlink(missing_ok=True)
+
+        pages = {}
+        if self.pages_file.exists():
+            with self.pages_file.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line of a killed run
+                    pages[record.pop("page_url")] = {"lastmod": None, **record}
+        return pages
+
+    def record(self, page_url: str, page_hash: str, chunk_ids: list[str], lastmod: str | None = None):
+        """Queues a page; it is written by the next commit(), once its chunks are stored."""
+        self._pending.append({"page_url": page_url, "page_hash": page_hash, "chunk_ids": chunk_ids, "lastmod": lastmod})
+
+    def commit(self):
+        if not self._pending:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self.pages_file.open("a", encoding="utf-8") as f:
+            for record in self._pending:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+
+    def mark_clean(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.clean_marker.touch()
+
+    def clear(self):
+        """Removes all state once the crawl is complete."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def checkpointed_page_hashes() -> set[str]:
+    """Hashes of the pages recorded by every crawl still in progress."""
+    hashes = set()
+    for pages_file in Path(settings.CRAWL_STATE_DIR).resolve().glob("*/pages.jsonl"):
+        with pages_file.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    hashes.add(json.loads(line)["page_hash"])
+                except (json.JSONDecodeError, KeyError):
+                    continue
+    return hashes
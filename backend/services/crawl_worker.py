@@ -0,0 +1,242 @@
+"""
+Crawl worker: runs one Scrapy crawl in its own process.
+
+The web and ingestion processes never import Scrapy or Twisted; services.crawler starts
+this module as a subprocess (`python -m services.crawl_worker`) and talks to it over pipes:
+
+  stdin   one JSON line: {"url", "max_depth", "settings", "spider_options"}
+  stdout  one JSON line per event:
+            {"type": "page", "url", "text", "lastmod"}   text is null for pages skipped as unchanged
+            {"type": "done", "stats", "finish_reason"}
+            {"type": "error", "error"}
+
+Anything else the crawl prints goes to stderr. SIGTERM stops the crawl gracefully, so a
+JOBDIR stays consistent. When the reader falls behind, the pipe fills up and the crawl
+engine is paused until it catches up.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import traceback
+import urllib.parse
+
+import django
+import scrapy
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.gz import gunzip
+from scrapy.utils.sitemap import Sitemap
+
+from services.crawl_frontier import CrawlFrontier, canonicalize_url, parse_lastmod, priority_score
+from services.page_text import extract_page_text
+
+
+class PageFeed:
+    """
+    Writes extracted pages to the parent process from a writer thread, so the reactor never
+    blocks on the pipe. When `max_backlog` pages are waiting, the crawl engine is paused
+    until the writer catches up, keeping memory bounded however large the crawl is.
+    """
+    DONE = object()
+
+    def __init__(self, out, max_backlog: int = 16):
+        self.out = out
+        self.queue = queue.Queue()
+        self.max_backlog = max_backlog
+        self.engine = None
+        self.paused = False
+        self.stats = {}
+        self.broken = False
+        self.on_broken = None
+        self._writer = threading.Thread(target=self._write_pages, name="crawl-page-writer", daemon=True)
+        self._writer.start()
+
+    # Reactor thread
+    def put(self, page):
+        self.queue.put(page)
+        if self.engine and not self.paused and self.queue.qsize() >= self.max_backlog:
+            self.engine.pause()
+            self.paused = True
+
+    def _resume(self):
+        if self.engine and self.paused:
+            self.engine.unpause()
+            self.paused = False
+
+    # Writer thread
+    def _write_pages(self):
+        from twisted.internet import reactor
+
+        while True:
+            page = self.queue.get()
+            if page is self.DONE:
+                return
+            if self.broken:
+                continue
+            url, text, lastmod = page
+            try:
+                emit(self.out, {"type": "page", "url": url, "text": text, "lastmod": lastmod})
+            except (BrokenPipeError, OSError):
+                # The parent is gone; stop crawling instead of running on unobserved
+                self.broken = True
+                if self.on_broken:
+                    reactor.callFromThread(self.on_broken)
+            if self.paused and self.queue.qsize() <= self.max_backlog // 2:
+                reactor.callFromThread(self._resume)
+
+    def close(self):
+        self.queue.put(self.DONE)
+        self._writer.join()
+
+
+def emit(out, event: dict):
+    out.write(json.dumps(event) + "\n")
+    out.flush()
+
+
+class IngestionSpider(scrapy.Spider):
+    name = "ingestion_spider"
+
+    def __init__(self, url, max_depth=2, page_feed=None, sitemap_url=None, include_patterns=None,
+                 exclude_patterns=None, known_lastmods=None, *args, **kwargs):
+        super(IngestionSpider, self).__init__(*args, **kwargs)
+        self.start_urls = [url]
+        self.max_depth = max_depth
+        self.page_feed = page_feed
+        self.sitemap_url = sitemap_url
+        self.known_lastmods = {u: parse_lastmod(v) for u, v in (known_lastmods or {}).items()}
+        self.frontier = CrawlFrontier(url, include_patterns=include_patterns, exclude_patterns=exclude_patterns)
+        page_feed.stats = self.frontier.stats
+
+        # Keep spider on the same domain (hostname only; Scrapy ignores allowed_domains entries with a port)
+        domain = urllib.parse.urlparse(url).hostname
+        if domain:
+            self.allowed_domains = [domain]
+
+    def _on_start(self):
+        # The engine only exists once crawling starts; hand it to the feed for backpressure
+        self.page_feed.engine = self.crawler.engine
+
+        # With a JOBDIR, Scrapy persists `state` between runs; keep the frontier in it so a resumed
+        # crawl still knows which URLs and page fingerprints earlier slices saw
+        state = getattr(self, "state", None)
+        if state is not None:
+            if "frontier" in state:
+                self.frontier.restore(state["frontier"])
+            state["frontier"] = self.frontier.snapshot()
+            self.page_feed.stats = self.frontier.stats
+
+    def _start_requests(self):
+        if self.sitemap_url:
+            # Parse the sitemap before any page so unchanged pages are known before links lead to them
+            yield scrapy.Request(self.sitemap_url, callback=self.parse_sitemap, priority=1000)
+        for url in self.start_urls:
+            yield scrapy.Request(url, dont_filter=True)
+
+    async def start(self):
+        self._on_start()
+        for request in self._start_requests():
+            yield request
+
+    def start_requests(self):
+        # Scrapy < 2.13 calls this instead of start()
+        self._on_start()
+        yield from self._start_requests()
+
+    def parse_sitemap(self, response):
+        body = response.body
+        if body[:2] == b"\x1f\x8b":
+            body = gunzip(body)
+        try:
+            sitemap = Sitemap(body)
+        except Exception as e:
+            print(f"⚠️ Could not parse sitemap {response.url}: {e}", flush=True)
+            return
+
+        if sitemap.type == "sitemapindex":
+            for entry in sitemap:
+                yield response.follow(entry["loc"], self.parse_sitemap, priority=1000)
+            return
+
+        for entry in sitemap:
+            link = self.frontier.admit(response.urljoin(entry["loc"]))
+            if not link:
+                continue
+            lastmod = parse_lastmod(entry.get("lastmod"))
+            known = self.known_lastmods.get(link)
+            if lastmod and known and lastmod <= known:
+                # Not modified since the last complete crawl: reuse what is indexed, don't fetch
+                self.frontier.stats["sitemap_unchanged"] += 1
+                self.page_feed.put((link, None, known.isoformat()))
+                continue
+            yield scrapy.Request(
+                link,
+                callback=self.parse,
+                priority=priority_score(link),
+                meta={"lastmod": lastmod.isoformat() if lastmod else None},
+            )
+
+    def parse(self, response):
+        print(f"ℹ️ Scrapy parsing {response.url}, status: {response.status}", flush=True)
+        text = extract_page_text(response.text)
+        print(f"ℹ️ Extracted {len(text)} characters from {response.url}", flush=True)
+        page_url = canonicalize_url(response.url)
+        if len(text) > 200:
+            if self.frontier.is_near_duplicate(page_url, text):
+                print(f"ℹ️ Skipping {page_url}: near-duplicate of an already crawled page", flush=True)
+            else:
+                # Hand the page straight to the ingesting process
+                self.page_feed.put((page_url, text, response.meta.get("lastmod")))
+
+        # Follow canonicalized links recursively, most relevant first (Scrapy handles DEPTH_LIMIT automatically)
+        for anchor in response.css("a[href]"):
+            link = self.frontier.admit(response.urljoin(anchor.attrib["href"]))
+            if link:
+                link_text = " ".join(anchor.css("::text").getall())
+                yield scrapy.Request(link, callback=self.parse, priority=priority_score(link, link_text))
+
+
+def run_crawl(job: dict, out):
+    """Runs the crawl described by `job` to completion, streaming pages to `out`."""
+    page_feed = PageFeed(out)
+    process = CrawlerProcess(settings=job["settings"])
+    page_feed.on_broken = process.stop
+    crawler = process.create_crawler(IngestionSpider)
+    failures = []
+    deferred = process.crawl(
+        crawler, url=job["url"], max_depth=job["max_depth"], page_feed=page_feed, **job["spider_options"]
+    )
+    deferred.addErrback(failures.append)
+    process.start()  # blocks until the crawl is over (or SIGTERM'd)
+
+    page_feed.close()
+    if failures:
+        failures[0].raiseException()
+    emit(out, {
+        "type": "done",
+        "stats": page_feed.stats,
+        "finish_reason": crawler.stats.get_value("finish_reason"),
+    })
+
+
+def main():
+    # Keep stdout for the protocol only; prints and logs from the crawl go to stderr
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
+
+    try:
+        run_crawl(json.loads(sys.stdin.readline()), out)
+    except BrokenPipeError:
+        sys.exit(1)  # the parent went away; nobody is left to report to
+    except Exception as e:
+        traceback.print_exc()
+        emit(out, {"type": "error", "error": str(e)})
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Client side of crawling. Scrapy runs in a separate worker process (services.crawl_worker),
+so importing this module costs nothing and no Twisted reactor is started in web workers.
+"""
+import gzip
+import hashlib
+import json
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+CRAWL_PAGE_LIMIT = 100
+# Seconds a stopped worker gets to shut the crawl down gracefully (and save its JOBDIR)
+WORKER_STOP_TIMEOUT = 30.0
+# Slack on top of the crawl's time slice for worker start-up and the spider's own shutdown
+CRAWL_TIMEOUT_MARGIN = 60.0
+
+
+def crawl_timeout(crawl: dict) -> float:
+    """
+    Seconds to wait for a crawl worker before giving up on it. The spider closes itself after
+    CLOSESPIDER_TIMEOUT (the ingestion time slice); the deadline must leave it room to do so
+    cleanly, or the crawl's JOBDIR is never marked clean and cannot be resumed.
+    """
+    time_slice = crawl.get("CLOSESPIDER_TIMEOUT") or settings.CRAWL_TIME_SLICE
+    return time_slice + WORKER_STOP_TIMEOUT + CRAWL_TIMEOUT_MARGIN
+
+
+def crawl_settings(url: str, provider: str | None = None, max_depth: int = 2, overrides: dict | None = None) -> dict:
+    """
+    Scrapy settings for crawling `url`: the fixed ingestion settings, then the "default"
+    crawl profile, then the provider's profile, then any explicit overrides.
+    The HTTP cache directory is keyed to the document so re-crawls reuse its responses.
+    """
+    crawl = {
+        'DEPTH_LIMIT': max_depth,
+        'LOG_LEVEL': 'INFO',
+        'ROBOTSTXT_OBEY': False,
+        'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'CLOSESPIDER_PAGECOUNT': CRAWL_PAGE_LIMIT,
+        'TWISTED_REACTOR': 'twisted.internet.epollreactor.EPollReactor',
+    }
+    crawl.update(settings.CRAWL_PROFILES.get("default", {}))
+    if provider:
+        crawl.update(settings.CRAWL_PROFILES.get(provider.lower(), {}))
+    url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    crawl['HTTPCACHE_DIR'] = str(Path(settings.CRAWL_CACHE_DIR).resolve() / url_key)
+    crawl.update(overrides or {})
+    return crawl
+
+
+def cached_pages(url: str, provider: str | None = None) -> dict[str, Path]:
+    """
+    Pages of the document found in its HTTP cache, {canonical page URL: cache entry directory}.
+    Only successful responses count; when a page was cached under several request URLs the
+    newest entry wins. Reading them back needs no network access (`manage.py reindex`).
+    """
+    from services.crawl_frontier import canonicalize_url
+
+    crawl = crawl_settings(url, provider)
+    opener = gzip.open if crawl.get("HTTPCACHE_GZIP") else open
+    newest = {}
+    # <HTTPCACHE_DIR>/<spider>/<fingerprint[:2]>/<fingerprint>/pickled_meta
+    for meta_path in Path(crawl["HTTPCACHE_DIR"]).glob("*/*/*/pickled_meta"):
+        try:
+            with opener(meta_path, "rb") as f:
+                meta = pickle.load(f)  # written by our own crawls
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue  # entry being written, or torn by a killed crawl
+        if meta.get("status") != 200:
+            continue
+        page_url = canonicalize_url(meta["response_url"])
+        if page_url not in newest or meta["timestamp"] > newest[page_url][0]:
+            newest[page_url] = (meta["timestamp"], meta_path.parent)
+    return {page_url: entry for page_url, (_, entry) in newest.items()}
+
+
+def read_cached_page(entry: Path, gzipped: bool = False) -> str | None:
+    """The decoded HTML of a cache entry, as the crawl's response.text saw it; None if it is not text."""
+    from scrapy.http import Headers, TextResponse
+    from scrapy.responsetypes import responsetypes
+    from w3lib.http import headers_raw_to_dict
+
+    opener = gzip.open if gzipped else open
+    with opener(entry / "pickled_meta", "rb") as f:
+        meta = pickle.load(f)
+    with opener(entry / "response_headers", "rb") as f:
+        headers = Headers(headers_raw_to_dict(f.read()))
+    with opener(entry / "response_body", "rb") as f:
+        body = f.read()
+    response_class = responsetypes.from_args(headers=headers, url=meta["response_url"], body=body)
+    response = response_class(url=meta["response_url"], status=meta["status"], headers=headers, body=body)
+    return response.text if isinstance(response, TextResponse) else None
+
+
+class CrawlWorker:
+    """
+    One crawl worker subprocess. A reader thread parses its events into a small queue;
+    when the consumer is slow the queue fills, the pipe fills, and the worker pauses its crawl.
+    """
+    EOF = object()
+
+    def __init__(self, job: dict, max_backlog: int = 16):
+        self.events = queue.Queue(maxsize=max_backlog)
+        self.stopping = threading.Event()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "services.crawl_worker"],
+            cwd=settings.BASE_DIR,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.close()
+        self._reader = threading.Thread(target=self._read_events, name="crawl-worker-reader", daemon=True)
+        self._reader.start()
+
+    def _read_events(self):
+        for line in self.process.stdout:
+            if self.stopping.is_set():
+                continue  # keep draining so the worker never blocks on a full pipe while shutting down
+            self._put(json.loads(line))
+        self._put(self.EOF)
+
+    def _put(self, event):
+        while not self.stopping.is_set():
+            try:
+                self.events.put(event, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, timeout: float):
+        return self.events.get(timeout=timeout)
+
+    def stop(self):
+        """Asks the worker to stop gracefully; kills it if it does not exit in time."""
+        self.stopping.set()
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=WORKER_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._reader.join(timeout=5)
+
+
+def iter_crawled_pages(url: str, max_depth: int = 2, provider: str | None = None,
+                       overrides: dict | None = None, stats: dict | None = None,
+                       sitemap_url: str | None = None, include_patterns: list[str] | None = None,
+                       exclude_patterns: list[str] | None = None, known_lastmods: dict | None = None):
+    """
+    Crawls `url` in a worker process and yields (page_url, clean_text, lastmod) as each page
+    is extracted, instead of collecting the whole site first. Stops the crawl if the consumer stops early.
+    With a sitemap, its pages are scheduled too; those whose lastmod (ISO 8601) is not newer
+    than in `known_lastmods` are not fetched and come back with clean_text None.
+    Only URLs matching the include/exclude patterns are crawled, security/IAM pages first.
+    Concurrency, throttling and caching come from the provider's crawl profile.
+    Links are canonicalized before scheduling and near-duplicate pages are dropped;
+    the skip counts and Scrapy's finish_reason are copied into `stats` when the crawl ends.
+    Pass a JOBDIR in `overrides` to make the crawl resumable.
+    """
+    crawl = crawl_settings(url, provider, max_depth, overrides)
+    worker = CrawlWorker({
+        "url": url,
+        "max_depth": max_depth,
+        "settings": crawl,
+        "spider_options": {
+            "sitemap_url": sitemap_url,
+            "include_patterns": include_patterns,
+            "exclude_patterns": exclude_patterns,
+            "known_lastmods": {u: (m.isoformat() if hasattr(m, "isoformat") else m)
+                               for u, m in (known_lastmods or {}).items()},
+        },
+    })
+    timeout = crawl_timeout(crawl)
+    # Only time spent waiting on the worker counts. The spider's time slice runs on its own
+    # clock; a slow consumer (embedding) only delays reading pages the worker already produced
+    waited = 0.0
+
+    try:
+        while True:
+            start = time.monotonic()
+            try:
+                event = worker.get(timeout=max(timeout - waited, 0.01))
+            except queue.Empty:
+                raise TimeoutError(f"Crawl of {url} did not finish within {timeout:.0f}s")
+            waited += time.monotonic() - start
+
+            if event is CrawlWorker.EOF:
+                raise RuntimeError(f"Crawl worker for {url} exited unexpectedly (code {worker.process.wait()})")
+            if event["type"] == "error":
+                raise RuntimeError(f"Crawl of {url} failed: {event['error']}")
+            if event["type"] == "done":
+                if stats is not None:
+                    stats.update(event["stats"])
+                    stats["finish_reason"] = event["finish_reason"]
+                return
+            yield event["url"], event["text"], event["lastmod"]
+    finally:
+        worker.stop()
@@ -1,6 +1,10 @@
 from services.llm import call_llm
+from django.conf import settings
+from difflib import SequenceMatcher
 import logging
 import json
+import queue
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +16,96 @@ AGENTS = {
     "Arbiter": "llama3.2:3b"
 }
 
-def deliberate_answer(question: str, context: str, provider: str | None = None, prompt_template: str | None = None):
+_STREAM_DONE = object()
+
+
+class SpeculativeStream:
+    """
+    Runs a streaming LLM call in a background thread and buffers its tokens,
+    so a stage can start before we know whether its output will be used.
+    Iterating replays the buffered tokens and then follows the live stream; cancel() discards it.
+    """
+
+    def __init__(self, prompt: str, model: str):
+        self._tokens = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(prompt, model), daemon=True)
+        self._thread.start()
+
+    def _run(self, prompt, model):
+        stream = call_llm(prompt, model=model, stream=True)
+        try:
+            for token in stream:
+                if self._cancelled.is_set():
+                    break
+                self._tokens.put(token)
+        except Exception as e:
+            self._tokens.put(e)
+        finally:
+            stream.close()
+            self._tokens.put(_STREAM_DONE)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def __iter__(self):
+        while True:
+            item = self._tokens.get()
+            if item is _STREAM_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def summary_divergence(speculated: str, final: str) -> float:
+    """0.0 when the speculated summary equals the final one, approaching 1.0 as they share less."""
+    if not final:
+        return 0.0
+    if final.startswith(speculated):
+        # Streaming only appends, so this is the common case and needs no diff.
+        # Only what the summary added counts, so trailing whitespace alone is no divergence.
+        return len(final[len(speculated):].strip()) / len(final)
+    return 1 - SequenceMatcher(None, speculated, final, autojunk=False).ratio()
+
+
+def _is_stable_prefix(text: str, token_count: int, min_tokens: int) -> bool:
+    """A summary prefix is worth speculating on once it is long enough and ends a sentence or line."""
+    if token_count < min_tokens:
+        return False
+    return text.rstrip(" ").endswith((".", "\n", ":")) or token_count >= 2 * min_tokens
+
+
+def _architect_prompt(analysis: str, context: str, question: str) -> str:
+    return f"""
+    You are a Cloud Security Architect. Using the Analyst's summary and the original context, provide a detailed and accurate answer to the user's question. Use best practices and provide code snippets if applicable.
+    
+    Summary:
+    {analysis}
+    
+    Context:
+    {context}
+    
+    Question:
+    {question}
+    
+    Architectural Response:
+    """
+
+
+def deliberate_answer(question: str, context: str, provider: str | None = None, prompt_template: str | None = None,
+                      speculative: bool | None = None):
     """
     Generator that orchestrates a multi-agent deliberation process with token-level streaming.
     Yields JSON strings representing the current phase, status, and incremental content (deltas).
+
+    With speculative=True (default: settings.DELIBERATION_SPECULATIVE) the Architect starts on a
+    stable prefix of the Analyst summary while the Analyst is still streaming; its draft is used
+    only if the final summary has not diverged materially, otherwise the Architect is restarted.
     """
+    if speculative is None:
+        speculative = settings.DELIBERATION_SPECULATIVE
+
     provider_str = provider.upper() if provider else "Cloud"
     logger.info(f"Starting Multi-Agent Deliberation for {provider_str}...")
 
@@ -33,33 +122,53 @@ def deliberate_answer(question: str, context: str, provider: str | None = None,
     
     Summary:
     """
-    analysis = ""
-    for token in call_llm(analyst_prompt, model=AGENTS["Analyst"], stream=True):
-        analysis += token
-        yield json.dumps({ "phase": "Analyst", "delta": token }) + "\n"
-    yield json.dumps({ "phase": "Analyst", "status": "Done" }) + "\n"
-
-    # Stage 2: Architect
-    yield json.dumps({ "phase": "Architect", "status": "Drafting Response..." }) + "\n"
-    architect_prompt = f"""
-    You are a Cloud Security Architect. Using the Analyst's summary and the original context, provide a detailed and accurate answer to the user's question. Use best practices and provide code snippets if applicable.
-    
-    Summary:
-    {analysis}
-    
-    Context:
-    {context}
-    
-    Question:
-    {question}
-    
-    Architectural Response:
-    """
-    draft = ""
-    for token in call_llm(architect_prompt, model=AGENTS["Architect"], stream=True):
-        draft += token
-        yield json.dumps({ "phase": "Architect", "delta": token }) + "\n"
-    yield json.dumps({ "phase": "Architect", "status": "Done" }) + "\n"
+    speculation = None       # running SpeculativeStream for the Architect
+    try:
+        analysis = ""
+        token_count = 0
+        speculated_on = ""       # the summary prefix it was started from
+        for token in call_llm(analyst_prompt, model=AGENTS["Analyst"], stream=True):
+            analysis += token
+            token_count += 1
+            yield json.dumps({ "phase": "Analyst", "delta": token }) + "\n"
+
+            if speculative and speculation is None and _is_stable_prefix(analysis, token_count, settings.SPECULATIVE_MIN_TOKENS):
+                speculated_on = analysis
+                speculation = SpeculativeStream(_architect_prompt(speculated_on, context, question), AGENTS["Architect"])
+        yield json.dumps({ "phase": "Analyst", "status": "Done" }) + "\n"
+
+        # Stage 2: Architect
+        yield json.dumps({ "phase": "Architect", "status": "Drafting Response..." }) + "\n"
+        architect_tokens = None
+        speculation_outcome = None
+        if speculation is not None:
+            divergence = summary_divergence(speculated_on, analysis)
+            if divergence <= settings.SPECULATIVE_MAX_DIVERGENCE:
+                architect_tokens = speculation
+                speculation_outcome = "hit"
+            else:
+                # The final summary says materially more than the draft was based on; restart on the full summary
+                speculation.cancel()
+                speculation_outcome = "miss"
+            logger.info(f"Speculative Architect {speculation_outcome} (divergence {divergence:.2f})")
+        elif speculative:
+            speculation_outcome = "skipped"
+
+        if architect_tokens is None:
+            architect_tokens = call_llm(_architect_prompt(analysis, context, question), model=AGENTS["Architect"], stream=True)
+
+        draft = ""
+        for token in architect_tokens:
+            draft += token
+            yield json.dumps({ "phase": "Architect", "delta": token }) + "\n"
+        architect_done = { "phase": "Architect", "status": "Done" }
+        if speculation_outcome:
+            architect_done["speculative"] = speculation_outcome
+        yield json.dumps(architect_done) + "\n"
+    finally:
+        # Also reached when the client disconnects: don't leave the Architect generating in the background
+        if speculation is not None:
+            speculation.cancel()
 
     # Stage 3: Reviewer
     yield json.dumps({ "phase": "Reviewer", "status": "Critiquing..." }) + "\n"
@@ -1,13 +1,27 @@
-from datetime import datetime
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from __future__ import annotations
+
+import html
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from docx.document import Document
+
+# python-docx is imported when a report is built, not when the URLconf loads the views
+
+REPORT_TITLE = "Tivona Cloud Security Analysis Report"
+REPORT_NOTE = (
+    "This report is generated using retrieved cloud security documentation. "
+    "Recommendations are advisory and must be reviewed before implementation."
+)
 
 def add_structured_answer(doc: Document, answer_text: str):
     """
     Parses LLM response and converts markdown-style headings
     into real DOCX headings.
     """
+    from docx.shared import Pt, RGBColor
+
     lines = answer_text.split("\n")
 
     for line in lines:
@@ -30,15 +44,32 @@ def add_structured_answer(doc: Document, answer_text: str):
             p = doc.add_paragraph(line)
             p.paragraph_format.space_after = Pt(8)
 
+def unique_sources(sources: list[dict]) -> list[dict]:
+    """Sources in order, each (title, url) once."""
+    seen = set()
+    unique = []
+    for s in sources:
+        key = (s.get("title"), s.get("source"))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(s)
+    return unique
+
+
 def build_docx(llm_response: dict) -> Document:
-    doc = Document()
+    import docx
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+
+    doc = docx.Document()
 
     # -------------------------
     # TITLE
     # -------------------------
 
     title = doc.add_heading(
-        "Tivona Cloud Security Analysis Report",
+        REPORT_TITLE,
         level=0
     )
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
@@ -61,18 +92,12 @@ def build_docx(llm_response: dict) -> Document:
     sources_heading = doc.add_heading("Sources", level=1)
     sources_heading.bold = True
 
-    sources = llm_response.get("sources", [])
+    sources = unique_sources(llm_response.get("sources", []))
 
     if not sources:
         doc.add_paragraph("No sources available.")
     else:
-        seen = set()
         for s in sources:
-            key = (s.get("title"), s.get("source"))
-            if key in seen:
-                continue
-            seen.add(key)
-
             p = doc.add_paragraph(style="List Bullet")
             run = p.add_run(
                 f"{s.get('title', 'Unknown')} "
@@ -85,66 +110,75 @@ def build_docx(llm_response: dict) -> Document:
     # FOOTER NOTE (OPTIONAL)
     # -------------------------
     doc.add_paragraph("")
-    note = doc.add_paragraph(
-        "This report is generated using retrieved cloud security documentation. "
-        "Recommendations are advisory and must be reviewed before implementation."
-    )
+    note = doc.add_paragraph(REPORT_NOTE)
     note.runs[0].italic = True
     note.runs[0].font.size = Pt(9)
 
     return doc
 
 
-# import os
-# from datetime import datetime
-# from django.conf import settings
-
-
-# def build_Doc(llm_response: dict) -> str:
-#     lines = []
-
-#     lines.append("#Tivona Cloud Security Analysis Report\n")
-
-#     lines.append("")
+def build_markdown(llm_response: dict) -> str:
+    """The report as Markdown: the answer's headings are kept as they are."""
+    lines = [f"# {REPORT_TITLE}", "", "## Analysis Summary", ""]
+    lines.append(llm_response.get("answer", "N/A").strip())
+    lines += ["", "## Sources", ""]
 
-#     lines.append(llm_response.get("answer", "N/A"))
-#     lines.append("")
-
-#     lines.append("## Sources")
-#     sources = llm_response.get("sources", [])
-
-#     if not sources:
-#         lines.append("No sources available.")
-#     else:
-#         seen = set()
-#         for s in sources:
-#             key = (s.get("title"), s.get("source"))
-#             if key in seen:
-#                 continue
-#             seen.add(key)
-
-#             lines.append(
-#                 f"- **{s.get('title', 'Unknown')}** ({s.get('provider', 'N/A')})  \n"
-#                 f"  {s.get('source')}"
-#             )
+    sources = unique_sources(llm_response.get("sources", []))
+    if not sources:
+        lines.append("No sources available.")
+    for s in sources:
+        lines.append(
+            f"- **{s.get('title', 'Unknown')}** ({s.get('provider', 'N/A')})  \n"
+            f"  {s.get('source', '')}"
+        )
 
-#     return "\n".join(lines)
+    lines += ["", f"*{REPORT_NOTE}*", ""]
+    return "\n".join(lines)
 
 
-# def save_Doc(llm_response: dict) -> dict:
-#     content = build_Doc(llm_response)
+def is_web_url(url: str) -> bool:
+    try:
+        return urlsplit(url.strip()).scheme.lower() in ("http", "https")
+    except ValueError:
+        return False
 
-#     reports_dir = os.path.join(settings.MEDIA_ROOT, "reports")
-#     os.makedirs(reports_dir, exist_ok=True)
 
-#     filename = f"rag_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-#     file_path = os.path.join(reports_dir, filename)
+def build_html(llm_response: dict) -> str:
+    """The report as a standalone HTML page, with the same structure as the DOCX."""
+    esc = html.escape
+    body = [f"<h1>{esc(REPORT_TITLE)}</h1>", "<h2>Analysis Summary</h2>"]
 
-#     with open(file_path, "w", encoding="utf-8") as f:
-#         f.write(content)
+    for line in llm_response.get("answer", "N/A").split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#### "):
+            body.append(f"<h4>{esc(line[5:].strip())}</h4>")
+        elif line.startswith("### "):
+            body.append(f"<h3>{esc(line[4:].strip())}</h3>")
+        else:
+            body.append(f"<p>{esc(line)}</p>")
 
-#     return {
-#         "filename": filename,
-#         "path": file_path,
-#         "url": f"{settings.MEDIA_URL}reports/{filename}"
-#     }
\ No newline at end of file
+    body.append("<h2>Sources</h2>")
+    sources = unique_sources(llm_response.get("sources", []))
+    if not sources:
+        body.append("<p>No sources available.</p>")
+    else:
+        body.append("<ul>")
+        for s in sources:
+            url = str(s.get("source", "") or "")
+            # Sources come from the client: only web URLs become links, never javascript: or data:
+            link = f"<a href=\"{esc(url)}\">{esc(url)}</a>" if is_web_url(url) else esc(url)
+            body.append(
+                f"<li><strong>{esc(str(s.get('title', 'Unknown')))}</strong> "
+                f"({esc(str(s.get('provider', 'N/A')))})<br>{link}</li>"
+            )
+        body.append("</ul>")
+
+    body.append(f"<p><em>{esc(REPORT_NOTE)}</em></p>")
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{esc(REPORT_TITLE)}</title>\n</head>\n<body>\n"
+        + "\n".join(body)
+        + "\n</body>\n</html>\n"
+    )
@@ -8,14 +8,16 @@ def check_all_documents():
 
     #runs every 10 mins in cron job 
 
-    docs = Document.objects.all()
+    # Only the fields passed on (ingest_document loads the rest itself), read up front so
+    # no cursor stays open across the crawls
+    docs = list(Document.objects.order_by("id").values("title", "source_url", "provider", "version"))
 
     for doc in docs:
         ingest_document(
-            title=doc.title,
-            url=doc.source_url,
-            provider=doc.provider,
-            version=doc.version,
+            title=doc["title"],
+            url=doc["source_url"],
+            provider=doc["provider"],
+            version=doc["version"],
         )
 
 
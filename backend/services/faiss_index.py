@@ -0,0 +1,325 @@
+"""
+In-process FAISS mirror of each provider's Chroma collection.
+
+Chroma answers every search through its client. With RETRIEVAL_BACKEND=faiss, retrieval
+searches a per-provider FAISS index instead and only reads the matching chunks' text and
+metadata back from Chroma by id.
+
+Each provider directory under FAISS_INDEX_DIR holds:
+  manifest.json       the current index and id files and the collection mirrored, swapped
+                      atomically on every write
+  index-<token>.faiss the FAISS index; position i holds the embedding of ids[i]
+  ids-<token>.json    chunk id per index position, null for chunks deleted since the build
+
+Compressed index types keep only quantized vectors in the index: "hnsw_fp16" (HNSW over
+float16 codes) and "ivfpq" (product-quantization codes). Their distances are approximate, so
+search() takes FAISS_RESCORE_FACTOR times as many candidates and re-scores them exactly
+against the float32 embeddings Chroma stores for them; only those few rows are read.
+
+Ingestion calls sync_provider_index() after it changed a provider's collection: new chunks are
+appended (staged ones once their crawl commits), deleted ones are tombstoned, and the index is rebuilt when tombstones or growth
+make it worth it. Searching processes memory-map the index files (shared through the page
+cache by all web workers) and reopen them when the manifest changes. A mirror of a collection
+that is no longer the provider's live one (swapped by `manage.py reindex`) is not searched.
+"""
+import fcntl
+import json
+import math
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from services.vectorstores import SEARCHABLE
+
+FETCH_BATCH = 5000
+# Rebuild instead of updating once this share of positions is tombstoned,
+# or once the mirror has grown to this many times its size at the last build
+REBUILD_TOMBSTONE_RATIO = 0.2
+REBUILD_GROWTH = 2.0
+# Index types whose distances are approximate and get re-scored
+COMPRESSED_KINDS = {"hnsw_fp16", "ivfpq"}
+
+
+def provider_dir(provider: str) -> Path:
+    return Path(settings.FAISS_INDEX_DIR).resolve() / provider
+
+
+def index_kind(count: int) -> str:
+    """Index type used for a mirror of `count` chunks."""
+    if count < settings.FAISS_EXACT_BELOW:
+        return "flat"
+    return settings.FAISS_INDEX_TYPE
+
+
+def pq_subquantizers(dim: int) -> int:
+    """Largest number of PQ sub-vectors of at least 8 dimensions that divides `dim`."""
+    for m in range(dim // 8, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(vectors: np.ndarray, kind: str):
+    import faiss
+
+    dim = vectors.shape[1]
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32)
+        index.hnsw.efConstruction = 80
+    elif kind == "hnsw_fp16":
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, 32)
+        index.hnsw.efConstruction = 80
+        index.train(vectors)
+    elif kind == "ivfpq":
+        # ~4·sqrt(n) lists, but no more than k-means can train with 39 points per centroid
+        nlist = max(min(int(4 * math.sqrt(len(vectors))), len(vectors) // 39), 1)
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_subquantizers(dim), 8)
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown FAISS index type: {kind}")
+    index.add(vectors)
+    return index
+
+
+def configure_search(index, kind: str):
+    import faiss
+
+    if kind in ("hnsw", "hnsw_fp16"):
+        faiss.downcast_index(index).hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+    elif kind == "ivfpq":
+        faiss.extract_index_ivf(index).nprobe = settings.FAISS_IVF_NPROBE
+
+
+class ProviderIndex:
+    """A loaded provider mirror: its FAISS index and the chunk id at each position (None = deleted)."""
+
+    def __init__(self, index, ids: list, manifest: dict, version: int = 0):
+        self.index = index
+        self.ids = ids
+        self.manifest = manifest
+        self.version = version
+        self.tombstones = sum(1 for i in ids if i is None)
+
+    @property
+    def compressed(self) -> bool:
+        return self.manifest["kind"] in COMPRESSED_KINDS
+
+    def mirrors(self, collection) -> bool:
+        # Manifests written before collections could be swapped name none
+        return self.manifest.get("collection", collection.name) == collection.name
+
+    def search(self, vector: np.ndarray, k: int) -> list[tuple[str, float]]:
+        """(chunk id, squared L2 distance) of the k nearest live chunks, nearest first."""
+        total = self.index.ntotal
+        query = np.asarray(vector, dtype="float32").reshape(1, -1)
+        fetch = min(k, total)
+        while fetch:
+            distances, positions = self.index.search(query, fetch)
+            hits = [
+                (self.ids[p], float(d))
+                for d, p in zip(distances[0], positions[0])
+                if p >= 0 and self.ids[p] is not None
+            ]
+            # Tombstoned positions take up result slots; ask for more until k live ones are found
+            if len(hits) >= k or fetch >= total:
+                return hits[:k]
+            fetch = min(fetch * 2 + self.tombstones, total)
+        return []
+
+
+def _read(directory: Path, mmap: bool) -> ProviderIndex | None:
+    import faiss
+
+    manifest_path = directory / "manifest.json"
+    for _ in range(2):
+        try:
+            version = manifest_path.stat().st_mtime_ns
+            manifest = json.loads(manifest_path.read_text())
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            index = faiss.read_index(str(directory / manifest["index"]), flags)
+            ids = json.loads((directory / manifest["ids"]).read_text())
+        except FileNotFoundError:
+            continue  # replaced by a writer between reading the manifest and the files
+        configure_search(index, manifest["kind"])
+        return ProviderIndex(index, ids, manifest, version)
+    return None
+
+
+def _write(directory: Path, index, ids: list, kind: str, built_count: int, collection: str):
+    import faiss
+
+    directory.mkdir(parents=True, exist_ok=True)
+    token = uuid.uuid4().hex[:12]
+    manifest = {
+        "index": f"index-{token}.faiss",
+        "ids": f"ids-{token}.json",
+        "kind": kind,
+        "count": len(ids),
+        "built_count": built_count,
+        "collection": collection,
+    }
+    faiss.write_index(index, str(directory / manifest["index"]))
+    (directory / manifest["ids"]).write_text(json.dumps(ids))
+
+    tmp = directory / f"manifest.{token}.tmp"
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, directory / "manifest.json")
+
+    # Processes still searching the old files keep them mapped until they reload
+    for path in directory.iterdir():
+        if path.name.startswith(("index-", "ids-")) and token not in path.name:
+            path.unlink(missing_ok=True)
+
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def load_provider_index(provider: str) -> ProviderIndex | None:
+    """The provider's mirror, memory-mapped and cached per process; reopened after a rebuild or update."""
+    directory = provider_dir(provider)
+    try:
+        version = (directory / "manifest.json").stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(provider)
+    if cached and cached.version == version:
+        return cached
+    with _load_lock:
+        cached = _loaded.get(provider)
+        if cached and cached.version == version:
+            return cached
+        loaded = _read(directory, mmap=True)
+        if loaded:
+            _loaded[provider] = loaded
+        return loaded
+
+
+def search(provider: str, vector, k: int, collection=None) -> list[tuple[str, float]] | None:
+    """
+    Nearest chunks of the provider, or None if it has no mirror. With the provider's Chroma
+    collection, candidates from a compressed index are re-scored with their exact distances,
+    and None is returned too if the mirror was built from another collection.
+    """
+    mirror = load_provider_index(provider)
+    if mirror is None or (collection is not None and not mirror.mirrors(collection)):
+        return None
+    if not (mirror.compressed and collection is not None and settings.FAISS_RESCORE_FACTOR > 1):
+        return mirror.search(vector, k)
+    candidates = mirror.search(vector, k * settings.FAISS_RESCORE_FACTOR)
+    return rescore(collection, vector, [chunk_id for chunk_id, _ in candidates], k)
+
+
+def rescore(collection, vector, ids: list[str], k: int) -> list[tuple[str, float]]:
+    """The k of the given chunks nearest to the vector, by squared L2 distance to their stored embeddings."""
+    if not ids:
+        return []
+    stored = collection.get(ids=ids, include=["embeddings"])
+    if not stored["ids"]:
+        return []
+    distances = ((np.asarray(stored["embeddings"], dtype="float32") - np.asarray(vector, dtype="float32")) ** 2).sum(axis=1)
+    return [(stored["ids"][i], float(distances[i])) for i in np.argsort(distances)[:k]]
+
+
+def _collection_ids(collection) -> list[str]:
+    return collection.get(where=SEARCHABLE, include=[])["ids"]
+
+
+def _embeddings(collection, ids: list[str] | None = None):
+    """(ids, vectors) of the given chunks, or of all the collection's searchable chunks, read in batches."""
+    found_ids, vectors = [], []
+    if ids is None:
+        offset = 0
+        while True:
+            batch = collection.get(where=SEARCHABLE, include=["embeddings"], limit=FETCH_BATCH, offset=offset)
+            if not batch["ids"]:
+                break
+            found_ids.extend(batch["ids"])
+            vectors.append(np.asarray(batch["embeddings"], dtype="float32"))
+            offset += len(batch["ids"])
+    else:
+        for start in range(0, len(ids), FETCH_BATCH):
+            batch = collection.get(ids=ids[start:start + FETCH_BATCH], include=["embeddings"])
+            found_ids.extend(batch["ids"])
+            vectors.append(np.asarray(batch["embeddings"], dtype="float32"))
+    return found_ids, np.vstack(vectors) if vectors else np.empty((0, 0), dtype="float32")
+
+
+@contextmanager
+def _writer_lock(directory: Path):
+    # One writer per provider; concurrent ingestions of the same provider take turns
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def rebuild_provider_index(collection, provider: str) -> dict:
+    """Builds the provider's mirror from scratch from its Chroma collection."""
+    with _writer_lock(provider_dir(provider)):
+        return _rebuild(collection, provider)
+
+
+def _rebuild(collection, provider: str) -> dict:
+    directory = provider_dir(provider)
+    ids, vectors = _embeddings(collection)
+    if not ids:
+        (directory / "manifest.json").unlink(missing_ok=True)
+        return {"provider": provider, "chunks": 0, "added": 0, "removed": 0, "rebuilt": True}
+
+    kind = index_kind(len(ids))
+    _write(directory, build_index(vectors, kind), ids, kind, built_count=len(ids), collection=collection.name)
+    return {"provider": provider, "chunks": len(ids), "added": len(ids), "removed": 0, "rebuilt": True, "kind": kind}
+
+
+def sync_provider_index(collection, provider: str) -> dict:
+    """
+    Brings the provider's mirror in line with its Chroma collection: appends chunks added since
+    the last sync and tombstones deleted ones, or rebuilds the index when that is due.
+    Returns what was done.
+    """
+    directory = provider_dir(provider)
+    with _writer_lock(directory):
+        current = _read(directory, mmap=False)
+        if current is None or not current.mirrors(collection):
+            return _rebuild(collection, provider)
+
+        live = set(_collection_ids(collection))
+        positions = {chunk_id: i for i, chunk_id in enumerate(current.ids) if chunk_id is not None}
+        removed = [chunk_id for chunk_id in positions if chunk_id not in live]
+        added = sorted(live - positions.keys())
+        if not added and not removed:
+            return {"provider": provider, "chunks": len(positions), "added": 0, "removed": 0, "rebuilt": False}
+
+        ids = list(current.ids)
+        for chunk_id in removed:
+            ids[positions[chunk_id]] = None
+        size = len(ids) + len(added)
+        tombstones = current.tombstones + len(removed)
+        if (
+            tombstones > REBUILD_TOMBSTONE_RATIO * size
+            or size > REBUILD_GROWTH * current.manifest["built_count"]
+            or index_kind(size - tombstones) != current.manifest["kind"]
+        ):
+            return _rebuild(collection, provider)
+
+        added, vectors = _embeddings(collection, added)
+        if added:
+            current.index.add(vectors)
+            ids.extend(added)
+        _write(directory, current.index, ids, current.manifest["kind"], current.manifest["built_count"], collection.name)
+        return {"provider": provider, "chunks": len(live), "added": len(added), "removed": len(removed), "rebuilt": False}
+
+
+def mirrored_providers() -> list[str]:
+    root = Path(settings.FAISS_INDEX_DIR).resolve()
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if (p / "manifest.json").exists())
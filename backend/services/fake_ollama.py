@@ -0,0 +1,161 @@
+"""
+Minimal stand-in for an Ollama server, used by load tests and benchmarks.
+
+Implements just enough of `/api/generate` (streaming and non-streaming) and `/api/ps`
+to exercise the client code without a GPU. Each server has a fixed number of inference
+"slots"; requests beyond that queue up, which is what makes horizontal scaling measurable.
+Models not yet resident pay `load_delay` on first use and are evicted once their
+`keep_alive` expires, mimicking Ollama's model residency.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_keep_alive(value) -> float:
+    """
+    Ollama keep_alive (300, -1, "30m", "1h", "300s") in seconds; negative means forever.
+    Strings are Go durations, so a unitless one other than "0" is rejected (ValueError) as Ollama does.
+    """
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float(value) if value >= 0 else float("inf")
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)", str(value).strip())
+    if not match:
+        if str(value).strip() == "0":
+            return 0.0
+        raise ValueError(f"time: missing unit in duration \"{value}\"")
+    amount = float(match.group(1))
+    if amount < 0:
+        return float("inf")
+    return amount * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+class FakeOllamaServer:
+
+    def __init__(self, models: list[str] | None = None, slots: int = 1,
+                 tokens: int = 32, token_delay: float = 0.01, load_delay: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.models = set(models or [])
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.load_delay = load_delay
+        self.requests_served = 0
+        self._resident = {}  # model -> expiry (monotonic seconds)
+        self._resident_lock = threading.Lock()
+        self._slots = threading.Semaphore(slots)
+        self._counter_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        # Clients dropping connections (e.g. when a backend is stopped mid-test) are expected
+        self._httpd.handle_error = lambda request, client_address: None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def resident_models(self) -> list[str]:
+        now = time.monotonic()
+        with self._resident_lock:
+            return [m for m, expiry in self._resident.items() if expiry > now]
+
+    def load(self, model: str, keep_alive):
+        """Makes `model` resident (paying load_delay if it was not) until keep_alive expires."""
+        ttl = parse_keep_alive(keep_alive)
+        if model not in self.resident_models() and ttl > 0:
+            time.sleep(self.load_delay)
+        with self._resident_lock:
+            if ttl > 0:
+                self._resident[model] = time.monotonic() + ttl
+            else:
+                self._resident.pop(model, None)
+
+    def generate(self, payload: dict):
+        """Yields response tokens for a generate call, holding an inference slot while doing so."""
+        with self._slots:
+            self.load(payload.get("model"), payload.get("keep_alive"))
+            if not payload.get("prompt"):
+                return
+            for i in range(self.tokens):
+                time.sleep(self.token_delay)
+                # End a "sentence" every eight tokens so text has natural boundaries
+                yield f"tok{i}. " if i % 8 == 7 else f"tok{i} "
+        with self._counter_lock:
+            self.requests_served += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path != "/api/ps":
+                    self._send_json(404, {"error": "not found"})
+                    return
+                self._send_json(200, {"models": [{"name": m, "model": m} for m in server.resident_models()]})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if self.path != "/api/generate":
+                    self._send_json(404, {"error": "not found"})
+                    return
+
+                model = payload.get("model")
+                if server.models and model not in server.models:
+                    self._send_json(404, {"error": f"model '{model}' not found"})
+                    return
+
+                try:
+                    parse_keep_alive(payload.get("keep_alive"))
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+
+                if not payload.get("stream", True):
+                    text = "".join(server.generate(payload))
+                    self._send_json(200, {"model": model, "response": text, "done": True})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for token in server.generate(payload):
+                    self._write_chunk({"model": model, "response": token, "done": False})
+                self._write_chunk({"model": model, "response": "", "done": True})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, body: dict):
+                data = json.dumps(body).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
@@ -0,0 +1,79 @@
+"""
+SimHash fingerprints for near-duplicate text detection.
+
+Two texts whose 64-bit SimHashes differ in at most a few bits share almost all of
+their word shingles. SimHashIndex finds such pairs without comparing against every
+stored fingerprint: the fingerprint is split into (max_distance + 1) bands, and by the
+pigeonhole principle two fingerprints within max_distance bits agree on at least one band.
+"""
+import hashlib
+import re
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over lowercased word shingles."""
+    import numpy as np  # not needed by the web process until something is ingested
+
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return 0
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    # One row of 64 bits per shingle; a fingerprint bit is set where most shingles have it set
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+
+    fingerprint = 0
+    for i in np.flatnonzero(majority):
+        fingerprint |= 1 << int(i)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed64(value: int) -> int:
+    """Unsigned 64-bit fingerprint as a signed integer (for BigIntegerField storage)."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def bands(fingerprint: int, count: int) -> list[int]:
+    """Splits a 64-bit fingerprint into `count` contiguous bit bands."""
+    width = 64 // count
+    mask = (1 << width) - 1
+    return [(fingerprint >> (i * width)) & mask for i in range(count)]
+
+
+class SimHashIndex:
+    """In-memory near-duplicate lookup over 64-bit SimHashes."""
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self._buckets = [dict() for _ in range(self.band_count)]
+
+    def find(self, fingerprint: int):
+        """Key of a stored fingerprint within max_distance bits, or None."""
+        for i, band in enumerate(bands(fingerprint, self.band_count)):
+            for other, key in self._buckets[i].get(band, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, fingerprint: int, key):
+        for i, band in enumerate(bands(fingerprint, self.band_count)):
+            self._buckets[i].setdefault(band, []).append((fingerprint, key))
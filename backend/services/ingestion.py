@@ -1,343 +1,453 @@
 import hashlib
-from bs4 import BeautifulSoup
-import urllib.parse
+import time
+from contextlib import nullcontext
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-# from langchain_community.document_loaders import RecursiveUrlLoader
-import scrapy
-from scrapy.crawler import CrawlerRunner
-from crochet import setup, wait_for
-
-setup()
-
-from apps.documents.models import Document
+from apps.documents.models import Document, DocumentPage
 from django.conf import settings
-
-class CustomSpider(scrapy.Spider):
-    name = "custom_spider"
-
-    def __init__(self, url, max_depth=2, *args, **kwargs):
-        super(CustomSpider, self).__init__(*args, **kwargs)
-        self.start_urls = [url]
-        self.max_depth = max_depth
-        self.results = []
-
-    def parse(self, response):
-        if response.status != 200:
-            return
-
-        # Extract text content (similar to the previous BeautifulSoup logic but more direct)
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # Remove non-content / UI / devsite junk
-        for tag in soup([
-            "script", "style", "nav", "footer", "header", "svg", "img",
-            "devsite-toc", "devsite-actions", "noscript", "aside",
-        ]):
-            tag.decompose()
-
-        text = soup.get_text(separator=" ")
-        text = " ".join(text.split())
-
-        if len(text) > 200:
-            self.results.append(text)
-
-        # Handle depth - this is a simplified version of recursion
-        if self.max_depth > 0:
-            for link in response.css('a::attr(href)').getall():
-                yield response.follow(link, self.parse, cb_kwargs={'depth': 1})
-
-@wait_for(timeout=60.0)
-def run_spider(url, max_depth=2):
-    runner = CrawlerRunner()
-    spider_instance = CustomSpider(url=url, max_depth=max_depth)
-    deferred = runner.crawl(CustomSpider, url=url, max_depth=max_depth)
-    
-    # This is a bit tricky with CrawlerRunner to get the instance results.
-    # Alternatively, we can use a signal or a more standard Scrapy pipeline, 
-    # but for simplicity in a single file:
-    return deferred
-
-# Harder to get data back from CrawlerRunner deferred directly into the return value without more boilerplate.
-# Let's adjust the implementation to be more robust for getting results back.
-
-class IngestionSpider(scrapy.Spider):
-    name = "ingestion_spider"
-
-    def __init__(self, url, max_depth=2, results_list=None, *args, **kwargs):
-        super(IngestionSpider, self).__init__(*args, **kwargs)
-        self.start_urls = [url]
-        self.max_depth = max_depth
-        self.results_list = results_list if results_list is not None else []
-        
-        # Keep spider on the same domain
-        from urllib.parse import urlparse
-        domain = urlparse(url).netloc
-        if domain:
-            self.allowed_domains = [domain]
-
-    def parse(self, response):
-        print(f"ℹ️ Scrapy parsing {response.url}, status: {response.status}", flush=True)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # 1. Detect if this is an AWS landing page (uses hidden XML for content)
-        xml_content = ""
-        xml_input = soup.find('input', id='landing-page-xml')
-        if xml_input and xml_input.get('value'):
-            try:
-                decoded_xml = urllib.parse.unquote(xml_input.get('value'))
-                xml_soup = BeautifulSoup(decoded_xml, "xml")
-                # Extract text from the decoded XML
-                xml_content = xml_soup.get_text(separator=" ")
-                print(f"ℹ️ Decoded AWS landing-page-xml: {len(xml_content)} characters", flush=True)
-            except Exception as e:
-                print(f"⚠️ Failed to decode AWS landing-page-xml: {e}", flush=True)
-
-        # 2. Refine cleaning and extraction
-        # Don't decompose all inputs, as AWS uses them for content metadata
-        for tag in soup([
-            "script", "style", "nav", "footer", "header", "svg", "img", 
-            "devsite-toc", "devsite-actions", "noscript", "aside",
-            "button", "form", "label", "textarea"
-        ]):
-            tag.decompose()
-
-        # Try specific content selectors first for better precision
-        main_content = soup.find(id='main-col') or soup.find(class_='awsdocs-content') or soup.find('main')
-        if main_content:
-            text = main_content.get_text(separator=" ")
-        else:
-            text = soup.get_text(separator=" ")
-
-        # Combine with XML content if found
-        if xml_content:
-            text = f"{text}\n\n{xml_content}"
-
-        text = " ".join(text.split())
-        print(f"ℹ️ Extracted {len(text)} characters from {response.url}", flush=True)
-        if len(text) > 200: 
-            # Store as tuple (url, text) for stable sorting later
-            self.results_list.append((response.url, text))
-
-        # Follow links recursively (Scrapy handles DEPTH_LIMIT automatically)
-        for href in response.css("a::attr(href)").getall():
-            yield response.follow(href, self.parse)
-
-@wait_for(timeout=900.0)
-def scrape_with_scrapy(url, max_depth=2):
-    results = []
-    runner = CrawlerRunner(settings={
-        'DEPTH_LIMIT': max_depth,
-        'LOG_LEVEL': 'INFO',
-        'ROBOTSTXT_OBEY': False,
-        'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'CLOSESPIDER_PAGECOUNT': 100,
-        'TWISTED_REACTOR': 'twisted.internet.epollreactor.EPollReactor',
-    })
-    deferred = runner.crawl(IngestionSpider, url=url, max_depth=max_depth, results_list=results)
-    deferred.addCallback(lambda _: results)
-    return deferred
-
-def fetch_and_clean_text(url: str, max_depth: int = 2) -> str:
-    """
-    Fetched pages using Scrapy and extracts clean text.
-    Old RecursiveUrlLoader logic is commented out.
-    """
-    # loader = RecursiveUrlLoader(
-    #     url=url,
-    #     max_depth=max_depth,
-    # )
-    # documents = loader.load()
-    # cleaned_pages = []
-    # for doc in documents:
-    #     html = doc.page_content
-    #     if not html:
-    #         continue
-    #     soup = BeautifulSoup(html, "html.parser")
-    #     for tag in soup(["script", "style", "nav", "footer", "header", "svg", "img", "devsite-toc", "devsite-actions", "noscript", "aside"]):
-    #         tag.decompose()
-    #     text = soup.get_text(separator=" ")
-    #     text = " ".join(text.split())
-    #     if len(text) > 200:
-    #         cleaned_pages.append(text)
-    # return "\n\n".join(cleaned_pages)
-
-    cleaned_pages_data = scrape_with_scrapy(url, max_depth)
-    print(f"ℹ️ Scraped {len(cleaned_pages_data)} pages from {url}", flush=True)
-    
-    # Sort by URL to ensure stable hash regardless of Scrapy traversal order
-    cleaned_pages_data.sort(key=lambda x: x[0])
-    
-    # Debug: Log first and last URLs to verify sorting
-    if cleaned_pages_data:
-        print(f"🔍 First URL: {cleaned_pages_data[0][0]}", flush=True)
-        print(f"🔍 Last URL: {cleaned_pages_data[-1][0]}", flush=True)
-    
-    # Extract only the text for joining
-    texts = [item[1] for item in cleaned_pages_data]
-    return "\n\n".join(texts)
+from django.db import transaction
+from services.chunk_dedup import ChunkDeduplicator, release_document_chunks
+from services.chunking import chunk_flags, chunk_text
+from services.crawl_frontier import parse_lastmod
+from services.crawl_state import CrawlCheckpoint
+from services.crawler import CRAWL_PAGE_LIMIT, iter_crawled_pages
+from services.page_store import delete_manifest, put_page_text, write_manifest
+from services.vectorstores import (
+    MIGRATE_BATCH,
+    get_vectorstore,
+    legacy_vectorstore,
+    migrate_legacy_chunks,
+    partitioned_providers,
+    provider_key,
+    provider_write_lock,
+)
+
+# Seconds between flushes of a partial batch, bounding the work an interrupted ingestion loses
+CHECKPOINT_INTERVAL = 30.0
 
 def generate_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-def chunk_text(text: str):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=150,
-        separators=["\n\n", "\n", ".", " "],
-    )
-    return splitter.split_text(text)
-
-def get_vectorstore():
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+def make_chunk_id(provider: str, url: str, page_url: str, content_hash: str) -> str:
+    # Derived from the chunk's (normalized) text rather than its position on the page: a chunk
+    # keeps its id when text is added above it, and re-writing the same chunk is a no-op upsert
+    return f"{provider}:{generate_hash(url)}:{generate_hash(page_url)[:16]}:{content_hash[:24]}"
 
-    return Chroma(
-        persist_directory=settings.VECTOR_DB_PATH,
-        embedding_function=embeddings,
-    )
-
-def is_valid_doc_text(text: str) -> bool:
-    if not text:
-        return False
-    # Filter out very short chunks
-    if len(text) < 150: 
-        return False
-    # Filter out chunks that look like HTML entities or noise
-    if text.count("&quot;") > 3:
-        return False
-    
-    # Filter out common UI/Boilerplate strings
-    noise_patterns = [
-        "Grow your career",
-        "page help you?",
-        "Thanks for letting us know",
-        "Was this page helpful?",
-        "Tell us what we did right",
-        "privacy policy",
-        "terms of service",
-        "cookie settings",
-        "sign in",
-        "sign up",
-    ]
-    
-    for pattern in noise_patterns:
-        if pattern.lower() in text.lower():
-            return False
-            
-    return True
-
-def ingest_document(title: str, url: str, provider: str, version: str = None):
-    # 1️⃣ Fetch + clean
-    raw_text = fetch_and_clean_text(url)
-
-    if not raw_text:
-        print(f"⚠️ No content fetched from {url}", flush=True)
-        raise ValueError("No content fetched from the provided URL. The page might be empty, requiring JavaScript, or blocking scrapers.")
-
-
-    content_hash = generate_hash(raw_text)
-    print(f"ℹ️ Generated hash {content_hash} for {len(raw_text)} chars from {url}", flush=True)
+def refresh_retrieval_index(vectorstore, provider: str):
+    """Brings the provider's FAISS mirror up to date with the vector store (RETRIEVAL_BACKEND=faiss)."""
+    if settings.RETRIEVAL_BACKEND != "faiss":
+        return
+    from services.faiss_index import sync_provider_index
+    try:
+        result = sync_provider_index(vectorstore._collection, provider_key(provider))
+        action = "rebuilt" if result["rebuilt"] else "updated"
+        print(
+            f"✅ FAISS index for {result['provider']} {action}: {result['chunks']} chunks "
+            f"(+{result['added']} / -{result['removed']})",
+            flush=True,
+        )
+    except Exception as e:
+        # Searches keep using the previous mirror; the next ingestion retries
+        print(f"⚠️ FAISS index refresh failed for {provider}: {e}", flush=True)
 
-    # 2️⃣ DB metadata
-    doc, created = Document.objects.get_or_create(
-        source_url=url,
-        defaults={
-            "title": title,
-            "provider": provider,
-            "version": version,
-            "content_hash": content_hash,
-        },
+def _upsert_chunks(vectorstore, chunk_store, texts: list[str], metadatas: list[dict], ids: list[str]) -> tuple[int, int]:
+    """
+    Writes a batch of new chunks through `chunk_store`, embedding only those whose id is not in
+    the vector store yet. Ids are derived from content, so a stored id already holds this text:
+    e.g. chunks an interrupted ingestion wrote before it could record them. Those only get their
+    metadata refreshed. Returns (chunks embedded, chunks already stored).
+    """
+    stored = set(vectorstore.get(ids=ids, include=[])["ids"])
+    new = [i for i, chunk_id in enumerate(ids) if chunk_id not in stored]
+    written = []
+    if new:
+        # The ids actually written: a shared writer skips those a concurrent ingestion just wrote
+        written = chunk_store.add_texts(
+            texts=[texts[i] for i in new],
+            metadatas=[metadatas[i] for i in new],
+            ids=[ids[i] for i in new],
+        )
+    if stored:
+        # A stored chunk may already be searchable (e.g. it came back on a page): don't stage it again
+        kept = [i for i, chunk_id in enumerate(ids) if chunk_id in stored]
+        vectorstore._collection.update(
+            ids=[ids[i] for i in kept],
+            metadatas=[{k: v for k, v in metadatas[i].items() if k != "staged"} for i in kept],
+        )
+    return len(written), len(stored)
+
+def _staged_chunks(vectorstore, chunk_ids) -> list[str]:
+    """The staged chunks among `chunk_ids`."""
+    chunk_ids = list(chunk_ids)
+    staged = []
+    for start in range(0, len(chunk_ids), MIGRATE_BATCH):
+        staged += vectorstore.get(ids=chunk_ids[start:start + MIGRATE_BATCH], where={"staged": True}, include=[])["ids"]
+    return staged
+
+def _publish_chunks(vectorstore, staged: list[str]):
+    """Makes staged chunks searchable."""
+    for start in range(0, len(staged), MIGRATE_BATCH):
+        batch = staged[start:start + MIGRATE_BATCH]
+        # None removes the key: published chunks look like chunks stored before staging existed
+        vectorstore._collection.update(ids=batch, metadatas=[{"staged": None}] * len(batch))
+
+def _has_staged_chunks(vectorstore, url: str) -> bool:
+    return bool(vectorstore.get(where={"$and": [{"source": url}, {"staged": True}]}, include=[], limit=1)["ids"])
+
+def _save_document_pages(url: str, pages: dict):
+    """Replaces the stored page records of a document with those of its latest complete crawl."""
+    DocumentPage.objects.filter(source_url=url).exclude(page_url__in=list(pages)).delete()
+    DocumentPage.objects.bulk_create(
+        [
+            DocumentPage(
+                source_url=url,
+                page_url=page_url,
+                lastmod=parse_lastmod(page["lastmod"]),
+                page_hash=page["page_hash"],
+                chunk_ids=page["chunk_ids"],
+            )
+            for page_url, page in pages.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["source_url", "page_url"],
+        update_fields=["lastmod", "page_hash", "chunk_ids", "updated_at"],
     )
 
-    # 3️⃣ Skip unchanged
-    if not created and doc.content_hash == content_hash and doc.is_indexed:
-        print("⚠️ Document unchanged and already indexed. Skipping.")
+def refresh_explanations(provider: str):
+    """Regenerates the cached policy finding explanations after the provider's index changed."""
+    if not settings.POLICY_EXPLAIN_PRECOMPUTE:
         return
-
-    # 4️⃣ Chunk clean text
-    chunks = chunk_text(raw_text)
-
-    # 5️⃣ Validate chunks
-    valid_chunks = [
-        c for c in chunks
-        if is_valid_doc_text(c)
-    ]
-
-    if not valid_chunks:
-        print(f"⚠️ No useful chunks found for {url}", flush=True)
-        raise ValueError("No useful text chunks could be extracted from the content.")
-
-
-      # 6️⃣ Embed (CLEANUP + BATCH INSERT)
-    vectorstore = get_vectorstore()
-
-    # Explicitly clear old chunks for this source to prevent "ghost" data if new scan is smaller
+    from services.Demo_Policy_funs.policy_explainer import precompute_explanations
     try:
-        print(f"🧹 Cleaning up old chunks for {url}...", flush=True)
-        vectorstore.delete(where={"source": url})
+        count = precompute_explanations(provider)
+        print(f"✅ Precomputed {count} finding explanations for {provider}", flush=True)
     except Exception as e:
-        print(f"⚠️ Cleanup failed (normal if first time): {e}", flush=True)
+        print(f"⚠️ Explanation precompute failed for {provider}: {e}", flush=True)
 
-    try:
-        BATCH_SIZE = 1000  # ✅ safe value (can keep 500 also)
+def ingest_document(title: str, url: str, provider: str, version: str = None, sitemap_url: str = None,
+                    include_patterns: list[str] = None, exclude_patterns: list[str] = None,
+                    vector_writer=None, refresh_provider: bool = True) -> dict:
+    """
+    Crawls, chunks and embeds a document page by page as pages arrive.
+    Pages whose content is already indexed are not re-embedded, and chunks duplicating
+    one already stored for the provider are referenced instead of embedded again.
+
+    The crawl runs for at most CRAWL_TIME_SLICE seconds. If it is cut short, the pages
+    processed so far stay checkpointed and the next call resumes the crawl. Chunks are written
+    to the provider's collection as pages arrive, but staged ("staged": True in their metadata)
+    and left out of searches, so a crawl that fails or is cut short is never served. Once the
+    crawl completes, one database transaction switches the document hash, page records and
+    is_indexed to it and publishes its staged chunks; the previous crawl's stale chunks are
+    removed right after.
+    Crawl rules (sitemap, include/exclude patterns) not passed are taken from the stored Document.
+    With a sitemap, pages whose lastmod did not change since the last complete crawl are
+    neither fetched nor re-embedded.
+    Chunks are written through `vector_writer` when given (services.bulk_ingest), so concurrent
+    ingestions share one embedding thread. With `refresh_provider` False, the FAISS mirror and
+    cached explanations are left for the caller to refresh once for the whole batch.
+    Returns a summary of what was done ("complete" tells whether the crawl finished).
+    """
+    # Held until the end: a reindex must not swap out the collection this writes to
+    with provider_write_lock(provider):
+        return _ingest_document(title, url, provider, version, sitemap_url, include_patterns, exclude_patterns,
+                                vector_writer, refresh_provider)
+
+
+def _ingest_document(title: str, url: str, provider: str, version: str, sitemap_url: str,
+                     include_patterns: list[str], exclude_patterns: list[str], vector_writer, refresh_provider: bool) -> dict:
+    BATCH_SIZE = 1000  # ✅ safe value (can keep 500 also)
+
+    # Chunks of this provider still in the pre-partitioning collection move to its own first,
+    # so the stored-chunk lookups and stale-chunk cleanup below see all of them
+    moved = migrate_legacy_chunks(provider)
+    if moved:
+        print(f"ℹ️ Moved {sum(moved.values())} legacy chunks into the {provider} collection", flush=True)
+    vectorstore = get_vectorstore(provider)
+    chunk_store = vector_writer.bind(vectorstore) if vector_writer else vectorstore
+    deduplicator = ChunkDeduplicator(
+        provider, url, title, pending=vector_writer.pending_chunks(provider) if vector_writer else None
+    )
+    checkpoint = CrawlCheckpoint(url)
+
+    existing_doc = Document.objects.filter(source_url=url).first()
+    if existing_doc:
+        sitemap_url = existing_doc.sitemap_url if sitemap_url is None else sitemap_url
+        include_patterns = existing_doc.include_patterns if include_patterns is None else include_patterns
+        exclude_patterns = existing_doc.exclude_patterns if exclude_patterns is None else exclude_patterns
+    # Pages of the last complete crawl: one whose text did not change keeps its chunks
+    known_pages = {p.page_url: p for p in DocumentPage.objects.filter(source_url=url)}
+
+    summary = {
+        "pages": 0,
+        "pages_unchanged": 0,
+        "chunks_embedded": 0,
+        "chunks_reused": 0,
+        "chunks_deduplicated": 0,
+        "chunks_already_stored": 0,
+        "duplicate_urls_skipped": 0,
+        "other_locale_skipped": 0,
+        "near_duplicate_pages": 0,
+        "excluded_by_rules": 0,
+        "sitemap_unchanged": 0,
+        "pages_resumed": 0,
+        "complete": False,
+    }
+    pages = {}  # page_url -> {"page_hash", "chunk_ids", "lastmod"} of every page of this crawl
+    keep_ids = set()
+    batch_texts, batch_metas, batch_ids = [], [], []
+    last_flush = time.monotonic()
+
+    # Pages stored by earlier slices of an interrupted crawl
+    for page_url, record in checkpoint.load().items():
+        pages[page_url] = record
+        keep_ids.update(record["chunk_ids"])
+    summary["pages_resumed"] = len(pages)
+    if pages:
+        print(f"ℹ️ Resuming crawl of {url} after {len(pages)} checkpointed pages", flush=True)
+
+    def record_page(page_url, page_hash, page_ids, lastmod):
+        pages[page_url] = {"page_hash": page_hash, "chunk_ids": page_ids, "lastmod": lastmod}
+        keep_ids.update(page_ids)
+        checkpoint.record(page_url, page_hash, page_ids, lastmod)
+
+    def flush_batch() -> bool:
+        nonlocal last_flush
+        last_flush = time.monotonic()
+        if batch_texts:
+            try:
+                written, already_stored = _upsert_chunks(vectorstore, chunk_store, batch_texts, batch_metas, batch_ids)
+            except Exception as e:
+                print(f"❌ Vector insertion failed: {e}", flush=True)
+                return False
+            summary["chunks_embedded"] += written
+            summary["chunks_already_stored"] += already_stored
+            print(f"✅ Inserted {summary['chunks_embedded']} chunks so far from {url}", flush=True)
+            batch_texts.clear()
+            batch_metas.clear()
+            batch_ids.clear()
+        # Fingerprints and checkpointed pages are only recorded once their chunks are actually stored
+        deduplicator.flush()
+        checkpoint.commit()
+        return True
+
+    crawl_overrides = {
+        "JOBDIR": checkpoint.jobdir,
+        "CLOSESPIDER_TIMEOUT": settings.CRAWL_TIME_SLICE,
+        "CLOSESPIDER_PAGECOUNT": max(CRAWL_PAGE_LIMIT - len(pages), 1),
+    }
+    crawled_pages = iter_crawled_pages(
+        url,
+        provider=provider,
+        overrides=crawl_overrides,
+        stats=summary,
+        sitemap_url=sitemap_url,
+        include_patterns=include_patterns,
+        exclude_patterns=exclude_patterns,
+        known_lastmods={page_url: p.lastmod for page_url, p in known_pages.items() if p.lastmod} if sitemap_url else None,
+    )
 
-        metadatas = [
-            {
+    # 1️⃣ Fetch + clean, one page at a time
+    for page_url, page_text, lastmod in crawled_pages:
+        if page_url in pages:
+            continue  # same page reached twice (e.g. via a redirect)
+        summary["pages"] += 1
+
+        # Sitemap says the page did not change: keep what the last crawl indexed
+        if page_text is None:
+            known = known_pages[page_url]
+            record_page(page_url, known.page_hash, known.chunk_ids, lastmod)
+            summary["pages_unchanged"] += 1
+            summary["chunks_reused"] += len(known.chunk_ids)
+            continue
+
+        page_hash = generate_hash(page_text)
+        try:
+            put_page_text(page_text, page_hash)
+        except Exception as e:
+            print(f"⚠️ Could not store the text of {page_url}: {e}", flush=True)
+
+        # 2️⃣ Skip pages whose content did not change since the last complete crawl. Other pages
+        # are re-chunked; their chunks that are already stored keep their ids and aren't re-embedded.
+        known = known_pages.get(page_url)
+        if known is not None and known.page_hash == page_hash:
+            record_page(page_url, page_hash, known.chunk_ids, lastmod)
+            summary["pages_unchanged"] += 1
+            summary["chunks_reused"] += len(known.chunk_ids)
+            continue
+
+        # 3️⃣ Chunk + validate this page
+        valid_chunks = [(c, flags) for c in chunk_text(page_text) if (flags := chunk_flags(c)).valid]
+        page_ids = []
+
+        # 4️⃣ Embed in batches as chunks accumulate, skipping chunks already stored elsewhere
+        for chunk, flags in valid_chunks:
+            duplicate_id, signature = deduplicator.find(chunk, page_url)
+            if duplicate_id:
+                page_ids.append(duplicate_id)
+                summary["chunks_deduplicated"] += 1
+                # Claimed by a concurrent ingestion that has not stored it yet: write it with this
+                # batch too, so it is stored before this page is recorded (the writer embeds it once)
+                borrowed = deduplicator.borrow(duplicate_id)
+                if borrowed:
+                    batch_texts.append(borrowed[0])
+                    batch_metas.append(borrowed[1])
+                    batch_ids.append(duplicate_id)
+                continue
+
+            chunk_id = make_chunk_id(provider, url, page_url, signature[0])
+            metadata = {
                 "source": url,
                 "provider": provider,
                 "title": title,
+                "page_url": page_url,
+                "page_hash": page_hash,
+                "context_ok": flags.context_ok,
+                "staged": True,
             }
-            for _ in valid_chunks
-        ]
-
-        for i in range(0, len(valid_chunks), BATCH_SIZE):
-            batch_texts = valid_chunks[i:i + BATCH_SIZE]
-            batch_metas = metadatas[i:i + BATCH_SIZE]
-
-            batch_ids = [
-                f"{provider}:{generate_hash(url)}:{i+j}"
-                for j in range(len(batch_texts))
-            ]
-
-            vectorstore.add_texts(
-                texts=batch_texts,
-                metadatas=batch_metas,
-                ids=batch_ids
-            )
-
+            deduplicator.add(chunk_id, signature, page_url, chunk, metadata)
+            batch_texts.append(chunk)
+            batch_metas.append(metadata)
+            batch_ids.append(chunk_id)
+            page_ids.append(chunk_id)
+            if len(batch_texts) >= BATCH_SIZE and not flush_batch():
+                return summary
+
+        record_page(page_url, page_hash, page_ids, lastmod)
+        if time.monotonic() - last_flush >= CHECKPOINT_INTERVAL and not flush_batch():
+            return summary
+
+    if not flush_batch():
+        return summary
+
+    # Time slice used up (or crawl stopped): keep the state for the next ingestion to resume from
+    finish_reason = summary.pop("finish_reason", None)
+    if finish_reason not in ("finished", "closespider_pagecount"):
+        checkpoint.mark_clean()
+        print(
+            f"⏸️ Crawl of {url} stopped ({finish_reason}) after {len(pages)} pages; "
+            f"the next ingestion resumes it",
+            flush=True,
+        )
+        if refresh_provider:
+            refresh_retrieval_index(vectorstore, provider)
+        return summary
+
+    summary["complete"] = True
+    checkpoint.clear()
+
+    if not pages:
+        print(f"⚠️ No content fetched from {url}", flush=True)
+        raise ValueError("No content fetched from the provided URL. The page might be empty, requiring JavaScript, or blocking scrapers.")
 
-            print(f"✅ Inserted {min(i + BATCH_SIZE, len(valid_chunks))}/{len(valid_chunks)} chunks", flush=True)
+    if not keep_ids:
+        print(f"⚠️ No useful chunks found for {url}", flush=True)
+        raise ValueError("No useful text chunks could be extracted from the content.")
 
+    # Order-independent hash of the whole document, from the per-page hashes
+    content_hash = generate_hash("\n".join(sorted(f"{u} {p['page_hash']}" for u, p in pages.items())))
+    print(f"ℹ️ Generated hash {content_hash} for {len(pages)} pages from {url}", flush=True)
+
+    # 5️⃣ Commit: the document and its page records switch to this crawl in one transaction,
+    # which also publishes this crawl's staged chunks (if that fails, nothing is committed).
+    # The previous crawl's chunks stay in place until the cleanup below.
+    staged = _staged_chunks(vectorstore, keep_ids)
+    with transaction.atomic():
+        doc, created = Document.objects.select_for_update().get_or_create(
+            source_url=url,
+            defaults={
+                "title": title,
+                "provider": provider,
+                "version": version,
+                "content_hash": content_hash,
+                "sitemap_url": sitemap_url,
+                "include_patterns": include_patterns or [],
+                "exclude_patterns": exclude_patterns or [],
+            },
+        )
+        unchanged = not created and doc.content_hash == content_hash and doc.is_indexed
+        _save_document_pages(url, pages)
+        if not unchanged:
+            doc.content_hash = content_hash
+            doc.sitemap_url = sitemap_url
+            doc.include_patterns = include_patterns or []
+            doc.exclude_patterns = exclude_patterns or []
+            doc.is_indexed = True
+            doc.save()
+        _publish_chunks(vectorstore, staged)
+    if staged:
+        print(f"ℹ️ Published {len(staged)} staged chunks of {url}", flush=True)
+    try:
+        write_manifest(url, provider, pages)
     except Exception as e:
-        print(f"❌ Vector insertion failed: {e}", flush=True)
-        return
+        print(f"⚠️ Could not write the page store manifest of {url}: {e}", flush=True)
+
+    # 6️⃣ Skip unchanged, unless an earlier crawl that was cut short left staged chunks to remove
+    if unchanged and not _has_staged_chunks(vectorstore, url):
+        print("⚠️ Document unchanged and already indexed. Skipping.")
+        return summary
 
+    # 7️⃣ Remove chunks of pages that changed or disappeared, so no "ghost" data remains.
+    # Shared chunks other documents still reference are handed over to them instead.
+    try:
+        handed_over = release_document_chunks(vectorstore, url, keep_ids)
+        current_ids = vectorstore.get(where={"source": url}, include=[])["ids"]
+        stale_ids = [i for i in current_ids if i not in keep_ids and i not in handed_over]
+        if stale_ids:
+            print(f"🧹 Cleaning up {len(stale_ids)} old chunks for {url}...", flush=True)
+            vectorstore.delete(ids=stale_ids)
+    except Exception as e:
+        print(f"⚠️ Cleanup failed: {e}", flush=True)
+        # Old chunks are still searchable: the next ingestion must not skip the document as unchanged
+        Document.objects.filter(pk=doc.pk).update(is_indexed=False)
+
+    if refresh_provider:
+        refresh_retrieval_index(vectorstore, provider)
+
+    print(
+        f"✅ Ingested {url}: {summary['pages']} pages ({summary['pages_unchanged']} unchanged), "
+        f"{summary['chunks_embedded']} chunks embedded, {summary['chunks_reused']} reused, "
+        f"{summary['chunks_deduplicated']} deduplicated; skipped "
+        f"{summary['duplicate_urls_skipped']} duplicate URLs, {summary['other_locale_skipped']} other-locale URLs, "
+        f"{summary['near_duplicate_pages']} near-duplicate pages",
+        flush=True,
+    )
 
-    # 7️⃣ Update DB state
-    doc.content_hash = content_hash
-    doc.is_indexed = True
-    doc.save()
+    # 9️⃣ Refresh cached policy finding explanations for the new index generation
+    if refresh_provider:
+        refresh_explanations(provider)
 
-    print(f"✅ Ingested {len(valid_chunks)} chunks from {url}", flush=True)
+    return summary
 
 def delete_document(url: str):
     """
-    Deletes a document from both the database and the vector store.
+    Deletes a document from the database and the vector store, and its page store manifest
+    (its page texts are removed by the next `manage.py page_store gc`).
     """
     # 1. Delete from Vector Store
     try:
-        vectorstore = get_vectorstore()
         print(f"🧹 Deleting chunks for {url} from vector store...", flush=True)
-        vectorstore.delete(where={"source": url})
+        doc = Document.objects.filter(source_url=url).first()
+        with provider_write_lock(doc.provider) if doc else nullcontext():
+            if doc:
+                migrate_legacy_chunks(doc.provider)
+                vectorstores = [get_vectorstore(doc.provider)]
+            else:
+                # No record of the provider: look for the chunks in every collection
+                vectorstores = [get_vectorstore(p) for p in partitioned_providers()]
+                legacy = legacy_vectorstore()
+                if legacy is not None:
+                    vectorstores.append(legacy)
+            for vectorstore in vectorstores:
+                release_document_chunks(vectorstore, url, keep_ids=set())
+                vectorstore.delete(where={"source": url})
+        if doc:
+            refresh_retrieval_index(vectorstores[0], doc.provider)
     except Exception as e:
         print(f"⚠️ Vector store deletion failed for {url}: {e}", flush=True)
 
     # 2. Delete from Database
     try:
+        DocumentPage.objects.filter(source_url=url).delete()
+        delete_manifest(url)
         deleted_count, _ = Document.objects.filter(source_url=url).delete()
         if deleted_count > 0:
             print(f"✅ Deleted document record for {url} from database.", flush=True)
@@ -1,22 +1,166 @@
 import requests
 import logging
+import re
+import threading
+import time
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 import json
 
+
+class OllamaBackend:
+    """
+    One Ollama endpoint in the pool.
+    Tracks in-flight calls (for least-loaded routing) and passive health state.
+    """
+
+    def __init__(self, url: str, models: list[str] | None = None):
+        self.url = url.rstrip('/')
+        self.models = set(models or [])
+        self.in_flight = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    def hosts(self, model: str) -> bool:
+        # An empty model list means the backend serves whatever is asked of it
+        return not self.models or model in self.models
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def __repr__(self):
+        return f"OllamaBackend({self.url}, in_flight={self.in_flight}, failures={self.failures})"
+
+
+class OllamaPool:
+    """
+    Routes each call to the least-loaded healthy backend that hosts the requested model.
+
+    Health is checked passively: a backend that refuses a connection, times out or
+    answers with a 5xx is taken out of rotation for a cooldown that doubles on every
+    consecutive failure, and the call fails over to the next candidate.
+    """
+
+    def __init__(self, backends: list[dict], cooldown: float = 15.0):
+        if not backends:
+            raise ValueError("At least one Ollama backend must be configured.")
+        self.backends = [OllamaBackend(b["url"], b.get("models")) for b in backends]
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def candidates(self, model: str) -> list[OllamaBackend]:
+        """Backends hosting `model`, healthy ones first, each group ordered by current load."""
+        now = time.monotonic()
+        with self._lock:
+            hosting = [b for b in self.backends if b.hosts(model)]
+            if not hosting:
+                raise ValueError(f"No Ollama backend is configured to host model '{model}'.")
+            healthy = sorted((b for b in hosting if b.is_healthy(now)), key=lambda b: b.in_flight)
+            # Unhealthy backends are still tried last (soonest to recover first) rather than failing outright
+            cooling = sorted((b for b in hosting if not b.is_healthy(now)), key=lambda b: b.down_until)
+            return healthy + cooling
+
+    def backends_for(self, model: str) -> list[OllamaBackend]:
+        return [b for b in self.backends if b.hosts(model)]
+
+    def acquire(self, backend: OllamaBackend):
+        with self._lock:
+            backend.in_flight += 1
+
+    def release(self, backend: OllamaBackend):
+        with self._lock:
+            backend.in_flight -= 1
+
+    def mark_success(self, backend: OllamaBackend):
+        with self._lock:
+            backend.failures = 0
+            backend.down_until = 0.0
+
+    def mark_failure(self, backend: OllamaBackend):
+        with self._lock:
+            backend.failures += 1
+            backoff = self.cooldown * min(2 ** (backend.failures - 1), 8)
+            backend.down_until = time.monotonic() + backoff
+        logger.warning(f"Ollama backend {backend.url} marked unhealthy for {backoff:.0f}s")
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": b.url,
+                    "models": sorted(b.models),
+                    "in_flight": b.in_flight,
+                    "healthy": b.is_healthy(now),
+                    "failures": b.failures,
+                }
+                for b in self.backends
+            ]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OllamaPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OllamaPool(settings.OLLAMA_BACKENDS, cooldown=settings.OLLAMA_BACKEND_COOLDOWN)
+    return _pool
+
+
+def configure_pool(backends: list[dict], cooldown: float | None = None) -> OllamaPool:
+    """Replace the process-wide pool (used by load tests and benchmarks)."""
+    global _pool
+    with _pool_lock:
+        _pool = OllamaPool(
+            backends,
+            cooldown=settings.OLLAMA_BACKEND_COOLDOWN if cooldown is None else cooldown,
+        )
+    return _pool
+
+
+def _is_backend_failure(e: requests.exceptions.RequestException) -> bool:
+    """Connection problems, timeouts and server errors count against the backend; 4xx (e.g. unknown model) do not."""
+    if isinstance(e, requests.exceptions.Timeout):
+        return True
+    response = getattr(e, "response", None)
+    if response is None:
+        return True
+    return response.status_code >= 500
+
+
+def request_timeout() -> tuple[float, float]:
+    # The read timeout bounds each wait for data, so a long generation that keeps streaming is not cut off
+    return (settings.OLLAMA_CONNECT_TIMEOUT, settings.OLLAMA_READ_TIMEOUT)
+
+
+def keep_alive_value(value: str | int):
+    """
+    keep_alive as Ollama accepts it: a bare number ("-1", "300") is sent as a number of seconds,
+    since Ollama parses strings as Go durations and rejects them without a unit.
+    """
+    if isinstance(value, str) and re.fullmatch(r"-?\d+", value.strip()):
+        return int(value)
+    return value
+
+
+def keep_alive_for(model: str) -> str | int:
+    return keep_alive_value(settings.OLLAMA_KEEP_ALIVE_OVERRIDES.get(model, settings.OLLAMA_KEEP_ALIVE))
+
+
 def call_llm(prompt: str, temperature: float = 0.2, top_p: float = 0.9, model: str | None = None, stream: bool = False):
-    # Ensure no double slashes if settings has a trailing slash
-    base_url = settings.OLLAMA_BASE_URL.rstrip('/')
-    url = f"{base_url}/api/generate"
-    
     selected_model = model if model else settings.LLM_MODEL
-    
+
     payload = {
         "model": selected_model,
         "prompt": prompt,
         "stream": stream,
+        "keep_alive": keep_alive_for(selected_model),
         "options": {
             "temperature": temperature,
             "top_p": top_p,
@@ -24,30 +168,68 @@ def call_llm(prompt: str, temperature: float = 0.2, top_p: float = 0.9, model: s
         }
     }
 
-    try:
-        if stream:
-            return _streaming_call_llm(url, payload)
-        
-        response = requests.post(url, json=payload, timeout=None)
-        response.raise_for_status()
-        return response.json()["response"]
-    except requests.exceptions.RequestException as e:
-        logger.error(f"LLM Call Failed: {str(e)}")
-        if hasattr(e, 'response') and e.response is not None:
-            logger.error(f"Response content: {e.response.text}")
-        raise
-
-def _streaming_call_llm(url, payload):
-    """Generator for streaming Ollama response."""
-    with requests.post(url, json=payload, stream=True, timeout=None) as response:
-        response.raise_for_status()
-        for line in response.iter_lines():
-            if line:
-                chunk = json.loads(line.decode('utf-8'))
-                if "response" in chunk:
-                    yield chunk["response"]
-                if chunk.get("done"):
-                    break
+    if stream:
+        return _streaming_call_llm(payload)
+
+    pool = get_pool()
+    last_error = None
+    for backend in pool.candidates(selected_model):
+        url = f"{backend.url}/api/generate"
+        pool.acquire(backend)
+        try:
+            response = requests.post(url, json=payload, timeout=request_timeout())
+            response.raise_for_status()
+            result = response.json()["response"]
+            pool.mark_success(backend)
+            return result
+        except requests.exceptions.RequestException as e:
+            last_error = e
+            logger.error(f"LLM Call Failed on {backend.url}: {str(e)}")
+            if hasattr(e, 'response') and e.response is not None:
+                logger.error(f"Response content: {e.response.text}")
+            if _is_backend_failure(e):
+                pool.mark_failure(backend)
+        finally:
+            pool.release(backend)
+
+    raise last_error
+
+def _streaming_call_llm(payload):
+    """
+    Generator for streaming Ollama response.
+    Fails over to the next backend only while no token has been yielded yet;
+    a stream that breaks midway is surfaced to the caller.
+    """
+    pool = get_pool()
+    last_error = None
+    for backend in pool.candidates(payload["model"]):
+        url = f"{backend.url}/api/generate"
+        started = False
+        pool.acquire(backend)
+        try:
+            with requests.post(url, json=payload, stream=True, timeout=request_timeout()) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        chunk = json.loads(line.decode('utf-8'))
+                        if "response" in chunk:
+                            started = True
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
+            pool.mark_success(backend)
+            return
+        except requests.exceptions.RequestException as e:
+            last_error = e
+            logger.error(f"LLM Stream Failed on {backend.url}: {str(e)}")
+            if _is_backend_failure(e):
+                pool.mark_failure(backend)
+            if started:
+                raise
+        finally:
+            pool.release(backend)
+
+    raise last_error
 
 def classify_relevance(question: str) -> bool:
     """
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+from services.llm import call_llm, get_pool, keep_alive_for, keep_alive_value
+
+logger = logging.getLogger(__name__)
+
+
+def models_to_warm() -> list[str]:
+    """Every model the deliberation agents use, plus the default LLM_MODEL."""
+    from services.deliberation import AGENTS
+
+    return list(dict.fromkeys(list(AGENTS.values()) + [settings.LLM_MODEL]))
+
+
+def preload_model(base_url: str, model: str, keep_alive: str | int | None = None) -> float:
+    """
+    Loads `model` into memory on one backend without generating anything
+    (Ollama treats a generate call without a prompt as a load request).
+    Returns the seconds it took.
+    """
+    start = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/api/generate",
+        json={"model": model, "keep_alive": keep_alive_for(model) if keep_alive is None else keep_alive_value(keep_alive)},
+        timeout=300,
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def unload_model(base_url: str, model: str):
+    preload_model(base_url, model, keep_alive=0)
+
+
+def loaded_models(base_url: str) -> set[str]:
+    """Models currently resident on a backend, per Ollama's /api/ps."""
+    response = requests.get(f"{base_url}/api/ps", timeout=10)
+    response.raise_for_status()
+    return {m.get("name") or m.get("model") for m in response.json().get("models", [])}
+
+
+def warm_all(models: list[str] | None = None, only_missing: bool = False) -> dict:
+    """
+    Preloads each model on every backend that hosts it.
+    With only_missing=True, backends are asked what they have loaded first and only evicted models are reloaded.
+    Returns {(backend_url, model): load_seconds} for the models that were (re)loaded.
+    """
+    pool = get_pool()
+    loaded = {}
+
+    for model in models or models_to_warm():
+        for backend in pool.backends_for(model):
+            try:
+                if only_missing and model in loaded_models(backend.url):
+                    continue
+                loaded[(backend.url, model)] = preload_model(backend.url, model)
+                logger.info(f"Warmed {model} on {backend.url} in {loaded[(backend.url, model)]:.2f}s")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Could not warm {model} on {backend.url}: {e}")
+
+    return loaded
+
+
+def time_to_first_token(model: str, prompt: str = "Reply with OK.") -> float:
+    start = time.perf_counter()
+    stream = call_llm(prompt, model=model, stream=True)
+    try:
+        next(stream)
+    finally:
+        stream.close()
+    return time.perf_counter() - start
+
+
+def measure_cold_warm_ttft(models: list[str] | None = None) -> list[dict]:
+    """
+    For each model: unload it everywhere, time the first token of a call (cold),
+    then time a second call while it is resident (warm).
+    """
+    pool = get_pool()
+    report = []
+
+    for model in models or models_to_warm():
+        for backend in pool.backends_for(model):
+            unload_model(backend.url, model)
+        cold = time_to_first_token(model)
+        warm = time_to_first_token(model)
+        report.append({"model": model, "cold_ttft": cold, "warm_ttft": warm})
+
+    return report
+
+
+class ModelWarmer(threading.Thread):
+    """Background thread that re-warms agent models whenever a backend has evicted them."""
+
+    def __init__(self, interval: float, models: list[str] | None = None):
+        super().__init__(name="ollama-model-warmer", daemon=True)
+        self.interval = interval
+        self.models = models
+        self._stop_event = threading.Event()
+
+    def run(self):
+        only_missing = False  # the first pass loads everything unconditionally
+        while True:
+            try:
+                warm_all(self.models, only_missing=only_missing)
+            except Exception as e:
+                logger.error(f"Model warmer pass failed: {e}")
+            only_missing = True
+            if self._stop_event.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+
+def start_model_warmer() -> ModelWarmer:
+    """Starts the process-wide warmer once; later calls return the running instance."""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = ModelWarmer(settings.OLLAMA_WARMUP_INTERVAL)
+            _warmer.start()
+    return _warmer
@@ -0,0 +1,222 @@
+"""
+Local store of the cleaned text of every crawled page, so chunking, filtering and embedding
+changes can be re-applied from disk (`manage.py reindex`) instead of re-crawling the web.
+
+Layout under PAGE_STORE_DIR:
+  blobs/<h[:2]>/<h>.zst  page text, zstd-compressed, keyed by the SHA-256 of the text (the
+                         page_hash ingestion records), so a page shared by documents or
+                         unchanged between crawls is stored once
+  manifests/<key>.json   per Document: its pages and their hashes as of the last complete
+                         crawl, and those of the crawl before it (`manage.py page_store diff`)
+
+Blobs are written as pages are crawled, manifests when an ingestion completes. Blobs that
+no manifest, page record or in-progress crawl refers to are removed by `manage.py page_store gc`.
+"""
+import difflib
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+# Blobs younger than this are never collected: their page may not be recorded anywhere yet
+GC_GRACE_SECONDS = 3600
+
+
+def store_dir() -> Path:
+    return Path(settings.PAGE_STORE_DIR).resolve()
+
+
+def blob_path(page_hash: str) -> Path:
+    return store_dir() / "blobs" / page_hash[:2] / f"{page_hash}.zst"
+
+
+def manifest_path(url: str) -> Path:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return store_dir() / "manifests" / f"{key}.json"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def put_page_text(text: str, page_hash: str | None = None) -> str:
+    """Stores a page's cleaned text (once per content) and returns its hash."""
+    import zstandard
+
+    page_hash = page_hash or hashlib.sha256(text.encode("utf-8")).hexdigest()
+    path = blob_path(page_hash)
+    if path.exists():
+        os.utime(path)  # referenced again: keep it out of a concurrent gc's reach
+        return page_hash
+    compressor = zstandard.ZstdCompressor(level=settings.PAGE_STORE_ZSTD_LEVEL)
+    _write_atomic(path, compressor.compress(text.encode("utf-8")))
+    return page_hash
+
+
+def get_page_text(page_hash: str) -> str | None:
+    """A stored page's text, or None if the store does not have it."""
+    import zstandard
+
+    try:
+        data = blob_path(page_hash).read_bytes()
+    except FileNotFoundError:
+        return None
+    return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
+
+def has_page_text(page_hash: str) -> bool:
+    return blob_path(page_hash).exists()
+
+
+def read_manifest(url: str) -> dict | None:
+    try:
+        return json.loads(manifest_path(url).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(url: str, provider: str, pages: dict[str, dict]):
+    """
+    Records the pages of a document's latest complete crawl, {page_url: {"page_hash", "lastmod"}}.
+    The pages of the crawl before it are kept as "previous" when they differ.
+    """
+    current = {
+        page_url: {"page_hash": page["page_hash"], "lastmod": page.get("lastmod")}
+        for page_url, page in sorted(pages.items())
+    }
+    old = read_manifest(url) or {}
+    previous = old.get("previous")
+    if old.get("pages") is not None and _hashes(old["pages"]) != _hashes(current):
+        previous = {"pages": old["pages"], "crawled_at": old.get("crawled_at")}
+    manifest = {
+        "source_url": url,
+        "provider": provider,
+        "crawled_at": time.time(),
+        "pages": current,
+        "previous": previous,
+    }
+    _write_atomic(manifest_path(url), json.dumps(manifest, indent=1).encode("utf-8"))
+
+
+def delete_manifest(url: str):
+    manifest_path(url).unlink(missing_ok=True)
+
+
+def _hashes(pages: dict) -> dict[str, str]:
+    return {page_url: page["page_hash"] for page_url, page in pages.items()}
+
+
+def diff_manifest(url: str, text: bool = False) -> dict:
+    """
+    Pages added, removed and changed between a document's last two crawls. With `text`,
+    changed pages come with a unified diff of their stored text.
+    """
+    manifest = read_manifest(url)
+    if manifest is None:
+        raise ValueError(f"The page store has no manifest for {url}")
+    new = _hashes(manifest["pages"])
+    old = _hashes((manifest.get("previous") or {}).get("pages") or {})
+    changed = [page_url for page_url in sorted(new.keys() & old.keys()) if new[page_url] != old[page_url]]
+    result = {
+        "previous_crawled_at": (manifest.get("previous") or {}).get("crawled_at"),
+        "crawled_at": manifest["crawled_at"],
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": changed,
+        "unchanged": len(new.keys() & old.keys()) - len(changed),
+    }
+    if text:
+        result["diffs"] = {}
+        for page_url in changed:
+            before, after = get_page_text(old[page_url]), get_page_text(new[page_url])
+            if before is None or after is None:
+                continue
+            # Cleaned text is one long line; compare it sentence by sentence
+            result["diffs"][page_url] = "\n".join(difflib.unified_diff(
+                before.replace(". ", ".\n").splitlines(), after.replace(". ", ".\n").splitlines(),
+                fromfile="previous", tofile="current", lineterm="",
+            ))
+    return result
+
+
+def _manifests():
+    directory = store_dir() / "manifests"
+    if not directory.exists():
+        return
+    for path in directory.glob("*.json"):
+        try:
+            yield json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+
+
+def _blobs():
+    directory = store_dir() / "blobs"
+    if not directory.exists():
+        return
+    yield from directory.glob("*/*.zst")
+
+
+def iter_page_texts(limit: int | None = None):
+    """(hash, text) of stored pages, e.g. as an offline corpus for benchmarks."""
+    for count, path in enumerate(_blobs()):
+        if limit is not None and count >= limit:
+            return
+        text = get_page_text(path.stem)
+        if text is not None:
+            yield path.stem, text
+
+
+def referenced_hashes() -> set[str]:
+    """Hashes of every page a manifest, a page record or an in-progress crawl refers to."""
+    from apps.documents.models import DocumentPage
+    from services.crawl_state import checkpointed_page_hashes
+
+    hashes = set(DocumentPage.objects.values_list("page_hash", flat=True))
+    hashes |= checkpointed_page_hashes()
+    for manifest in _manifests():
+        hashes.update(_hashes(manifest["pages"]).values())
+        hashes.update(_hashes((manifest.get("previous") or {}).get("pages") or {}).values())
+    return hashes
+
+
+def collect_garbage(grace_seconds: float = GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    """Removes blobs nothing refers to any more. Returns the number of blobs and bytes removed and kept."""
+    keep = referenced_hashes()
+    cutoff = time.time() - grace_seconds
+    result = {"removed": 0, "removed_bytes": 0, "kept": 0, "kept_bytes": 0}
+    for path in _blobs():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.stem in keep or stat.st_mtime > cutoff:
+            result["kept"] += 1
+            result["kept_bytes"] += stat.st_size
+            continue
+        if not dry_run:
+            path.unlink(missing_ok=True)
+        result["removed"] += 1
+        result["removed_bytes"] += stat.st_size
+    return result
+
+
+def store_stats() -> dict:
+    """Blob count, compressed and original sizes, and manifest count."""
+    import zstandard
+
+    stats = {"blobs": 0, "stored_bytes": 0, "text_bytes": 0, "manifests": sum(1 for _ in _manifests())}
+    for path in _blobs():
+        with path.open("rb") as f:
+            header = f.read(18)
+            stats["stored_bytes"] += os.fstat(f.fileno()).st_size
+        stats["blobs"] += 1
+        stats["text_bytes"] += zstandard.get_frame_parameters(header).content_size
+    return stats
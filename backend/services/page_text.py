@@ -0,0 +1,47 @@
+"""
+Text extraction from crawled pages, shared by the crawl worker and offline re-indexing
+(`manage.py reindex`), so both turn the same HTML into the same text.
+"""
+import urllib.parse
+
+from bs4 import BeautifulSoup
+
+
+def extract_page_text(html: str) -> str:
+    """The cleaned text of a documentation page, whitespace collapsed."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # 1. Detect if this is an AWS landing page (uses hidden XML for content)
+    xml_content = ""
+    xml_input = soup.find('input', id='landing-page-xml')
+    if xml_input and xml_input.get('value'):
+        try:
+            decoded_xml = urllib.parse.unquote(xml_input.get('value'))
+            xml_soup = BeautifulSoup(decoded_xml, "xml")
+            # Extract text from the decoded XML
+            xml_content = xml_soup.get_text(separator=" ")
+            print(f"ℹ️ Decoded AWS landing-page-xml: {len(xml_content)} characters", flush=True)
+        except Exception as e:
+            print(f"⚠️ Failed to decode AWS landing-page-xml: {e}", flush=True)
+
+    # 2. Refine cleaning and extraction
+    # Don't decompose all inputs, as AWS uses them for content metadata
+    for tag in soup([
+        "script", "style", "nav", "footer", "header", "svg", "img", 
+        "devsite-toc", "devsite-actions", "noscript", "aside",
+        "button", "form", "label", "textarea"
+    ]):
+        tag.decompose()
+
+    # Try specific content selectors first for better precision
+    main_content = soup.find(id='main-col') or soup.find(class_='awsdocs-content') or soup.find('main')
+    if main_content:
+        text = main_content.get_text(separator=" ")
+    else:
+        text = soup.get_text(separator=" ")
+
+    # Combine with XML content if found
+    if xml_content:
+        text = f"{text}\n\n{xml_content}"
+
+    return " ".join(text.split())
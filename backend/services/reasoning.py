@@ -1,3 +1,6 @@
+from services.chunking import chunk_flags
+
+
 def build_context(chunks: list[dict]) -> str:
     if not chunks:
         return ""
@@ -7,14 +10,13 @@ def build_context(chunks: list[dict]) -> str:
     for chunk in chunks:
         text = chunk.get("page_content", "").strip()
 
-        # 🔒 Basic quality filters
         if not text:
             continue
-        if len(text) < 200:              # too short → usually nav junk
-            continue
-        if "&quot;" in text or "null," in text:
-            continue
-        if "Learn more" in text and "security" not in text.lower():
+        # 🔒 Quality flag set once at ingestion; chunks stored before it existed are checked here
+        context_ok = (chunk.get("metadata") or {}).get("context_ok")
+        if context_ok is None:
+            context_ok = chunk_flags(text).context_ok
+        if not context_ok:
             continue
 
         context_parts.append(text)
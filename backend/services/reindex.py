@@ -0,0 +1,358 @@
+"""
+Offline re-indexing of a provider: every indexed Document is re-chunked and re-embedded
+from page text stored on disk, without crawling (`manage.py reindex`).
+
+Page text comes from the page store (services.page_store), which ingestion fills as it
+crawls. Pages it does not have yet (documents ingested before it existed) are read back from
+the documents' HTTP crawl cache, cleaned like the crawler does, and added to it. Both go
+through the same chunking, noise filter and chunk ids as ingestion. Pages found in neither
+keep the chunk texts the vector store already has for them: those are re-embedded and
+re-filtered, but not re-chunked.
+
+Page extraction and chunking, then embedding, run across a process pool. The chunks are
+written to a new shadow collection; the live one keeps serving searches until the shadow is
+complete. The swap then replaces the provider's chunk fingerprints and page records in one
+transaction and points the provider at the shadow collection (vectorstores.set_collection_alias).
+The swap holds the provider's write lock exclusively, so ingestions and deletions never write
+to the collection it replaces. It is aborted if one of them is running then, or if one ran
+since the reindex started (their chunks are not in the shadow collection).
+"""
+import fcntl
+import multiprocessing
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.documents.models import ChunkFingerprint, ChunkReference, Document, DocumentPage
+from services.chunk_dedup import BAND_COUNT, MAX_DISTANCE, chunk_signature
+from services.crawler import cached_pages, crawl_settings, read_cached_page
+from services.fingerprint import SimHashIndex, bands, to_signed64
+from services.chunking import chunk_flags, chunk_text
+from services.ingestion import generate_hash, make_chunk_id
+from services.page_store import get_page_text, has_page_text, put_page_text, write_manifest
+from services.page_text import extract_page_text
+from services.vectorstores import (
+    MIGRATE_BATCH,
+    collection_name,
+    get_client,
+    get_embeddings,
+    inactive_collections,
+    migrate_legacy_chunks,
+    provider_collection,
+    provider_key,
+    provider_write_lock,
+    set_collection_alias,
+    shadow_collection_name,
+    write_lock_path,
+)
+
+EMBED_BATCH = 256
+LOCK_FILE = ".reindex.lock"
+
+
+class ReindexAborted(Exception):
+    """The provider changed while it was being re-indexed; the live collection was kept."""
+
+
+def _init_worker():
+    # One thread per worker: the pool, not intra-op threads, spreads the work over the cores
+    settings.EMBEDDING_THREADS = 1
+    os.environ["OMP_NUM_THREADS"] = "1"
+
+
+def _chunk_page(job: dict) -> dict:
+    """Pool task: the valid chunks of one page, with their signatures and context flags."""
+    if job["stored"]:
+        page_hash = job["page_hash"]
+        chunks = chunk_text(get_page_text(page_hash))
+    elif job["entry"] is not None:
+        html = read_cached_page(Path(job["entry"]), job["gzipped"])
+        text = extract_page_text(html) if html else ""
+        page_hash = put_page_text(text)
+        chunks = chunk_text(text)
+    else:
+        page_hash = job["page_hash"]
+        chunks = job["texts"]
+    return {
+        "doc": job["doc"],
+        "page_url": job["page_url"],
+        "page_hash": page_hash,
+        "chunks": [
+            (chunk, chunk_signature(chunk), flags.context_ok)
+            for chunk in chunks if (flags := chunk_flags(chunk)).valid
+        ],
+    }
+
+
+def _embed(texts: list[str]) -> np.ndarray:
+    """Pool task: embeddings of a batch of chunk texts."""
+    return np.asarray(get_embeddings().embed_documents(texts), dtype="float32")
+
+
+@contextmanager
+def _reindex_lock():
+    path = Path(settings.VECTOR_DB_PATH) / LOCK_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError("Another reindex is running") from None
+        yield
+
+
+def _fetch_texts(collection, ids: list[str]) -> dict[str, str]:
+    texts = {}
+    for start in range(0, len(ids), MIGRATE_BATCH):
+        batch = collection.get(ids=ids[start:start + MIGRATE_BATCH], include=["documents"])
+        texts.update(zip(batch["ids"], batch["documents"]))
+    return texts
+
+
+def _page_jobs(documents: list, live) -> tuple[list[dict], dict]:
+    """One job per recorded page of the documents, reading from the page store or else the HTTP cache where they have it."""
+    jobs = []
+    counts = {"pages_stored": 0, "pages_cached": 0, "pages_carried": 0}
+    for i, doc in enumerate(documents):
+        entries = cached_pages(doc.source_url, doc.provider)
+        gzipped = bool(crawl_settings(doc.source_url, doc.provider).get("HTTPCACHE_GZIP"))
+        pages = list(DocumentPage.objects.filter(source_url=doc.source_url).order_by("page_url"))
+        in_store = {p.page_url for p in pages if has_page_text(p.page_hash)}
+        missing = [p for p in pages if p.page_url not in in_store and p.page_url not in entries]
+        stored = _fetch_texts(live, [chunk_id for p in missing for chunk_id in p.chunk_ids]) if missing and live else {}
+        for page in pages:
+            job = {"doc": i, "page_url": page.page_url, "page_hash": page.page_hash, "gzipped": gzipped,
+                   "stored": page.page_url in in_store, "entry": None, "texts": None}
+            if job["stored"]:
+                jobs.append(job)
+                counts["pages_stored"] += 1
+            elif page.page_url in entries:
+                jobs.append({**job, "entry": str(entries[page.page_url])})
+                counts["pages_cached"] += 1
+            else:
+                jobs.append({**job, "texts": [stored[c] for c in page.chunk_ids if c in stored]})
+                counts["pages_carried"] += 1
+    return jobs, counts
+
+
+def _other_chunks(live, urls: set[str], rebuilt: set[str]) -> list[str]:
+    """
+    Ids of live chunks the reindex did not rebuild: those of documents not re-indexed (e.g. one
+    whose first crawl was cut short), and chunks staged by a re-crawl that was cut short.
+    """
+    ids = []
+    offset = 0
+    while True:
+        batch = live.get(include=["metadatas"], limit=MIGRATE_BATCH, offset=offset)
+        if not batch["ids"]:
+            return ids
+        ids.extend(
+            i for i, m in zip(batch["ids"], batch["metadatas"])
+            if i not in rebuilt and ((m or {}).get("source") not in urls or (m or {}).get("staged"))
+        )
+        offset += len(batch["ids"])
+
+
+def _last_write(key: str) -> int:
+    """When an ingestion or deletion of the provider last finished writing (0: never)."""
+    try:
+        return write_lock_path(key).stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _provider_documents(key: str) -> list:
+    return [doc for doc in Document.objects.filter(is_indexed=True).order_by("id") if provider_key(doc.provider) == key]
+
+
+def reindex_provider(provider: str, workers: int | None = None, batch_size: int = EMBED_BATCH, progress=None) -> dict:
+    """
+    Rebuilds the provider's collection from stored page text and swaps it in.
+    `progress(stage, done, total)` is called as pages are chunked and chunks embedded.
+    Returns a summary; raises ReindexAborted if a document changed meanwhile.
+    """
+    key = provider_key(provider)
+    workers = workers or os.cpu_count() or 1
+    progress = progress or (lambda stage, done, total: None)
+    summary = {"provider": key, "documents": 0, "pages_stored": 0, "pages_cached": 0, "pages_carried": 0,
+               "chunks": 0, "chunks_deduplicated": 0, "other_chunks": 0}
+
+    with _reindex_lock():
+        migrate_legacy_chunks(provider)
+        client = get_client()
+        for name in inactive_collections(key):
+            print(f"🧹 Dropping {name} left by an unfinished reindex", flush=True)
+            client.delete_collection(name)
+
+        documents = _provider_documents(key)
+        if not documents:
+            raise ValueError(f"{key} has no indexed documents to reindex")
+        snapshot = {doc.pk: doc.updated_at for doc in documents}
+        last_write = _last_write(key)
+        summary["documents"] = len(documents)
+        live = provider_collection(key)
+        old_name = live.name if live else None
+        jobs, counts = _page_jobs(documents, live)
+        summary.update(counts)
+
+        shadow = client.create_collection(shadow_collection_name(key))
+        swapped = False
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        pool = multiprocessing.get_context("fork").Pool(workers, initializer=_init_worker) if workers > 1 else None
+        try:
+            imap = pool.imap if pool else map
+
+            # 1️⃣ Extract + chunk pages in the pool; dedup and assign ids here, in page order
+            max_distance = min(settings.CHUNK_NEAR_DUPLICATE_DISTANCE, MAX_DISTANCE)
+            hashes, near = {}, SimHashIndex(max_distance)
+            fingerprints, references, page_records = {}, {}, {}
+            texts, ids, metadatas = [], [], []
+            progress("pages", 0, len(jobs))
+            for done, page in enumerate(imap(_chunk_page, jobs), 1):
+                doc = documents[page["doc"]]
+                page_ids = []
+                for chunk, (content_hash, fingerprint), context_ok in page["chunks"]:
+                    duplicate_id = hashes.get(content_hash)
+                    if duplicate_id is None and max_distance > 0:
+                        duplicate_id = near.find(fingerprint)
+                    if duplicate_id:
+                        summary["chunks_deduplicated"] += 1
+                        chunk_id = duplicate_id
+                    else:
+                        chunk_id = make_chunk_id(doc.provider, doc.source_url, page["page_url"], content_hash)
+                        hashes[content_hash] = chunk_id
+                        if max_distance > 0:
+                            near.add(fingerprint, chunk_id)
+                        fingerprints[chunk_id] = (doc.provider.lower(), content_hash, fingerprint, doc.source_url)
+                        texts.append(chunk)
+                        ids.append(chunk_id)
+                        metadatas.append({
+                            "source": doc.source_url,
+                            "provider": doc.provider,
+                            "title": doc.title,
+                            "page_url": page["page_url"],
+                            "page_hash": page["page_hash"],
+                            "context_ok": context_ok,
+                        })
+                    page_ids.append(chunk_id)
+                    references[(chunk_id, doc.source_url, page["page_url"])] = doc.title
+                page_records[(doc.source_url, page["page_url"])] = (page["page_hash"], page_ids)
+                progress("pages", done, len(jobs))
+
+            # 2️⃣ Embed in the pool, write to the shadow collection as batches come back
+            batches = [texts[s:s + batch_size] for s in range(0, len(texts), batch_size)]
+            written = 0
+            progress("chunks", 0, len(texts))
+            for vectors in imap(_embed, batches):
+                end = written + len(vectors)
+                shadow.upsert(ids=ids[written:end], embeddings=vectors, documents=texts[written:end],
+                              metadatas=metadatas[written:end])
+                written = end
+                progress("chunks", written, len(texts))
+            summary["chunks"] = written
+
+            # Chunks of documents not re-indexed, and staged ones a resumed crawl will publish, move over re-embedded
+            other_ids = _other_chunks(live, {doc.source_url for doc in documents}, set(ids)) if live is not None else []
+            other = [
+                live.get(ids=other_ids[s:s + batch_size], include=["documents", "metadatas"])
+                for s in range(0, len(other_ids), batch_size)
+            ]
+            for batch, vectors in zip(other, imap(_embed, [b["documents"] for b in other])):
+                shadow.upsert(ids=batch["ids"], embeddings=vectors, documents=batch["documents"], metadatas=batch["metadatas"])
+                summary["other_chunks"] += len(batch["ids"])
+        except BaseException:
+            client.delete_collection(shadow.name)
+            raise
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        # 3️⃣ Swap: page records and fingerprints first, then the collection; no ingestion writes meanwhile
+        try:
+            with provider_write_lock(key, exclusive=True):
+                with transaction.atomic():
+                    if _last_write(key) != last_write or {doc.pk: doc.updated_at for doc in _provider_documents(key)} != snapshot:
+                        raise ReindexAborted(f"Documents of {key} were ingested or removed during the reindex; run it again")
+                    _replace_records(documents, page_records, fingerprints, references)
+                    set_collection_alias(key, shadow.name)
+                    swapped = True
+                if old_name and old_name != shadow.name:
+                    client.delete_collection(old_name)
+        except BlockingIOError:
+            raise ReindexAborted(f"An ingestion of {key} is running; run the reindex again once it is done") from None
+        finally:
+            if not swapped:
+                client.delete_collection(shadow.name)
+
+        # Documents ingested before the page store existed now have their pages in it
+        for doc in documents:
+            pages = DocumentPage.objects.filter(source_url=doc.source_url).values("page_url", "page_hash", "lastmod")
+            write_manifest(doc.source_url, doc.provider, {
+                p["page_url"]: {"page_hash": p["page_hash"], "lastmod": p["lastmod"] and p["lastmod"].isoformat()}
+                for p in pages
+            })
+        summary["collection"] = collection_name(key)
+
+        from services.faiss_index import load_provider_index, rebuild_provider_index
+        if settings.RETRIEVAL_BACKEND == "faiss" or load_provider_index(key) is not None:
+            rebuild_provider_index(shadow, key)
+            summary["faiss_rebuilt"] = True
+
+    return summary
+
+
+def _replace_records(documents: list, page_records: dict, fingerprints: dict, references: dict):
+    urls = [doc.source_url for doc in documents]
+    ChunkReference.objects.filter(source_url__in=urls).delete()
+    ChunkFingerprint.objects.filter(owner_url__in=urls).delete()
+    ChunkFingerprint.objects.bulk_create(
+        [
+            ChunkFingerprint(
+                chunk_id=chunk_id,
+                provider=provider,
+                content_hash=content_hash,
+                simhash=to_signed64(fingerprint),
+                **{f"band_{i}": band for i, band in enumerate(bands(fingerprint, BAND_COUNT))},
+                owner_url=owner_url,
+            )
+            for chunk_id, (provider, content_hash, fingerprint, owner_url) in fingerprints.items()
+        ],
+        batch_size=MIGRATE_BATCH,
+        ignore_conflicts=True,
+    )
+    fingerprint_pks = {}
+    chunk_ids = list(fingerprints)
+    for start in range(0, len(chunk_ids), MIGRATE_BATCH):
+        fingerprint_pks.update(
+            ChunkFingerprint.objects.filter(chunk_id__in=chunk_ids[start:start + MIGRATE_BATCH]).values_list("chunk_id", "pk")
+        )
+    ChunkReference.objects.bulk_create(
+        [
+            ChunkReference(fingerprint_id=fingerprint_pks[chunk_id], source_url=source_url, page_url=page_url, title=title)
+            for (chunk_id, source_url, page_url), title in references.items()
+            if chunk_id in fingerprint_pks
+        ],
+        batch_size=MIGRATE_BATCH,
+        ignore_conflicts=True,
+    )
+
+    pages = list(DocumentPage.objects.filter(source_url__in=urls))
+    for page in pages:
+        page.page_hash, page.chunk_ids = page_records.get((page.source_url, page.page_url), (page.page_hash, []))
+    DocumentPage.objects.bulk_update(pages, ["page_hash", "chunk_ids"], batch_size=MIGRATE_BATCH)
+
+    # Same document hash as ingestion computes, and a new retrieval generation for the provider
+    now = timezone.now()
+    for doc in documents:
+        doc.content_hash = generate_hash("\n".join(sorted(
+            f"{page_url} {page_hash}" for (url, page_url), (page_hash, _) in page_records.items() if url == doc.source_url
+        )))
+        doc.updated_at = now
+    Document.objects.bulk_update(documents, ["content_hash", "updated_at"])
@@ -0,0 +1,125 @@
+"""
+Rendered report downloads (`POST /api/doc_download/`, `POST /api/rag/` with generate_report).
+
+A report only depends on the answer and its sources, so rendered files are cached on disk
+under REPORT_CACHE_DIR, keyed by a hash of (format, answer, sources): downloading the same
+answer again serves the stored file instead of rendering it again. Reports are rendered into
+a spooled temporary file that stays in memory up to REPORT_SPOOL_MAX_BYTES and moves to disk
+beyond that, and are streamed from the file rather than returned as one in-memory buffer.
+
+The cache keeps the REPORT_CACHE_MAX_ENTRIES most recently served reports (0 disables it).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from services.doc_generator import build_docx, build_html, build_markdown
+
+# format: (file extension, content type)
+REPORT_FORMATS = {
+    "docx": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "md": ("md", "text/markdown; charset=utf-8"),
+    "html": ("html", "text/html; charset=utf-8"),
+}
+# Part of every cache key: bump it when a renderer's output changes
+RENDER_VERSION = 2
+
+
+def report_key(llm_response: dict, fmt: str) -> str:
+    content = json.dumps(
+        [RENDER_VERSION, fmt, llm_response.get("answer", "N/A"), llm_response.get("sources", [])],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def cache_dir() -> Path:
+    return Path(settings.REPORT_CACHE_DIR).resolve()
+
+
+def cache_path(key: str, fmt: str) -> Path:
+    return cache_dir() / key[:2] / f"{key}.{REPORT_FORMATS[fmt][0]}"
+
+
+def render_report(llm_response: dict, fmt: str, out):
+    """Writes the report in `fmt` to the binary file object `out`."""
+    if fmt == "docx":
+        build_docx(llm_response).save(out)
+    elif fmt == "md":
+        out.write(build_markdown(llm_response).encode("utf-8"))
+    elif fmt == "html":
+        out.write(build_html(llm_response).encode("utf-8"))
+    else:
+        raise ValueError(f"Unknown report format: {fmt}")
+
+
+def get_report(llm_response: dict, fmt: str = "docx") -> tuple:
+    """
+    The rendered report as (binary file object positioned at its start, key, cached).
+    The caller owns the file object; FileResponse closes it once it is sent.
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format: {fmt} (expected one of {', '.join(REPORT_FORMATS)})")
+    key = report_key(llm_response, fmt)
+    caching = settings.REPORT_CACHE_MAX_ENTRIES > 0
+    path = cache_path(key, fmt)
+
+    if caching:
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            pass
+        else:
+            os.utime(path)  # served again: last to be evicted
+            return f, key, True
+
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_MAX_BYTES)
+    try:
+        render_report(llm_response, fmt, spool)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    if not caching:
+        return spool, key, False
+
+    # Concurrent renders of the same report each write their own file; the last rename wins
+    with spool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(spool, f)
+        os.replace(tmp, path)
+
+    prune_cache()
+    return open(path, "rb"), key, False
+
+
+def prune_cache(max_entries: int | None = None) -> int:
+    """Removes the least recently served reports beyond `max_entries`; returns how many."""
+    max_entries = settings.REPORT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    entries = []
+    for path in cache_dir().glob("*/*"):
+        if path.name.endswith(".tmp"):
+            continue
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue  # evicted by a concurrent request
+    if len(entries) <= max_entries:
+        return 0
+    entries.sort()
+    removed = 0
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
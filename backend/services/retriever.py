@@ -1,38 +1,128 @@
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+import hashlib
+
 from django.conf import settings
+from django.db.models import Count, Max
 
+from apps.documents.models import Document
+from services.chunk_dedup import other_sources
+from services.vectorstores import (
+    SEARCHABLE,
+    get_embeddings,
+    get_vectorstore,
+    legacy_collection,
+    legacy_vectorstore,
+    partitioned_providers,
+    provider_collection,
+    provider_key,
+)
 
-def get_vectorstore():
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
 
-    return Chroma(
-        persist_directory=settings.VECTOR_DB_PATH,
-        embedding_function=embeddings
-    )
+def semantic_search(query: str, top_k: int = 5, provider: str | None = None):
+    results = None
+    if settings.RETRIEVAL_BACKEND == "faiss":
+        results = _search_faiss(query, top_k, provider)
+    if results is None:
+        results = _search_chroma(query, top_k, provider)
 
+    # Deduplicated chunks appear on several pages; list all of them
+    sources = other_sources([chunk_id for chunk_id, *_ in results if chunk_id])
 
-def semantic_search(query: str, top_k: int = 5, provider: str | None = None):
-    vectorstore = get_vectorstore()
+    return [
+        {
+            "page_content": page_content,
+            "metadata": {**metadata, "sources": sources[chunk_id]} if chunk_id in sources else metadata,
+            "score": score
+        }
+        for chunk_id, page_content, metadata, score in results
+    ]
 
-    filters = {}
+
+def _search_chroma(query: str, top_k: int, provider: str | None):
+    """Searches the provider's collection, or every provider's, plus the legacy collection while it exists."""
     if provider:
-        filters["provider"] = provider.lower()
+        stores = [get_vectorstore(provider)] if provider_collection(provider) else []
+    else:
+        stores = [get_vectorstore(p) for p in partitioned_providers()]
+    legacy = legacy_vectorstore()
+    if not stores and legacy is None:
+        return []
+
+    # Embed once for all collections searched
+    vector = get_embeddings().embed_query(query)
 
     # ✅ IMPORTANT: get results WITH score
-    results = vectorstore.similarity_search_with_score(
-        query=query,
-        k=top_k,
-        filter=filters if filters else None
-    )
+    results = []
+    for store in stores:
+        results.extend(store.similarity_search_by_vector_with_relevance_scores(vector, k=top_k, filter=SEARCHABLE))
+    if legacy is not None:
+        results.extend(legacy.similarity_search_by_vector_with_relevance_scores(
+            vector, k=top_k, filter={"provider": provider.lower()} if provider else None
+        ))
 
+    results = sorted(results, key=lambda result: result[1])[:top_k]
+    return [(doc.id, doc.page_content, doc.metadata, score) for doc, score in results]
+
+
+def _search_faiss(query: str, top_k: int, provider: str | None):
+    """
+    Searches the providers' FAISS mirrors, then reads the hits back from Chroma by id.
+    Returns None when a provider to search has no (current) mirror, so the caller falls back to Chroma.
+    """
+    from services import faiss_index
+
+    if legacy_collection() is not None:
+        return None  # mirrors are built from the provider collections; not split yet
+
+    providers = [provider_key(provider)] if provider else partitioned_providers()
+
+    vector = None
+    collections = {}
+    hits = []
+    for p in providers:
+        if faiss_index.load_provider_index(p) is None:
+            return None
+        if vector is None:
+            vector = get_embeddings().embed_query(query)
+        # The collection re-scores candidates of compressed mirrors with their exact distances
+        collections[p] = provider_collection(p)
+        found = faiss_index.search(p, vector, top_k, collections[p])
+        if found is None:
+            return None  # the mirror predates a reindex swap and is not rebuilt yet
+        hits.extend((chunk_id, distance, p) for chunk_id, distance in found)
+    hits = sorted(hits, key=lambda hit: hit[1])[:top_k]
+    if not hits:
+        return []
+
+    # Same squared L2 distance as Chroma's score, so RAG_SIMILARITY_THRESHOLD still applies
+    by_id = {}
+    for p in {hit_provider for _, _, hit_provider in hits}:
+        collection = collections[p]
+        if collection is None:
+            continue
+        stored = collection.get(
+            ids=[chunk_id for chunk_id, _, hit_provider in hits if hit_provider == p],
+            include=["documents", "metadatas"],
+        )
+        by_id.update(
+            (chunk_id, (document, metadata or {}))
+            for chunk_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        )
+    # Chunks deleted from Chroma since the mirror was last synced are skipped, and so are staged ones
     return [
-        {
-            "page_content": doc.page_content,
-            "metadata": doc.metadata,
-            "score": score
-        }
-        for doc, score in results
-    ]
\ No newline at end of file
+        (chunk_id, *by_id[chunk_id], distance)
+        for chunk_id, distance, _ in hits
+        if chunk_id in by_id and not by_id[chunk_id][1].get("staged")
+    ]
+
+
+def retrieval_generation(provider: str) -> str:
+    """
+    Fingerprint of what retrieval can return for a provider.
+    Changes whenever one of its documents is (re)indexed, added or removed,
+    so anything derived from search results can be keyed on it.
+    """
+    state = Document.objects.filter(provider__iexact=provider, is_indexed=True).aggregate(
+        count=Count("id"), last_update=Max("updated_at")
+    )
+    raw = f"{provider.lower()}:{state['count']}:{state['last_update']}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
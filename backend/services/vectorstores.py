@@ -0,0 +1,231 @@
+"""
+Chroma collections, one per provider.
+
+Chunks used to live in a single collection ("langchain", langchain_chroma's default) and
+every search filtered it by provider, so the ANN search ran over all providers' vectors and
+deletes by source scanned the whole store. Each provider now has its own collection:
+searches and deletes only touch that provider's chunks.
+
+Stores created before the split keep working: while the legacy collection still holds
+chunks, searches include it, and ingesting or deleting a provider's document first moves
+that provider's legacy chunks into its collection. `manage.py split_vector_collections`
+moves everything at once and drops the legacy collection.
+
+`manage.py reindex` builds a provider's chunks into a new "shadow" collection
+("provider_<key>.<token>") and then points the provider at it in collection_aliases.json,
+replaced atomically, so searches switch from the old collection to the complete new one at once.
+Everything that writes to a provider's live collection holds its write lock (provider_write_lock)
+shared; reindex holds it exclusively while it swaps, so no write lands in the replaced collection.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+LEGACY_COLLECTION = "langchain"
+COLLECTION_PREFIX = "provider_"
+MIGRATE_BATCH = 1000
+ALIASES_FILE = "collection_aliases.json"
+# Chunks a crawl wrote before it committed carry "staged": True until the commit publishes them
+# (services.ingestion); searches leave them out. Chunks stored before staging have no such key.
+SEARCHABLE = {"staged": {"$ne": True}}
+
+
+@lru_cache(maxsize=1)
+def get_embeddings():
+    # Loading the model is the expensive part of a search; do it once per process.
+    # Imported here too: the torch backend pulls in torch, which workers that never
+    # search (or management commands like migrate) should not pay for at startup.
+    from services.embeddings import load_embeddings
+
+    return load_embeddings()
+
+
+@lru_cache(maxsize=4)
+def _client(path: str):
+    import chromadb
+
+    return chromadb.PersistentClient(path=path)
+
+
+# chromadb's client cache is not safe against two threads creating the first client at once
+_client_lock = threading.Lock()
+
+
+def get_client():
+    with _client_lock:
+        return _client(settings.VECTOR_DB_PATH)
+
+
+def provider_key(provider: str) -> str:
+    """Normalised provider name used for its collection (and FAISS mirror) name."""
+    return re.sub(r"[^a-z0-9_-]+", "-", provider.lower()).strip("-_") or "unknown"
+
+
+_aliases = {}  # aliases file path -> (mtime, {provider key: collection name})
+
+
+def collection_aliases() -> dict[str, str]:
+    """Providers whose live collection is not the default one, {provider key: collection name}."""
+    path = Path(settings.VECTOR_DB_PATH) / ALIASES_FILE
+    try:
+        version = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _aliases.get(path)
+    if cached is None or cached[0] != version:
+        cached = _aliases[path] = (version, json.loads(path.read_text()))
+    return cached[1]
+
+
+def set_collection_alias(provider: str, name: str):
+    """Makes `name` the provider's live collection."""
+    key = provider_key(provider)
+    aliases = dict(collection_aliases())
+    if name == f"{COLLECTION_PREFIX}{key}":
+        aliases.pop(key, None)
+    else:
+        aliases[key] = name
+    path = Path(settings.VECTOR_DB_PATH) / ALIASES_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{ALIASES_FILE}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_text(json.dumps(aliases, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def write_lock_path(provider: str) -> Path:
+    return Path(settings.VECTOR_DB_PATH) / f".{provider_key(provider)}.write.lock"
+
+
+@contextmanager
+def provider_write_lock(provider: str, exclusive: bool = False):
+    """
+    Held shared, across processes, by ingestions and deletions while they write to the
+    provider's live collection; taken exclusively (without waiting) by reindex to swap it.
+    Raises BlockingIOError if the exclusive lock is taken while a write is in progress.
+    The lock file's mtime changes whenever a shared holder is done.
+    """
+    path = write_lock_path(provider)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as lock:
+        fcntl.flock(lock, (fcntl.LOCK_EX | fcntl.LOCK_NB) if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if not exclusive:
+                os.utime(path)
+
+
+def collection_name(provider: str) -> str:
+    """Name of the provider's live collection."""
+    key = provider_key(provider)
+    return collection_aliases().get(key, f"{COLLECTION_PREFIX}{key}")
+
+
+def shadow_collection_name(provider: str) -> str:
+    """A fresh name for a collection that replaces the provider's live one once complete."""
+    return f"{COLLECTION_PREFIX}{provider_key(provider)}.{uuid.uuid4().hex[:12]}"
+
+
+def _collection_provider(name: str) -> str:
+    return name[len(COLLECTION_PREFIX):].split(".", 1)[0]
+
+
+def get_vectorstore(provider: str, embedding_function=None):
+    """The provider's collection (created if needed), embedding with the shared model by default."""
+    from langchain_chroma import Chroma
+
+    return Chroma(
+        client=get_client(),
+        collection_name=collection_name(provider),
+        embedding_function=embedding_function or get_embeddings(),
+    )
+
+
+def partitioned_providers() -> list[str]:
+    """Providers that have a collection."""
+    names = {c.name for c in get_client().list_collections() if c.name.startswith(COLLECTION_PREFIX)}
+    return sorted({_collection_provider(name) for name in names if collection_name(_collection_provider(name)) in names})
+
+
+def inactive_collections(provider: str) -> list[str]:
+    """The provider's collections other than its live one: shadows of unfinished or failed reindexes."""
+    key = provider_key(provider)
+    live = collection_name(key)
+    return sorted(
+        c.name for c in get_client().list_collections()
+        if c.name.startswith(COLLECTION_PREFIX) and _collection_provider(c.name) == key and c.name != live
+    )
+
+
+def provider_collection(provider: str):
+    """The provider's raw Chroma collection, or None if it has none. Needs no embedding model."""
+    try:
+        return get_client().get_collection(collection_name(provider))
+    except Exception:
+        return None
+
+
+def legacy_collection():
+    """The pre-partitioning collection if it still holds chunks, else None."""
+    try:
+        collection = get_client().get_collection(LEGACY_COLLECTION)
+    except Exception:
+        return None
+    return collection if collection.count() else None
+
+
+def legacy_vectorstore(embedding_function=None):
+    if legacy_collection() is None:
+        return None
+    from langchain_chroma import Chroma
+
+    return Chroma(
+        client=get_client(),
+        collection_name=LEGACY_COLLECTION,
+        embedding_function=embedding_function or get_embeddings(),
+    )
+
+
+def migrate_legacy_chunks(provider: str | None = None) -> dict[str, int]:
+    """
+    Moves chunks from the legacy collection into their provider's collection: only those of
+    `provider`, or all of them. Stored embeddings are copied, nothing is re-embedded.
+    The legacy collection is dropped once empty. Returns the number of chunks moved per provider.
+    """
+    legacy = legacy_collection()
+    if legacy is None:
+        return {}
+
+    client = get_client()
+    moved = Counter()
+    where = {"provider": provider} if provider else None
+    while True:
+        batch = legacy.get(where=where, include=["embeddings", "documents", "metadatas"], limit=MIGRATE_BATCH)
+        if not batch["ids"]:
+            break
+        groups = defaultdict(list)
+        for i, metadata in enumerate(batch["metadatas"]):
+            groups[provider_key((metadata or {}).get("provider") or "unknown")].append(i)
+        for group_provider, rows in groups.items():
+            # Upsert before deleting, so an interrupted move is completed by the next run
+            client.get_or_create_collection(collection_name(group_provider)).upsert(
+                ids=[batch["ids"][i] for i in rows],
+                embeddings=[batch["embeddings"][i] for i in rows],
+                documents=[batch["documents"][i] for i in rows],
+                metadatas=[batch["metadatas"][i] for i in rows],
+            )
+            moved[group_provider] += len(rows)
+        legacy.delete(ids=batch["ids"])
+
+    if legacy.count() == 0:
+        client.delete_collection(LEGACY_COLLECTION)
+    return dict(moved)